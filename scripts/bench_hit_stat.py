@@ -0,0 +1,242 @@
+"""
+bench_hit_stat.py
+
+📌 功能：
+- 按固定种子生成六个彩种的合成开奖与推荐数据（utils/bench_data.py），写入基准测试库
+- 计时热点路径：match_hit / count_hit_numbers_by_playtype 单次调用、单期 update_hit_stat、整彩种 run_all
+- 结果写入 JSON，可与上一次结果（--baseline）对比，超出容差时提示回退
+
+📌 数据库：
+- --backend sqlite（默认）：SQLite 替身库（utils/sqlite_compat.py），无需 MySQL
+- --backend mysql：使用 .env 中的连接参数，--mysql-database 指定专用库（其中的同名表会被删除重建）
+
+示例：
+  python scripts/bench_hit_stat.py --issues 60 --experts 200 --output bench_results.json
+  python scripts/bench_hit_stat.py --baseline bench_results.json --fail-on-regression
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bench_data import LOTTERY_PROFILES, BenchConfig, generate, load_into
+from utils.db import DB_CONFIG, close_pools, pooled_connection, set_connection_factory
+from utils.draw_index import reset_draw_indexes
+from utils.hit_rule import count_hit_numbers_by_playtype, match_hit
+from utils.sqlite_compat import sqlite_connection_factory
+
+import init_expert_hit_stat as hit_stat
+
+# ✅ 结果文件格式版本：字段变更时 +1，不同版本的结果不做对比
+RESULT_VERSION = 1
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(func, repeat: int, quiet: bool = True, before=None) -> dict:
+    """重复执行 func，返回 {median, min, runs}（秒）与最后一次返回值"""
+    runs, value = [], None
+    for _ in range(repeat):
+        if before:
+            before()
+        sink = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            start = time.perf_counter()
+            value = func()
+            runs.append(time.perf_counter() - start)
+    return {
+        "median": round(statistics.median(runs), 6),
+        "min": round(min(runs), 6),
+        "runs": [round(r, 6) for r in runs],
+        "value": value,
+    }
+
+
+def rule_samples(data, limit: int) -> list[tuple[str, str, str, str]]:
+    """从合成数据取 (玩法名, 推荐号码, 开奖号, 蓝球) 样本，按期号顺序截取前 limit 条"""
+    names = {pid: name for name, pid in data.playtype_ids.items()}
+    draws = {issue: (open_code, blue_code) for issue, open_code, blue_code in data.draws}
+    return [
+        (names[playtype_id], numbers, *draws[issue])
+        for issue, _, playtype_id, numbers in data.predictions[:limit]
+    ]
+
+
+def bench_rules(lottery_name: str, samples: list, repeat: int) -> dict:
+    def run_match():
+        return sum(match_hit(p, n, o, b) for p, n, o, b in samples)
+
+    def run_count():
+        return sum(count_hit_numbers_by_playtype(p, n, o, lottery_name) for p, n, o, _ in samples)
+
+    results = {}
+    for metric, func in (("match_hit", run_match), ("count_hit_numbers_by_playtype", run_count)):
+        timing = timed(func, repeat)
+        timing["calls"] = len(samples)
+        timing["us_per_call"] = round(timing["median"] / max(len(samples), 1) * 1e6, 3)
+        results[metric] = timing
+    return results
+
+
+def prepare_database(datasets: dict, options):
+    with pooled_connection() as conn:
+        load_into(conn, datasets)
+        hit_stat.ensure_hit_stat_schema(conn, list(datasets), force=True)
+    hit_stat.sync_mask_tables(list(datasets), options)
+
+
+def bench_lottery(data, options, repeat: int, sample_limit: int) -> dict:
+    lottery_name = data.lottery_name
+    results = bench_rules(lottery_name, rule_samples(data, sample_limit), repeat)
+
+    last_issue = data.draws[-1][0]
+    results["update_hit_stat"] = timed(
+        lambda: hit_stat.update_hit_stat(lottery_name, last_issue, options), repeat, before=reset_draw_indexes
+    )
+    results["update_hit_stat"]["issue"] = last_issue
+    results["run_all"] = timed(
+        lambda: hit_stat.run_all(lottery_name, options), repeat, before=reset_draw_indexes
+    )
+    results["run_all"]["predictions"] = len(data.predictions)
+
+    for timing in results.values():
+        timing["result"] = timing.pop("value")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """逐项对比中位数耗时，返回 [{lottery, metric, baseline, current, ratio, regressed}]"""
+    rows = []
+    for lottery_name, metrics in results["results"].items():
+        for metric, timing in metrics.items():
+            base = baseline.get("results", {}).get(lottery_name, {}).get(metric)
+            if not base or not base.get("median"):
+                continue
+            ratio = timing["median"] / base["median"]
+            rows.append({
+                "lottery": lottery_name,
+                "metric": metric,
+                "baseline": base["median"],
+                "current": timing["median"],
+                "ratio": round(ratio, 3),
+                "regressed": ratio > 1 + tolerance,
+            })
+    return rows
+
+
+def report(results: dict, comparison: list[dict] | None):
+    print(f"\n📊 基准测试结果（中位数，秒）：{results['meta']['backend']} / seed={results['meta']['seed']}")
+    for lottery_name, metrics in results["results"].items():
+        parts = [f"{metric}={timing['median']:.4f}" for metric, timing in metrics.items()]
+        print(f"   {lottery_name}: " + " ".join(parts))
+    if comparison is None:
+        return
+    print("\n📈 与基线对比（当前 / 基线）：")
+    for row in comparison:
+        flag = "❌" if row["regressed"] else "✅"
+        print(f"   {flag} {row['lottery']} {row['metric']}: {row['baseline']:.4f}s → {row['current']:.4f}s（×{row['ratio']}）")
+
+
+def parse_args(argv: list[str]):
+    parser = argparse.ArgumentParser(description="专家命中汇总基准测试")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite", help="基准测试库（默认 sqlite 替身）")
+    parser.add_argument("--sqlite-path", default=None, help="SQLite 数据库文件（默认临时文件）")
+    parser.add_argument("--mysql-database", default=None, help="MySQL 专用基准测试库名（--backend mysql 时必填）")
+    parser.add_argument("--lottery", action="append", choices=list(LOTTERY_PROFILES), help="只测试指定彩种（可重复）")
+    parser.add_argument("--seed", type=int, default=BenchConfig.seed, help="随机种子")
+    parser.add_argument("--issues", type=int, default=BenchConfig.issues, help="每个彩种期数")
+    parser.add_argument("--experts", type=int, default=BenchConfig.experts, help="专家数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取中位数，默认 3）")
+    parser.add_argument("--rule-samples", type=int, default=20000, help="命中规则微基准的调用次数上限")
+    parser.add_argument("--output", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--baseline", default=None, help="基线结果 JSON，逐项对比中位数耗时")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变慢比例（默认 0.2，即 20%%）")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在超出容差的项时返回非 0")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    cli = parse_args(argv)
+    config = BenchConfig(seed=cli.seed, issues=cli.issues, experts=cli.experts)
+    options = hit_stat.RunOptions(mask_sync=True)
+
+    if cli.backend == "mysql":
+        if not cli.mysql_database:
+            print("❌ --backend mysql 需要 --mysql-database 指定专用库（其中的同名表会被删除重建）")
+            return 2
+        DB_CONFIG["database"] = cli.mysql_database
+    else:
+        path = cli.sqlite_path or os.path.join(tempfile.mkdtemp(prefix="hit_stat_bench_"), "bench.sqlite3")
+        set_connection_factory(sqlite_connection_factory(path))
+        print(f"🧪 SQLite 替身库：{path}")
+
+    start = time.perf_counter()
+    datasets = generate(config, cli.lottery)
+    print(f"🧪 已生成合成数据：{sum(len(d.predictions) for d in datasets.values())} 条推荐（{time.perf_counter() - start:.1f}s）")
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepare_database(datasets, options)
+
+    results = {
+        "meta": {
+            "version": RESULT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "backend": cli.backend,
+            "seed": cli.seed,
+            "issues": cli.issues,
+            "experts": cli.experts,
+            "repeat": cli.repeat,
+            "rule_samples": cli.rule_samples,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_commit": git_commit(),
+        },
+        "results": {},
+    }
+    for lottery_name, data in datasets.items():
+        print(f"⏱️ [{lottery_name}] {len(data.predictions)} 条推荐")
+        results["results"][lottery_name] = bench_lottery(data, options, max(cli.repeat, 1), cli.rule_samples)
+    close_pools()
+
+    comparison = None
+    if cli.baseline:
+        with open(cli.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("version") != RESULT_VERSION:
+            print(f"⚠️ 基线结果格式版本不同，跳过对比：{cli.baseline}")
+        else:
+            for key in ("backend", "seed", "issues", "experts"):
+                if baseline["meta"].get(key) != results["meta"][key]:
+                    print(f"⚠️ 基线参数不同：{key} = {baseline['meta'].get(key)}（当前 {results['meta'][key]}）")
+            comparison = compare(results, baseline, cli.tolerance)
+            results["comparison"] = {"baseline": cli.baseline, "tolerance": cli.tolerance, "items": comparison}
+
+    report(results, comparison)
+    with open(cli.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 已写入：{cli.output}")
+
+    if cli.fail_on_regression and comparison and any(row["regressed"] for row in comparison):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
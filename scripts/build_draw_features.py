@@ -0,0 +1,53 @@
+"""
+build_draw_features.py
+
+📌 功能：
+- 按开奖表物化开奖特征（和值 / 跨度 / 奇偶比 / 大小比）到 lottery_draw_features_xxx（utils/draw_features.py）
+- 默认增量：新开奖 + 最近 --lookback 期按开奖指纹比对；--rebuild 全量重建
+- init_expert_hit_stat.py 每次运行前也会增量维护，一般只在首次部署或口径调整后手动执行
+
+示例：
+  python scripts/build_draw_features.py
+  python scripts/build_draw_features.py --lottery 快乐8 --rebuild
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import get_connection
+from utils.draw_features import rebuild_features, refresh_features
+from utils.hit_progress import DEFAULT_LOOKBACK
+
+from init_expert_hit_stat import LOTTERY_LIST
+
+
+def parse_args(argv: list[str]):
+    parser = argparse.ArgumentParser(description="物化开奖号码特征表")
+    parser.add_argument("--lottery", action="append", choices=LOTTERY_LIST, help="只处理指定彩种（可重复）")
+    parser.add_argument("--rebuild", action="store_true", help="清空后全量重建")
+    parser.add_argument("--lookback", type=int, default=DEFAULT_LOOKBACK, help="增量模式回看的期数（兜底开奖号更正）")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    cli = parse_args(sys.argv[1:])
+    lottery_names = cli.lottery or LOTTERY_LIST
+    start = time.perf_counter()
+
+    conn = get_connection()
+    try:
+        for lottery_name in lottery_names:
+            if cli.rebuild:
+                print(f"   {lottery_name}：重建 {rebuild_features(conn, lottery_name)} 期")
+                continue
+            result = refresh_features(conn, lottery_name, cli.lookback)
+            if result["rebuilt"]:
+                print(f"   {lottery_name}：首次构建 {result['rebuilt']} 期")
+            else:
+                print(f"   {lottery_name}：新增 {result['added']} 期，更正 {result['updated']} 期")
+    finally:
+        conn.close()
+    print(f"✅ 开奖特征表已更新（{time.perf_counter() - start:.1f}s）")
@@ -0,0 +1,55 @@
+"""
+build_snapshot.py
+
+📌 功能：
+- 把 expert_predictions_xxx / lottery_results_xxx / playtype_dict 转换为列式快照（utils/snapshot.py）
+- 来源为 mysqldump 导出的 .sql 文件（无需恢复 MySQL）或当前数据库
+- 生成后可用 init_expert_hit_stat.py --snapshot DIR 直接计算命中汇总
+
+示例：
+  python scripts/build_snapshot.py --dump data/*.sql --out snapshot
+  python scripts/build_snapshot.py --from-db --out snapshot --lottery 快乐8
+  python scripts/init_expert_hit_stat.py All --snapshot snapshot
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+
+from utils.db import get_connection
+from utils.snapshot import build_snapshot
+
+from init_expert_hit_stat import LOTTERY_LIST
+
+
+def parse_args(argv: list[str]):
+    parser = argparse.ArgumentParser(description="生成命中汇总计算用的列式快照")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dump", nargs="+", help="mysqldump 导出的 .sql 文件")
+    source.add_argument("--from-db", action="store_true", help="从当前数据库（MYSQL_*）读取")
+    parser.add_argument("--out", required=True, help="快照目录（已存在时整体重建）")
+    parser.add_argument("--lottery", action="append", choices=LOTTERY_LIST, help="只转换指定彩种（可重复）")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    cli = parse_args(sys.argv[1:])
+    lottery_names = cli.lottery or LOTTERY_LIST
+    start = time.perf_counter()
+
+    if cli.dump:
+        manifest = build_snapshot(cli.out, lottery_names, dump_paths=cli.dump)
+    else:
+        conn = get_connection()
+        try:
+            manifest = build_snapshot(cli.out, lottery_names, conn=conn, cursor_class=pymysql.cursors.SSCursor)
+        finally:
+            conn.close()
+
+    for table, rows in manifest["tables"].items():
+        print(f"   {table}：{rows} 行")
+    print(f"✅ 快照已生成：{cli.out}（{time.perf_counter() - start:.1f}s）")
@@ -9,8 +9,15 @@ init_expert_hit_stat.py
 
 import sys
 import os
+import argparse
+import io
+import time
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from functools import partial
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
+import pymysql
 # ✅ 彩种列表（必须与 workflow_dispatch 保持一致）
 LOTTERY_LIST = ["福彩3D", "排列3", "排列5", "快乐8", "双色球", "大乐透"]
 
@@ -26,27 +33,234 @@ LOTTERY_ID_MAP = {
 
 
 from utils.db import (
-    get_connection,
+    MetadataCache,
+    close_pools,
+    get_table_columns,
+    get_table_indexes,
+    pooled_connection,
     get_prediction_table,
-    get_result_table,
     get_hit_stat_table,
-    LOTTERIES_WITH_BLUE
+    get_hit_progress_table,
+    get_hit_rolling_table,
+    get_prediction_mask_table,
+    get_hit_sync_table,
+    get_hit_checkpoint_table,
+    get_remote_connection,
+    RemoteConfigError,
 )
-from utils.hit_rule import count_hit_numbers_by_playtype, match_hit
+from utils.draw_features import refresh_features
+from utils.draw_index import DrawEntry, get_draw_index
+from utils.hit_checkpoint import clear_checkpoints, completed_issues, ensure_checkpoint_table, mark_completed
+from utils.hit_mask import get_mask_words
+from utils.hit_progress import (
+    DEFAULT_LOOKBACK,
+    IssueSnapshot,
+    bootstrap_progress,
+    clear_progress,
+    ensure_progress_table,
+    find_changed_issues,
+    record_progress,
+)
+from utils.hit_rolling import ensure_rolling_table, rebuild_rolling_stats, update_rolling_stats
+from utils.hit_stat import (
+    EVAL_MODES,
+    HitStatAccumulator,
+    compute_hit_stats,
+    partial_hit_counts,
+    report_dedup_stats,
+)
+from utils.hit_sync import (
+    RETRYABLE_ERRORS,
+    VERIFY_MODES,
+    RemoteSession,
+    enqueue_issues,
+    ensure_sync_table,
+    find_mismatched_issues,
+    pending_issues,
+    sync_issues,
+)
+from utils.hit_stat_diff import delete_stats, diff_stats, load_existing_stats
+from utils.issue_shard import parse_shard, select_issues
+from utils.outcome_matrix import (
+    OUTCOME_DIGITS,
+    build_outcome_matrix,
+    ensure_outcome_tables,
+    latest_draw_issue,
+    lookup_hit_stats,
+    pending_outcome_issues,
+    prediction_state,
+    prune_outcome_matrices,
+    store_outcome_matrix,
+    stored_state,
+)
+from utils.hit_stat_writer import COMMIT_MODES, DEFAULT_BATCH_SIZE, WRITER_KINDS, WriteThroughput, create_writer
+from utils.memory_usage import frame_mb, peak_rss_mb, reset_peak, track_peak
+from utils.pipeline import Stage, run_pipeline
+from utils.prediction_frame import compact_predictions
+from utils.prediction_mask import ensure_mask_table, mask_join_sql, sync_prediction_masks
+from utils.run_metrics import RunMetrics
+from utils.snapshot import Snapshot
+from utils.task_runner import ProgressReporter, run_tasks
 
 
-def get_table_columns(conn, table_name: str) -> set[str]:
-    """读取数据表字段列表"""
-    with conn.cursor() as cursor:
-        cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-        return {row[0] for row in cursor.fetchall()}
+@dataclass
+class RunOptions:
+    """
+    单次运行参数（由命令行解析得到）
+    - eval_mode：命中计算模式，vector / legacy / compare（见 utils/hit_stat.py）
+    - writer / batch_size / commit_mode：写入方式、每批行数（None 为写入器默认值）与提交粒度（见 utils/hit_stat_writer.py）
+    - workers / max_in_flight / issues_per_task：并行进程数、在途任务上限、全量分片期数
+    - stream / memory_budget_mb：全量模式使用服务端游标流式读取及每块内存预算
+    - today_lookback：Today 模式逐期比对推荐数与开奖指纹的回看期数
+    - mask_table：读取推荐时使用已物化的号码位图表（expert_prediction_mask_xxx）
+    - mask_sync：计算前按自增 ID 水位补齐位图表（默认不补齐：全量编码历史推荐耗时，未补齐的行回退解析文本）
+    - snapshot_dir / snapshot_write：从列式快照读取推荐与开奖（见 utils/snapshot.py），
+      结果写入快照 stats/ 目录（parquet）或命中汇总表（db）
+    - diff：与现有汇总比对，只写新增 / 变化的行并删除已消失的行（见 utils/hit_stat_diff.py）
+    - verify：只比对并报告差异，不写入（dry run）
+    - sync：写入时把涉及的期号登记到远程同步队列（见 utils/hit_sync.py）；未开启时不登记，由 --sync-full-check 补齐
+    - issue_from / issue_to / shard：全量模式只计算期号范围内（含两端）、属于第 k / n 片的期号（见 utils/issue_shard.py）
+    - checkpoint：全量模式按期号登记断点并跳过已完成的期号（见 utils/hit_checkpoint.py）
+    - pipeline / pipeline_depth：预读 / 计算 / 写入三段流水线及阶段间缓冲组数（见 utils/pipeline.py）
+    - outcome_matrix：单期模式优先查开奖前构建的结果空间命中矩阵（数字型彩种，见 utils/outcome_matrix.py）
+    """
+    eval_mode: str = "vector"
+    writer: str = "batch"
+    batch_size: int | None = None
+    commit_mode: str = "lottery"
+    workers: int = 1
+    max_in_flight: int | None = None
+    issues_per_task: int = 50
+    stream: bool = False
+    memory_budget_mb: int = 256
+    today_lookback: int = DEFAULT_LOOKBACK
+    mask_table: bool = True
+    mask_sync: bool = False
+    snapshot_dir: str | None = None
+    snapshot_write: str = "parquet"
+    diff: bool = False
+    verify: bool = False
+    sync: bool = False
+    issue_from: str | None = None
+    issue_to: str | None = None
+    shard: tuple[int, int] | None = None
+    checkpoint: bool = False
+    pipeline: bool = False
+    pipeline_depth: int = 2
+    outcome_matrix: bool = True
 
+    @property
+    def selective(self) -> bool:
+        return self.issue_from is not None or self.issue_to is not None or self.shard is not None
 
-def get_table_indexes(conn, table_name: str) -> set[str]:
-    """读取数据表已有索引名称"""
-    with conn.cursor() as cursor:
-        cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-        return {row[2] for row in cursor.fetchall()}
+
+DEFAULT_OPTIONS = RunOptions()
+
+# ✅ 本次运行的写入吞吐统计
+WRITE_THROUGHPUT = WriteThroughput()
+
+# ✅ 本次运行的阶段耗时 / 读写行数（JSON lines 事件流 + 运行汇总）
+METRICS = RunMetrics()
+
+# ✅ 本次运行的表结构 / 玩法字典缓存
+METADATA = MetadataCache()
+
+# ✅ 命中汇总表结构版本：表结构变更时 +1，已是当前版本的表跳过 SHOW TABLES / COLUMNS / INDEX 检查
+HIT_STAT_SCHEMA_VERSION = 2
+SCHEMA_VERSION_TABLE = "hit_stat_schema_version"
+
+
+def open_connection(options: RunOptions):
+    """从连接池借出连接（load 写入方式需开启 local_infile）"""
+    return pooled_connection(local_infile=True) if options.writer == "load" else pooled_connection()
+
+
+# ✅ 本进程已确认存在的待同步期号表
+_SYNC_TABLES_READY: set[str] = set()
+
+
+def track_changed_issues(lottery_name: str, issues: set[str], options: RunOptions):
+    """
+    写入前登记本次写入涉及的期号（远程增量同步队列，见 utils/hit_sync.py）。
+    使用独立连接提交，不影响写入器的提交粒度。
+    """
+    if not (options.sync and issues):
+        return
+    sync_table = get_hit_sync_table(lottery_name)
+    with pooled_connection() as conn:
+        if sync_table not in _SYNC_TABLES_READY:
+            ensure_sync_table(conn, sync_table)
+            _SYNC_TABLES_READY.add(sync_table)
+        enqueue_issues(conn, sync_table, issues)
+
+
+def write_stat_batch(conn, writer, lottery_name: str, stat_list: list[dict], options: RunOptions,
+                     info: dict, issues: list[str] | None = None, checkpoint: bool = False):
+    """
+    用写入器写入一批命中汇总（提交由写入器负责）
+    - 默认：全部行 upsert，涉及的期号登记到待同步队列（仅 --sync）
+    - diff / verify：与 issues（默认为 stat_list 中的期号）的现有汇总比对，差异计数累加到 info；
+      diff 只写新增 / 变化的行并删除已消失的行，只有存在差异的期号进入待同步队列；verify 只打印差异样例
+    - checkpoint：写入后在同一连接上登记这些期号的断点，随汇总一起提交
+    """
+    scope = issues if issues is not None else {row["issue_name"] for row in stat_list}
+    if not (options.diff or options.verify):
+        track_changed_issues(lottery_name, {row["issue_name"] for row in stat_list}, options)
+        writer.write(stat_list)
+    else:
+        _write_stat_diff(conn, writer, lottery_name, stat_list, options, info, scope)
+    if checkpoint and not options.verify:
+        mark_completed(conn, get_hit_checkpoint_table(lottery_name), scope)
+
+
+def _write_stat_diff(conn, writer, lottery_name: str, stat_list: list[dict], options: RunOptions,
+                     info: dict, scope):
+    lottery_id = LOTTERY_ID_MAP[lottery_name]
+    diff = diff_stats(load_existing_stats(conn, writer.table, lottery_id, scope), stat_list)
+    for field, value in diff.counts().items():
+        info[field] = info.get(field, 0) + value
+    if options.verify:
+        for sample in diff.samples:
+            print(f"   {sample}")
+        return
+
+    track_changed_issues(lottery_name, diff.changed_issues, options)
+    if diff.deleted:
+        delete_stats(conn, writer.table, lottery_id, diff.deleted, options.batch_size or DEFAULT_BATCH_SIZE)
+    writer.write(diff.changed)
+
+
+def report_stat_diff(lottery_name: str, info: dict, options: RunOptions, issue_name: str | None = None):
+    if not (options.diff or options.verify):
+        return
+    scope = f"{lottery_name} / {issue_name}" if issue_name else lottery_name
+    label = "差异（未写入）" if options.verify else "差异写入"
+    print(
+        f"🧮 [{scope}] {label}：新增 {info.get('inserted', 0)}，更新 {info.get('updated', 0)}，"
+        f"删除 {info.get('deleted', 0)}，未变 {info.get('unchanged', 0)}"
+    )
+
+
+def report_memory(lottery_name: str, df_mb: float, frame_label: str = "推荐帧") -> float | None:
+    """打印推荐帧占用与自 reset_peak 以来的峰值 RSS，返回峰值（MB，无法获取时为 None）"""
+    peak = peak_rss_mb()
+    peak_text = f"{peak:.0f} MB" if peak is not None else "未知"
+    print(f"🧠 [{lottery_name}] {frame_label} {df_mb:.1f} MB，峰值内存 {peak_text}")
+    return round(peak, 1) if peak is not None else None
+
+
+def write_hit_stats(conn, lottery_name: str, stat_list: list[dict], options: RunOptions,
+                    info: dict | None = None, issues: list[str] | None = None, checkpoint: bool = False) -> int:
+    """按运行参数选择写入器写入命中汇总，记录吞吐，返回写入条数（差异写入时为新增 + 变化的行数）"""
+    info = {} if info is None else info
+    writer = create_writer(
+        options.writer, conn, get_hit_stat_table(lottery_name),
+        options.batch_size, options.commit_mode
+    )
+    write_stat_batch(conn, writer, lottery_name, stat_list, options, info, issues, checkpoint)
+    writer.close()
+    WRITE_THROUGHPUT.record(lottery_name, writer)
+    return writer.rows_written
 
 
 def ensure_hit_stat_table_exists(conn, table_name: str, lottery_id: int):
@@ -116,246 +330,1452 @@ def ensure_hit_stat_table_exists(conn, table_name: str, lottery_id: int):
     conn.commit()
 
 
-def update_hit_stat(lottery_name: str, issue_name: str):
-    conn = get_connection()
-    prediction_table = get_prediction_table(lottery_name)
-    result_table = get_result_table(lottery_name)
-    hit_stat_table = get_hit_stat_table(lottery_name)
-    lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+def read_schema_versions(conn) -> dict[str, int]:
+    """读取已记录的表结构版本，版本表不存在时自动创建"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT table_name, version FROM {SCHEMA_VERSION_TABLE}")
+            return {row[0]: int(row[1]) for row in cursor.fetchall()}
+    except pymysql.err.ProgrammingError:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+                    table_name VARCHAR(64) NOT NULL PRIMARY KEY COMMENT '表名',
+                    version INT NOT NULL COMMENT '表结构版本',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='命中汇总表结构版本'
+                """
+            )
+        conn.commit()
+        return {}
 
-    if lottery_id is None:
-        print(f"❌ 未知彩种：{lottery_name}")
-        conn.close()
-        return
 
-    # ✅ 判断彩种是否包含蓝球
-    select_cols = "open_code"
-    if lottery_name in LOTTERIES_WITH_BLUE:
-        select_cols += ", blue_code"
+def ensure_hit_stat_schema(conn, lottery_names: list[str], force: bool = False):
+    """
+    按表结构版本检查命中汇总表：
+    - 已记录为当前版本的表直接跳过
+    - 其余表执行 ensure_hit_stat_table_exists 后记录版本
+    - force=True 时忽略版本记录，全部重新检查
+    """
+    versions = read_schema_versions(conn)
+    if force:
+        versions = {}
+
+    for lottery_name in lottery_names:
+        hit_stat_table = get_hit_stat_table(lottery_name)
+        lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+        if lottery_id is None:
+            raise ValueError(f"未识别的彩种：{lottery_name}")
+        if versions.get(hit_stat_table) == HIT_STAT_SCHEMA_VERSION:
+            continue
+
+        ensure_hit_stat_table_exists(conn, hit_stat_table, lottery_id)
+        METADATA.invalidate(hit_stat_table)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {SCHEMA_VERSION_TABLE} (table_name, version) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE version = VALUES(version)
+                """,
+                (hit_stat_table, HIT_STAT_SCHEMA_VERSION)
+            )
+        conn.commit()
+
+
+def _issue_filter(column: str, issues: list[str] | None) -> tuple[str, list]:
+    """构造期号过滤条件：issues 为空时不过滤"""
+    if issues is None:
+        return "", []
+    return f"WHERE {column} IN ({', '.join(['%s'] * len(issues))})", list(issues)
 
-    open_df = pd.read_sql(
-        f"SELECT {select_cols} FROM {result_table} WHERE issue_name = %s",
-        conn, params=[issue_name]
-    )
-    if open_df.empty:
-        print(f"⚠️ 未找到开奖号码：{issue_name}")
-        conn.close()
-        return
 
-    open_code = open_df.iloc[0]["open_code"]
-    blue_code = open_df.iloc[0].get("blue_code", "")
+def resolve_mask_table(conn, lottery_name: str, options: RunOptions) -> str | None:
+    """
+    返回可用的推荐号码位图表（未启用、推荐表无自增 id 或位图表不存在时返回 None）
+    - 紧凑帧中位图可精确表示的行不保留号码文本，legacy / compare 需逐行读取文本，因此仅 vector 模式使用位图表
+    """
+    if not options.mask_table or options.eval_mode != "vector":
+        return None
+    if "id" not in METADATA.columns(conn, get_prediction_table(lottery_name)):
+        return None
+    mask_table = get_prediction_mask_table(lottery_name)
+    try:
+        # 旧版本位图表（无 numbers_md5）在下次同步时重建，此前不使用
+        if "numbers_md5" not in METADATA.columns(conn, mask_table):
+            return None
+    except pymysql.err.ProgrammingError:
+        return None
+    return mask_table
 
-    # ✅ 查推荐
-    prediction_columns = get_table_columns(conn, prediction_table)
-    if "playtype_id" not in prediction_columns:
-        print(f"❌ {prediction_table} 缺少 playtype_id 字段，请先完成数据库迁移。")
-        conn.close()
+
+def sync_mask_tables(lottery_names: list[str], options: RunOptions):
+    """计算前按自增 ID 水位补齐各彩种推荐号码位图（--mask-sync 时主进程执行一次，子进程只读）"""
+    if not (options.mask_table and options.mask_sync):
         return
+    with pooled_connection() as conn:
+        for lottery_name in lottery_names:
+            prediction_table = get_prediction_table(lottery_name)
+            if "id" not in METADATA.columns(conn, prediction_table):
+                print(f"⚠️ {prediction_table} 缺少自增 id 字段，跳过号码位图表。")
+                continue
+            mask_table = get_prediction_mask_table(lottery_name)
+            with METRICS.stage(lottery_name, "mask_sync") as info:
+                ensure_mask_table(conn, mask_table)
+                METADATA.invalidate(mask_table)
+                added = info["aux_rows_written"] = sync_prediction_masks(
+                    conn, mask_table, prediction_table, get_mask_words(lottery_name)
+                )
+            if added:
+                print(f"🧩 [{lottery_name}] 号码位图已补齐：新增 {added} 条")
+
 
+def sync_draw_features(lottery_names: list[str]):
+    """按开奖表增量维护开奖特征表（和值 / 跨度 / 奇偶比 / 大小比，供 get_open_info 与走势图读取）"""
+    with pooled_connection() as conn:
+        for lottery_name in lottery_names:
+            with METRICS.stage(lottery_name, "features") as info:
+                result = refresh_features(conn, lottery_name)
+                info["aux_rows_written"] = result["added"] + result["updated"] + result["rebuilt"]
+            if result["rebuilt"]:
+                print(f"📐 [{lottery_name}] 开奖特征表已构建：{result['rebuilt']} 期")
+            elif result["added"] or result["updated"]:
+                print(f"📐 [{lottery_name}] 开奖特征已更新：新增 {result['added']} 期，更正 {result['updated']} 期")
+
+
+def _read_predictions_join(conn, prediction_table: str, lottery_id: int, where_sql: str, where_params: list,
+                           mask_table: str | None = None) -> pd.DataFrame:
+    """通过 JOIN playtype_dict 读取推荐记录（字典不可用时仅使用 playtype_id）"""
+    mask_select, mask_join = mask_join_sql(mask_table)
     try:
         df = pd.read_sql(
             f"""
             SELECT
+                p.issue_name,
                 p.user_id,
                 p.playtype_id,
                 COALESCE(pd.playtype_name, '') AS playtype_name,
-                p.numbers
+                p.numbers{mask_select}
             FROM {prediction_table} AS p
             LEFT JOIN playtype_dict AS pd
               ON pd.playtype_id = p.playtype_id AND pd.lottery_id = %s
-            WHERE p.issue_name = %s
+            {mask_join}
+            {where_sql}
             """,
             conn,
-            params=[lottery_id, issue_name]
+            params=[lottery_id, *where_params]
         )
     except Exception as exc:  # pragma: no cover - 仅作容错
         print(f"⚠️ 获取玩法名称失败（{exc}），将仅使用 playtype_id。")
         df = pd.read_sql(
             f"""
             SELECT
+                p.issue_name,
                 p.user_id,
                 p.playtype_id,
-                p.numbers
+                p.numbers{mask_select}
             FROM {prediction_table} AS p
-            WHERE p.issue_name = %s
+            {mask_join}
+            {where_sql}
             """,
             conn,
-            params=[issue_name]
+            params=where_params or None
         )
         df["playtype_name"] = df["playtype_id"].astype(str)
+    return df
 
-    if df.empty:
-        print(f"⚠️ 无推荐记录：{issue_name}")
-        conn.close()
-        return
 
-    if "playtype_name" not in df.columns:
-        df["playtype_name"] = df["playtype_id"].astype(str)
-    df["playtype_name"] = df["playtype_name"].fillna("").replace({None: ""})
-    missing_name_mask = df["playtype_name"] == ""
-    if missing_name_mask.any():
-        df.loc[missing_name_mask, "playtype_name"] = (
-            df.loc[missing_name_mask, "playtype_id"].astype(str)
+def read_predictions(conn, prediction_table: str, lottery_id: int, issues: list[str] | None = None,
+                     mask_table: str | None = None) -> pd.DataFrame:
+    """
+    读取推荐记录（含期号与玩法名称）。
+    - issues 为空时读取整张表，供 All 批量引擎一次性使用
+    - 玩法名称优先使用缓存的 playtype_dict 映射，缺失时回退为 playtype_id 字符串
+    - mask_table 不为空时同时读取号码位图列（未补齐的行 mask_valid = -1）
+    """
+    where_sql, where_params = _issue_filter("p.issue_name", issues)
+    mask_select, mask_join = mask_join_sql(mask_table)
+    playtype_names = METADATA.playtype_names(conn, lottery_id)
+    if playtype_names is not None:
+        df = pd.read_sql(
+            f"""
+            SELECT
+                p.issue_name,
+                p.user_id,
+                p.playtype_id,
+                p.numbers{mask_select}
+            FROM {prediction_table} AS p
+            {mask_join}
+            {where_sql}
+            """,
+            conn,
+            params=where_params or None
         )
-    df["numbers"] = df["numbers"].fillna("").astype(str)
+        df["playtype_name"] = df["playtype_id"].map(playtype_names).fillna("")
+    else:
+        df = _read_predictions_join(conn, prediction_table, lottery_id, where_sql, where_params, mask_table)
+
+    if df.empty:
+        return df
+    return normalize_predictions(df)
 
-    stat_list = []
 
-    for (user_id, playtype_id), group in df.groupby(["user_id", "playtype_id"]):
-        playtype_name = group["playtype_name"].iloc[0] or str(playtype_id)
-        total_count = len(group)
-        hit_count = 0
-        hit_number_count = 0
+def normalize_predictions(df: pd.DataFrame) -> pd.DataFrame:
+    """玩法名称缺失时回退为 playtype_id 字符串，numbers 统一为字符串；原地转为紧凑布局（见 utils/prediction_frame）"""
+    return compact_predictions(df)
 
-        for _, row in group.iterrows():
-            numbers = row["numbers"]
-            if match_hit(playtype_name, numbers, open_code, blue_code):
-                hit_count += 1
 
-            # ✅ 使用标准命中数字统计逻辑
-            hit_number_count += count_hit_numbers_by_playtype(
-                playtype_name, numbers, open_code, lottery_name
-            )
+# 流式读取时每行实际内存约为 DataFrame 自身的若干倍（位图、命中列、分组索引）
+STREAM_MEMORY_FACTOR = 4
+STREAM_FIRST_CHUNK_ROWS = 5000
+
+
+def stream_predictions(conn, prediction_table: str, lottery_id: int, issues: list[str] | None = None,
+                       memory_budget_mb: int = 256, mask_table: str | None = None):
+    """
+    使用 SSCursor（服务端游标）按期号顺序流式读取推荐记录，逐块 yield DataFrame。
+    - 每块行数按内存预算自适应：根据上一块的实际内存占用估算每行大小
+    - 同一期号的记录连续出现，便于调用方在期号切换时释放已完成期号
+    """
+    where_sql, where_params = _issue_filter("p.issue_name", issues)
+    mask_select, mask_join = mask_join_sql(mask_table)
+    playtype_names = METADATA.playtype_names(conn, lottery_id)
+    plain_sql = f"""
+        SELECT p.issue_name, p.user_id, p.playtype_id, p.numbers{mask_select}
+        FROM {prediction_table} AS p
+        {mask_join}
+        {where_sql}
+        ORDER BY p.issue_name
+    """
+    join_sql = f"""
+        SELECT p.issue_name, p.user_id, p.playtype_id,
+               COALESCE(pd.playtype_name, '') AS playtype_name, p.numbers{mask_select}
+        FROM {prediction_table} AS p
+        LEFT JOIN playtype_dict AS pd
+          ON pd.playtype_id = p.playtype_id AND pd.lottery_id = %s
+        {mask_join}
+        {where_sql}
+        ORDER BY p.issue_name
+    """
 
-        avg_hit_gap = round(total_count / hit_count, 2) if hit_count else None
+    budget_bytes = max(int(memory_budget_mb), 1) * 1024 * 1024
+    chunk_rows = STREAM_FIRST_CHUNK_ROWS
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        if playtype_names is None:
+            try:
+                cursor.execute(join_sql, [lottery_id, *where_params])
+            except Exception as exc:  # pragma: no cover - 仅作容错
+                print(f"⚠️ 获取玩法名称失败（{exc}），将仅使用 playtype_id。")
+                playtype_names = {}
+                cursor.execute(plain_sql, where_params or None)
+        else:
+            cursor.execute(plain_sql, where_params or None)
+        columns = [col[0] for col in cursor.description]
 
-        stat_list.append({
-            "lottery_id": lottery_id,
-            "issue_name": issue_name,
-            "user_id": user_id,
-            "playtype_id": playtype_id,
-            "total_count": total_count,
-            "hit_count": hit_count,
-            "hit_number_count": hit_number_count,
-            "avg_hit_gap": avg_hit_gap
-        })
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            df = pd.DataFrame(list(rows), columns=columns)
+            if playtype_names is not None:
+                df["playtype_name"] = df["playtype_id"].map(playtype_names).fillna("")
+            df["issue_name"] = df["issue_name"].astype(str)
+            df = normalize_predictions(df)
+
+            bytes_per_row = df.memory_usage(deep=True).sum() / len(df)
+            chunk_rows = max(int(budget_bytes / (bytes_per_row * STREAM_MEMORY_FACTOR)), 1000)
+            yield df
+
+
+def read_draws(conn, lottery_name: str, issues: list[str] | None = None) -> dict[str, DrawEntry]:
+    """
+    读取开奖号码，返回 {期号: DrawEntry}（前两项即 open_code, blue_code）。
+    - 使用进程内共享的开奖索引：每个彩种只加载一次，新期号按期号范围增量刷新
+    - 同一期号存在多行时取第一行，与单期模式 iloc[0] 保持一致
+    """
+    return get_draw_index(lottery_name).draws(conn, issues)
+
+
+def update_hit_stat(lottery_name: str, issue_name: str, options: RunOptions = DEFAULT_OPTIONS) -> int:
+    """单期计算并写入命中汇总，返回写入条数（阶段耗时、单期延迟与区间峰值内存记入 METRICS）"""
+    start = time.perf_counter()
+    with track_peak({}) as memory:
+        written = _update_hit_stat(lottery_name, issue_name, options)
+    METRICS.record(
+        "issue", lottery_name, issue=issue_name, seconds=time.perf_counter() - start, rows_written=written,
+        peak_rss_mb=memory.get("peak_rss_mb")
+    )
+    return written
+
+
+def _update_hit_stat(lottery_name: str, issue_name: str, options: RunOptions) -> int:
+    with open_connection(options) as conn:
+        prediction_table = get_prediction_table(lottery_name)
+        hit_stat_table = get_hit_stat_table(lottery_name)
+        lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+
+        if lottery_id is None:
+            print(f"❌ 未知彩种：{lottery_name}")
+            return 0
+
+        with METRICS.stage(lottery_name, "read_draws", issue_name):
+            draws = read_draws(conn, lottery_name, [issue_name])
+        if not draws:
+            print(f"⚠️ 未找到开奖号码：{issue_name}")
+            return 0
+
+        # ✅ 查推荐
+        prediction_columns = METADATA.columns(conn, prediction_table)
+        if "playtype_id" not in prediction_columns:
+            print(f"❌ {prediction_table} 缺少 playtype_id 字段，请先完成数据库迁移。")
+            return 0
+
+        stat_list = lookup_outcome_stats(conn, lottery_name, issue_name, next(iter(draws.values())), options)
+        if stat_list is None:
+            stat_list = compute_issue_stats(conn, lottery_name, issue_name, draws, options)
+            if stat_list is None:
+                return 0
+
+        with METRICS.stage(lottery_name, "write", issue_name) as info:
+            written = info["rows_written"] = write_hit_stats(conn, lottery_name, stat_list, options, info, [issue_name])
+        report_stat_diff(lottery_name, info, options, issue_name)
+        print(f"✅ 已写入：{hit_stat_table} / {issue_name}")
+        return written
+
+
+def lookup_outcome_stats(conn, lottery_name: str, issue_name: str, entry: DrawEntry,
+                         options: RunOptions) -> list[dict] | None:
+    """开奖前已构建结果空间命中矩阵且推荐未变化时直接查表，否则返回 None"""
+    if not options.outcome_matrix or options.eval_mode != "vector" or lottery_name not in OUTCOME_DIGITS:
+        return None
+    prediction_table = get_prediction_table(lottery_name)
+    with METRICS.stage(lottery_name, "outcome_lookup", issue_name) as info:
+        has_id = "id" in METADATA.columns(conn, prediction_table)
+        state = prediction_state(conn, prediction_table, issue_name, has_id)
+        stat_list = lookup_hit_stats(
+            conn, lottery_name, issue_name, entry.open_code, entry.blue_code,
+            LOTTERY_ID_MAP[lottery_name], state
+        )
+        info["hit"] = stat_list is not None
+    if stat_list is not None:
+        print(f"🎲 期号：{issue_name} - 结果空间矩阵查表 {len(stat_list)} 条")
+    return stat_list
+
+
+def compute_issue_stats(conn, lottery_name: str, issue_name: str, draws: dict[str, DrawEntry],
+                        options: RunOptions) -> list[dict] | None:
+    """读取单期推荐并计算命中汇总；无推荐时返回 None"""
+    prediction_table = get_prediction_table(lottery_name)
+    lottery_id = LOTTERY_ID_MAP[lottery_name]
+    with METRICS.stage(lottery_name, "read_predictions", issue_name) as info:
+        mask_table = resolve_mask_table(conn, lottery_name, options)
+        df = read_predictions(conn, prediction_table, lottery_id, [issue_name], mask_table)
+        info["rows_read"] = len(df)
+        info["frame_mb"] = round(frame_mb(df), 2)
+    if df.empty:
+        print(f"⚠️ 无推荐记录：{issue_name}")
+        return None
+
+    # 统一按传入期号归组（与开奖表期号一致）
+    df["issue_name"] = issue_name
+    draws = {issue_name: next(iter(draws.values()))}
+    dedup_stats: list[dict] = []
+    with METRICS.stage(lottery_name, "compute", issue_name):
+        stat_list = compute_hit_stats(df, lottery_name, lottery_id, draws, options.eval_mode, dedup_stats)
 
     print(f"📌 期号：{issue_name} - 生成 {len(stat_list)} 条")
+    report_dedup_stats(lottery_name, dedup_stats, per_issue=True)
+    return stat_list
 
-    with conn.cursor() as cursor:
-        for row in stat_list:
-            cursor.execute(
-                f"""
-                INSERT INTO {hit_stat_table}
-                (lottery_id, issue_name, playtype_id, user_id,
-                 total_count, hit_count, hit_number_count, avg_hit_gap)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    total_count = VALUES(total_count),
-                    hit_count = VALUES(hit_count),
-                    hit_number_count = VALUES(hit_number_count),
-                    avg_hit_gap = VALUES(avg_hit_gap)
-                """,
-                (
-                    row["lottery_id"],
-                    row["issue_name"],
-                    row["playtype_id"],
-                    row["user_id"],
-                    row["total_count"],
-                    row["hit_count"],
-                    row["hit_number_count"],
-                    row["avg_hit_gap"]
-                )
+
+def run_all(lottery_name: str, options: RunOptions = DEFAULT_OPTIONS, issues: list[str] | None = None) -> int:
+    """
+    全量模式（批量引擎）：
+    - 一次读取该彩种全部开奖号码与全部推荐记录（issues 不为空时仅读取这些期号）
+    - 按 期号 + 专家 + 玩法 一次分组计算
+    - 批量写回 expert_hit_stat_xxx，返回写入条数
+    结果与逐期调用 update_hit_stat 完全一致。
+    """
+    with open_connection(options) as conn:
+        prediction_table = get_prediction_table(lottery_name)
+        hit_stat_table = get_hit_stat_table(lottery_name)
+        lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+
+        if lottery_id is None:
+            print(f"❌ 未知彩种：{lottery_name}")
+            return 0
+
+        prediction_columns = METADATA.columns(conn, prediction_table)
+        if "playtype_id" not in prediction_columns:
+            print(f"❌ {prediction_table} 缺少 playtype_id 字段，请先完成数据库迁移。")
+            return 0
+
+        run_start = time.perf_counter()
+        reset_peak()
+        with METRICS.stage(lottery_name, "read_draws"):
+            draws = read_draws(conn, lottery_name, issues)
+        with METRICS.stage(lottery_name, "read_predictions") as info:
+            mask_table = resolve_mask_table(conn, lottery_name, options)
+            df = read_predictions(conn, prediction_table, lottery_id, issues, mask_table)
+            info["rows_read"] = len(df)
+            info["frame_mb"] = df_mb = round(frame_mb(df), 2)
+        df["issue_name"] = df["issue_name"].astype(str)
+        all_issues = sorted(df["issue_name"].unique().tolist())
+
+        print(f"🚀 [{lottery_name}] 共找到 {len(all_issues)} 期，开始全量...")
+        missing_issues = [issue for issue in all_issues if issue not in draws]
+        for issue in missing_issues:
+            print(f"⚠️ 未找到开奖号码：{issue}")
+        if missing_issues:
+            df = df[df["issue_name"].isin(draws.keys())]
+
+        dedup_stats: list[dict] = []
+        with METRICS.stage(lottery_name, "compute"):
+            stat_list = compute_hit_stats(df, lottery_name, lottery_id, draws, options.eval_mode, dedup_stats)
+        print(f"📌 [{lottery_name}] 计算完成：{len(all_issues) - len(missing_issues)} 期，生成 {len(stat_list)} 条")
+        report_dedup_stats(lottery_name, dedup_stats)
+
+        computed_issues = [issue for issue in all_issues if issue in draws]
+        with METRICS.stage(lottery_name, "write") as info:
+            written = info["rows_written"] = write_hit_stats(
+                conn, lottery_name, stat_list, options, info, computed_issues, options.checkpoint
             )
-    conn.commit()
-    conn.close()
-    print(f"✅ 已写入：{hit_stat_table} / {issue_name}")
+        report_stat_diff(lottery_name, info, options)
+        print(f"✅ 已写入：{hit_stat_table}（{written} 条）")
+        peak = report_memory(lottery_name, df_mb)
+        METRICS.record(
+            "lottery", lottery_name, issues=len(all_issues) - len(missing_issues),
+            seconds=time.perf_counter() - run_start, rows_written=written, peak_rss_mb=peak
+        )
+        return written
 
 
-def run_all(lottery_name: str):
-    conn = get_connection()
+def run_all_streaming(lottery_name: str, options: RunOptions = DEFAULT_OPTIONS, issues: list[str] | None = None) -> int:
+    """
+    全量模式（流式引擎）：
+    - 服务端游标按期号顺序分块读取推荐记录，每块大小受 memory_budget_mb 限制
+    - 每块计算分组计数并增量累加，期号读取完整后立即汇总写入并释放
+    峰值内存与表大小、期号范围无关；结果与批量引擎一致。
+    """
     prediction_table = get_prediction_table(lottery_name)
-    issue_df = pd.read_sql(
-        f"SELECT DISTINCT issue_name FROM {prediction_table} ORDER BY issue_name ASC",
-        conn
+    hit_stat_table = get_hit_stat_table(lottery_name)
+    lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+
+    if lottery_id is None:
+        print(f"❌ 未知彩种：{lottery_name}")
+        return 0
+
+    with open_connection(options) as read_conn, open_connection(options) as write_conn:
+        prediction_columns = METADATA.columns(read_conn, prediction_table)
+        if "playtype_id" not in prediction_columns:
+            print(f"❌ {prediction_table} 缺少 playtype_id 字段，请先完成数据库迁移。")
+            return 0
+
+        run_start = time.perf_counter()
+        reset_peak()
+        with METRICS.stage(lottery_name, "read_draws"):
+            draws = read_draws(read_conn, lottery_name, issues)
+        accumulator = HitStatAccumulator(lottery_id)
+        writer = create_writer(
+            options.writer, write_conn, hit_stat_table, options.batch_size, options.commit_mode
+        )
+        print(f"🚀 [{lottery_name}] 流式全量开始（内存预算 {options.memory_budget_mb} MB）...")
+
+        seen_issues: set[str] = set()
+        missing_issues: set[str] = set()
+        dedup_stats: list[dict] = []
+        total_rows = 0
+        chunk_count = 0
+        chunk_mb = 0.0
+        # 读取 / 计算 / 写入交替进行：按阶段累计耗时，结束时各记一条
+        stage_seconds = {"read_predictions": 0.0, "compute": 0.0, "write": 0.0}
+        write_info: dict = {}
+        mask_table = resolve_mask_table(read_conn, lottery_name, options)
+        chunks = stream_predictions(read_conn, prediction_table, lottery_id, issues,
+                                    options.memory_budget_mb, mask_table)
+        while True:
+            tick = time.perf_counter()
+            chunk = next(chunks, None)
+            stage_seconds["read_predictions"] += time.perf_counter() - tick
+            if chunk is None:
+                break
+            chunk_count += 1
+            total_rows += len(chunk)
+            chunk_mb = max(chunk_mb, frame_mb(chunk))
+            chunk_issues = chunk["issue_name"].unique().tolist()
+            for issue in chunk_issues:
+                if issue not in seen_issues:
+                    seen_issues.add(issue)
+                    if issue not in draws:
+                        missing_issues.add(issue)
+                        print(f"⚠️ 未找到开奖号码：{issue}")
+            if missing_issues:
+                chunk = chunk[~chunk["issue_name"].isin(missing_issues)]
+
+            tick = time.perf_counter()
+            accumulator.add(partial_hit_counts(chunk, lottery_name, draws, options.eval_mode, dedup_stats))
+            stage_seconds["compute"] += time.perf_counter() - tick
+
+            # 按期号排序读取：本块最后一个期号之前的期号均已完整
+            last_issue = chunk_issues[-1]
+            completed = [issue for issue in accumulator.pending_issues() if issue != last_issue]
+            if completed:
+                tick = time.perf_counter()
+                stat_list = accumulator.pop(completed)
+                write_stat_batch(
+                    write_conn, writer, lottery_name, stat_list, options, write_info, completed, options.checkpoint
+                )
+                stage_seconds["write"] += time.perf_counter() - tick
+
+        tick = time.perf_counter()
+        stat_list = accumulator.pop_all()
+        write_stat_batch(write_conn, writer, lottery_name, stat_list, options, write_info, checkpoint=options.checkpoint)
+        writer.close()
+        stage_seconds["write"] += time.perf_counter() - tick
+        WRITE_THROUGHPUT.record(lottery_name, writer)
+
+    chunk_mb = round(chunk_mb, 2)
+    METRICS.record_stage(
+        lottery_name, "read_predictions", stage_seconds["read_predictions"], rows_read=total_rows, frame_mb=chunk_mb
+    )
+    METRICS.record_stage(lottery_name, "compute", stage_seconds["compute"])
+    METRICS.record_stage(lottery_name, "write", stage_seconds["write"], rows_written=writer.rows_written, **write_info)
+    peak = report_memory(lottery_name, chunk_mb, "单块推荐帧")
+    METRICS.record(
+        "lottery", lottery_name, issues=len(seen_issues) - len(missing_issues),
+        seconds=time.perf_counter() - run_start, rows_written=writer.rows_written, chunks=chunk_count,
+        peak_rss_mb=peak
     )
-    all_issues = issue_df["issue_name"].tolist()
-    conn.close()
 
-    print(f"🚀 [{lottery_name}] 共找到 {len(all_issues)} 期，开始全量...")
-    for idx, issue in enumerate(all_issues, 1):
-        print(f"\n=== [{idx}/{len(all_issues)}] 期号：{issue} ===")
-        update_hit_stat(lottery_name, issue)
+    print(
+        f"📌 [{lottery_name}] 流式计算完成：{len(seen_issues) - len(missing_issues)} 期，"
+        f"{total_rows} 条推荐 / {chunk_count} 块"
+    )
+    report_dedup_stats(lottery_name, dedup_stats)
+    report_stat_diff(lottery_name, write_info, options)
+    print(f"✅ 已写入：{hit_stat_table}（{writer.rows_written} 条）")
+    return writer.rows_written
 
 
-def run_today(lottery_name: str):
-    conn = get_connection()
+def run_pipelined(lottery_name: str, issues: list[str], options: RunOptions, group_size: int = 1,
+                  progress: dict[str, IssueSnapshot] | None = None) -> dict:
+    """
+    流水线引擎：期号按 group_size 分组，预读线程读取下一组时计算当前组、写入线程提交上一组。
+    - 每组的计算口径与 run_all 相同，每组单独提交（断点 / Today 进度随组写入）
+    - group_size = 1 时每期记录单期延迟（Today），否则记录一条 lottery 事件（全量）
+    返回 {"written", "failed_issues"}：失败的多期组逐期重试，仅记录真正失败的期号
+    """
     prediction_table = get_prediction_table(lottery_name)
-    result_table = get_result_table(lottery_name)
     hit_stat_table = get_hit_stat_table(lottery_name)
     lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+    if lottery_id is None:
+        print(f"❌ 未知彩种：{lottery_name}")
+        return {"written": 0, "failed_issues": []}
+
+    with pooled_connection() as conn:
+        if "playtype_id" not in METADATA.columns(conn, prediction_table):
+            print(f"❌ {prediction_table} 缺少 playtype_id 字段，请先完成数据库迁移。")
+            return {"written": 0, "failed_issues": []}
+        mask_table = resolve_mask_table(conn, lottery_name, options)
+
+    group_size = max(group_size, 1)
+    groups = [tuple(issues[start:start + group_size]) for start in range(0, len(issues), group_size)]
+    label = (lambda group: group[0]) if group_size == 1 else (lambda group: None)
+    reporter = ProgressReporter(len(issues))
+    frame_sizes: list[float] = []
+
+    def read(group, _, conn):
+        started = time.perf_counter()
+        with METRICS.stage(lottery_name, "read_draws", label(group)):
+            draws = read_draws(conn, lottery_name, list(group))
+        with METRICS.stage(lottery_name, "read_predictions", label(group)) as info:
+            df = read_predictions(conn, prediction_table, lottery_id, list(group), mask_table)
+            info["rows_read"] = len(df)
+            info["frame_mb"] = round(frame_mb(df), 2)
+            frame_sizes.append(info["frame_mb"])
+        return started, draws, df
+
+    def compute(group, value):
+        started, draws, df = value
+        if df.empty:
+            print(f"⚠️ 无推荐记录：{group[0]} → {group[-1]}")
+            return started, [], []
+        df["issue_name"] = df["issue_name"].astype(str)
+        for issue in sorted(set(df["issue_name"]) - draws.keys()):
+            print(f"⚠️ 未找到开奖号码：{issue}")
+        df = df[df["issue_name"].isin(draws.keys())]
+        computed = sorted(df["issue_name"].unique().tolist())
+        dedup_stats: list[dict] = []
+        with METRICS.stage(lottery_name, "compute", label(group)):
+            stat_list = compute_hit_stats(df, lottery_name, lottery_id, draws, options.eval_mode, dedup_stats)
+        report_dedup_stats(lottery_name, dedup_stats, per_issue=group_size == 1)
+        return started, computed, stat_list
+
+    def write(group, value, conn):
+        started, computed, stat_list = value
+        # 失败时由流水线以异常归还连接（连接池回滚未提交的部分或丢弃已断开的连接），下一组重新借出
+        with METRICS.stage(lottery_name, "write", label(group)) as info:
+            written = info["rows_written"] = write_hit_stats(
+                conn, lottery_name, stat_list, options, info, computed, options.checkpoint
+            )
+        report_stat_diff(lottery_name, info, options, label(group))
+        if progress and not options.verify:
+            record_progress(conn, get_hit_progress_table(lottery_name),
+                            {issue: progress[issue] for issue in group if issue in progress})
+        if group_size == 1:
+            METRICS.record(
+                "issue", lottery_name, issue=group[0], seconds=time.perf_counter() - started, rows_written=written
+            )
+        return written
+
+    def on_done(group, _, error):
+        print(f"{'❌' if error else '✅'} {lottery_name} {group[0]} → {group[-1]}：{reporter.update(len(group))}")
 
-    open_df = pd.read_sql(f"SELECT DISTINCT issue_name FROM {result_table}", conn)
-    open_issues = set(open_df["issue_name"].tolist())
+    print(f"🚀 [{lottery_name}] 流水线开始：{len(issues)} 期 / {len(groups)} 组，缓冲 {options.pipeline_depth} 组")
+    run_start = time.perf_counter()
+    reset_peak()
+    result = run_pipeline(
+        groups,
+        [
+            Stage("read", read, resource=pooled_connection),
+            Stage("compute", compute),
+            Stage("write", write, resource=lambda: open_connection(options)),
+        ],
+        depth=options.pipeline_depth,
+        on_done=on_done,
+    )
+    written = sum(result.values.values())
+    # 三个阶段并发，峰值只能按整次流水线记录
+    peak = report_memory(lottery_name, max(frame_sizes, default=0.0), "单组推荐帧")
+    METRICS.record(
+        "pipeline", lottery_name, wall=result.wall, depth=options.pipeline_depth,
+        bottleneck=result.bottleneck, stages=result.utilization(), peak_rss_mb=peak
+    )
+    print(f"🔧 [{lottery_name}] 流水线利用率：{result.describe()}")
 
-    pred_df = pd.read_sql(f"SELECT DISTINCT issue_name FROM {prediction_table}", conn)
-    pred_issues = set(pred_df["issue_name"].tolist())
+    failed_issues: list[str] = []
+    for group, error in result.failures:
+        if len(group) == 1:
+            failed_issues.append(group[0])
+            continue
+        print(f"⚠️ 分组失败（{error}），改为逐期重试：{group[0]} → {group[-1]}")
+        for issue in group:
+            try:
+                written += update_hit_stat(lottery_name, issue, options)
+                if options.checkpoint and not options.verify:
+                    record_checkpoints(lottery_name, [issue])
+            except Exception as issue_exc:
+                print(f"❌ 期号失败：{issue}（{type(issue_exc).__name__}: {issue_exc}）")
+                failed_issues.append(issue)
 
-    stat_columns = get_table_columns(conn, hit_stat_table)
-    if "lottery_id" in stat_columns and lottery_id is not None:
-        stat_df = pd.read_sql(
-            f"SELECT DISTINCT issue_name FROM {hit_stat_table} WHERE lottery_id = %s",
-            conn, params=[lottery_id]
+    if group_size > 1:
+        METRICS.record(
+            "lottery", lottery_name, issues=len(issues) - len(failed_issues),
+            seconds=time.perf_counter() - run_start, rows_written=written
         )
-    else:
-        stat_df = pd.read_sql(f"SELECT DISTINCT issue_name FROM {hit_stat_table}", conn)
+    print(f"✅ 已写入：{hit_stat_table}（{written} 条）")
+    return {"written": written, "failed_issues": failed_issues}
+
+
+# ✅ 本进程已打开的列式快照
+_SNAPSHOTS: dict[str, Snapshot] = {}
+
+
+def get_snapshot(root: str) -> Snapshot:
+    snapshot = _SNAPSHOTS.get(root)
+    if snapshot is None:
+        snapshot = _SNAPSHOTS[root] = Snapshot(root)
+    return snapshot
+
+
+def run_snapshot(lottery_name: str, options: RunOptions = DEFAULT_OPTIONS, issues: list[str] | None = None) -> int:
+    """
+    快照引擎：从列式快照读取推荐与开奖（内存映射、列裁剪、按期号分区过滤），计算口径与 run_all 相同。
+    - snapshot_write = parquet：结果按期号分区写入快照 stats/ 目录，全程不连接数据库
+    - snapshot_write = db：结果写入 expert_hit_stat_xxx（与 run_all 相同的写入器）
+    """
+    lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+    if lottery_id is None:
+        print(f"❌ 未知彩种：{lottery_name}")
+        return 0
 
-    stat_issues = set(stat_df["issue_name"].tolist())
-    todo_issues = sorted(list(open_issues & pred_issues - stat_issues))
+    snapshot = get_snapshot(options.snapshot_dir)
+    run_start = time.perf_counter()
+    with METRICS.stage(lottery_name, "read_draws"):
+        draws = snapshot.read_draws(lottery_name, issues)
+    with METRICS.stage(lottery_name, "read_predictions") as info:
+        df = snapshot.read_predictions(lottery_name, lottery_id, issues)
+        info["rows_read"] = len(df)
+    if df.empty:
+        print(f"⚠️ [{lottery_name}] 快照中无推荐记录")
+        return 0
+
+    df = normalize_predictions(df)
+    df["issue_name"] = df["issue_name"].astype(str)
+    all_issues = sorted(df["issue_name"].unique().tolist())
+    print(f"🚀 [{lottery_name}] 快照共 {len(all_issues)} 期，开始计算...")
+    missing_issues = [issue for issue in all_issues if issue not in draws]
+    for issue in missing_issues:
+        print(f"⚠️ 未找到开奖号码：{issue}")
+    if missing_issues:
+        df = df[df["issue_name"].isin(draws.keys())]
+
+    dedup_stats: list[dict] = []
+    with METRICS.stage(lottery_name, "compute"):
+        stat_list = compute_hit_stats(df, lottery_name, lottery_id, draws, options.eval_mode, dedup_stats)
+    print(f"📌 [{lottery_name}] 计算完成：{len(all_issues) - len(missing_issues)} 期，生成 {len(stat_list)} 条")
+    report_dedup_stats(lottery_name, dedup_stats, per_issue=issues is not None and len(issues) == 1)
+
+    with METRICS.stage(lottery_name, "write") as info:
+        if options.snapshot_write == "db":
+            computed_issues = [issue for issue in all_issues if issue in draws]
+            with open_connection(options) as conn:
+                written = write_hit_stats(
+                    conn, lottery_name, stat_list, options, info, computed_issues, options.checkpoint
+                )
+            target = get_hit_stat_table(lottery_name)
+        else:
+            written = snapshot.write_stats(lottery_name, stat_list)
+            target = f"{options.snapshot_dir}/stats/{get_hit_stat_table(lottery_name)}"
+        info["rows_written"] = written
+    report_stat_diff(lottery_name, info, options)
+    print(f"✅ 已写入：{target}（{written} 条）")
+    METRICS.record(
+        "lottery", lottery_name, issues=len(all_issues) - len(missing_issues),
+        seconds=time.perf_counter() - run_start, rows_written=written
+    )
+    return written
 
+
+def find_today_issues(conn, lottery_name: str, lookback: int = DEFAULT_LOOKBACK) -> dict[str, IssueSnapshot]:
+    """
+    找出需要（重新）计算的期号，返回 {期号: 当前状态}（按期号排序）。
+    - 进度表有记录时：按水位范围查询新期号、迟到推荐与回看窗口内的变更
+    - 进度表为空时：原 DISTINCT 逻辑（已开奖、有推荐但尚未汇总），并补齐已汇总期号的进度
+    """
+    prediction_table = get_prediction_table(lottery_name)
+    hit_stat_table = get_hit_stat_table(lottery_name)
+    progress_table = get_hit_progress_table(lottery_name)
+    lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+
+    ensure_progress_table(conn, progress_table)
+    has_id = "id" in METADATA.columns(conn, prediction_table)
+
+    print(f"✅ 模式：Today（增量模式）")
+    print(f"🎯 彩种：{lottery_name}")
+
+    todo, stats = find_changed_issues(conn, progress_table, lottery_name, prediction_table, has_id, lookback)
+    if todo is None:
+        stat_columns = METADATA.columns(conn, hit_stat_table)
+        if "lottery_id" in stat_columns and lottery_id is not None:
+            stat_df = pd.read_sql(
+                f"SELECT DISTINCT issue_name FROM {hit_stat_table} WHERE lottery_id = %s",
+                conn, params=[lottery_id]
+            )
+        else:
+            stat_df = pd.read_sql(f"SELECT DISTINCT issue_name FROM {hit_stat_table}", conn)
+        stat_issues = {str(issue) for issue in stat_df["issue_name"].tolist()}
+        todo = bootstrap_progress(conn, progress_table, lottery_name, prediction_table, stat_issues, has_id)
+        todo = dict(sorted(todo.items()))
+        print(f"🧭 进度表为空，已按现有汇总补齐进度：{len(stat_issues)} 期")
+    else:
+        print(f"🧭 新期号 {stats['new']} 期，迟到推荐 {stats['late']} 期，回看窗口内变更 {stats['changed']} 期")
+
+    todo_issues = list(todo)
+    # 待计算期号的开奖号码可能已更正：让进程内开奖索引重新读取
+    get_draw_index(lottery_name).invalidate(todo_issues)
     if todo_issues:
-        print(f"✅ 模式：Today（增量模式）")
-        print(f"🎯 彩种：{lottery_name}")
         print(f"📅 新增期号数量：{len(todo_issues)}")
         print(f"📈 范围：{todo_issues[0]} → {todo_issues[-1]}")
     else:
-        print(f"✅ 模式：Today（增量模式）")
-        print(f"🎯 彩种：{lottery_name}")
         print("📭 无新增期号，无需更新。")
+    return todo
+
+
+def record_issue_progress(lottery_name: str, snapshots: dict[str, IssueSnapshot]):
+    """期号汇总成功后记录其状态，下次 Today 不再重复计算"""
+    with pooled_connection() as conn:
+        record_progress(conn, get_hit_progress_table(lottery_name), snapshots)
+
+
+def reset_issue_progress(lottery_names: list[str]):
+    """全量重算后清空进度表，下次 Today 按现有汇总重新补齐"""
+    with pooled_connection() as conn:
+        for lottery_name in lottery_names:
+            clear_progress(conn, get_hit_progress_table(lottery_name))
+
+
+def refresh_rolling_stats(lottery_name: str, issues: list[str] | None = None):
+    """
+    更新专家滚动表现表：issues 为 None 时按全部历史重建，否则按期号顺序增量更新
+    """
+    rolling_table = get_hit_rolling_table(lottery_name)
+    hit_stat_table = get_hit_stat_table(lottery_name)
+    lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+
+    with pooled_connection() as conn, METRICS.stage(lottery_name, "rolling"):
+        ensure_rolling_table(conn, rolling_table)
+        if issues is None:
+            count = rebuild_rolling_stats(conn, rolling_table, hit_stat_table, lottery_id)
+            print(f"📈 [{lottery_name}] 滚动表现已重建：{count} 个专家玩法")
+        else:
+            result = update_rolling_stats(conn, rolling_table, hit_stat_table, lottery_id, sorted(issues))
+            print(
+                f"📈 [{lottery_name}] 滚动表现已更新：增量 {result['updated']} 个，"
+                f"乱序重放 {result['replayed']} 个，删除 {result['removed']} 个专家玩法"
+            )
+
+
+def refresh_rolling_after_tasks(tasks: list, failures: list[tuple[str, str]], rebuild: bool = False):
+    """
+    任务全部结束后在主进程中统一更新滚动表现（并行任务完成顺序不确定，需按期号顺序叠加）
+    - 全量任务：重建该彩种
+    - 单期任务：按成功的期号增量更新（rebuild=True 时改为重建）
+    """
+    failed = set(failures)
+    issues_by_lottery: dict[str, list[str] | None] = {}
+    for task in tasks:
+        if task.kind not in ("issue", "issues") or rebuild:
+            issues_by_lottery[task.lottery_name] = None
+        elif issues_by_lottery.get(task.lottery_name, []) is not None:
+            issues_by_lottery.setdefault(task.lottery_name, []).extend(
+                issue for issue in task.issues if (task.lottery_name, issue) not in failed
+            )
+
+    for lottery_name, issues in issues_by_lottery.items():
+        if issues is None or issues:
+            refresh_rolling_stats(lottery_name, issues)
+
+
+def run_today(lottery_name: str, options: RunOptions = DEFAULT_OPTIONS):
+    with pooled_connection() as conn, METRICS.stage(lottery_name, "find_today"):
+        todo = find_today_issues(conn, lottery_name, options.today_lookback)
+
+    for idx, (issue, snapshot) in enumerate(todo.items(), 1):
+        print(f"\n=== [{idx}/{len(todo)}] 增量期号：{issue} ===")
+        update_hit_stat(lottery_name, issue, options)
+        if not options.verify:
+            record_issue_progress(lottery_name, {issue: snapshot})
+    if not options.verify:
+        refresh_rolling_stats(lottery_name, list(todo))
+
+
+def run_predraw(lottery_names: list[str], options: RunOptions) -> list[tuple[str, str]]:
+    """
+    开奖前：为尚未开奖的期号构建结果空间命中矩阵（仅福彩3D / 排列3 / 排列5），返回失败期号
+    - 推荐数与最大推荐 ID 均未变化的期号跳过，可在开奖前反复执行
+    - 早于最新开奖期号的矩阵已无用，顺带删除
+    """
+    failures: list[tuple[str, str]] = []
+    for lottery_name in lottery_names:
+        if lottery_name not in OUTCOME_DIGITS:
+            continue
+        prediction_table = get_prediction_table(lottery_name)
+        lottery_id = LOTTERY_ID_MAP[lottery_name]
+        with pooled_connection() as conn:
+            has_id = "id" in METADATA.columns(conn, prediction_table)
+            ensure_outcome_tables(conn, lottery_name)
+            latest_issue = latest_draw_issue(conn, lottery_name)
+            pruned = prune_outcome_matrices(conn, lottery_name, latest_issue)
+            issues = pending_outcome_issues(conn, lottery_name, prediction_table, latest_issue)
+            print(f"🎲 [{lottery_name}] 最新开奖 {latest_issue}，待开奖期号 {len(issues)} 期，清理已开奖矩阵 {pruned} 期")
+
+            for issue in issues:
+                # 先取状态再读推荐：期间新增的推荐只会让状态偏旧，开奖后比对不一致时回退到正常计算
+                state = prediction_state(conn, prediction_table, issue, has_id)
+                if stored_state(conn, lottery_name, issue) == state:
+                    print(f"⏩ [{lottery_name}] 期号 {issue}：推荐未变化，跳过")
+                    continue
+                try:
+                    with METRICS.stage(lottery_name, "predraw", issue) as info:
+                        mask_table = resolve_mask_table(conn, lottery_name, options)
+                        df = read_predictions(conn, prediction_table, lottery_id, [issue], mask_table)
+                        info["rows_read"] = len(df)
+                        matrix = build_outcome_matrix(df, lottery_name)
+                        info["aux_rows_written"] = store_outcome_matrix(conn, lottery_name, issue, matrix, state)
+                except Exception as exc:
+                    conn.rollback()
+                    print(f"❌ [{lottery_name}] 期号 {issue} 结果空间矩阵构建失败：{type(exc).__name__}: {exc}")
+                    failures.append((lottery_name, issue))
+                    continue
+                print(f"🎲 [{lottery_name}] 期号 {issue}：{len(df)} 条推荐 → {len(matrix)} 个专家玩法的结果空间矩阵")
+    return failures
+
+
+@dataclass
+class StatTask:
+    """
+    并行执行单元
+    - kind = "all"：批量引擎计算 issues 中的期号（issues 为空表示该彩种全部期号）
+    - kind = "issue"：单期计算 issues[0]
+    - kind = "issues"：流水线逐期计算 issues（Today）
+    - progress：Today 检测到的期号状态，计算成功后写入进度表（issues 任务为 {期号: 状态}）
+    """
+    kind: str
+    lottery_name: str
+    issues: list[str] | None = None
+    progress: IssueSnapshot | dict[str, IssueSnapshot] | None = None
+
+    def label(self) -> str:
+        if self.kind == "issue":
+            return f"{self.lottery_name} 期号：{self.issues[0]}"
+        if self.kind == "issues":
+            return f"{self.lottery_name} 流水线：{self.issues[0]} → {self.issues[-1]}（{len(self.issues)} 期）"
+        if self.issues is None:
+            return f"{self.lottery_name} 全量"
+        return f"{self.lottery_name} 全量分片：{self.issues[0]} → {self.issues[-1]}（{len(self.issues)} 期）"
+
+
+def run_stat_task(task: StatTask, options: RunOptions) -> dict:
+    """
+    执行单个任务（可在子进程中运行），返回写入条数、失败期号与写入吞吐。
+    全量分片整体失败时逐期重试，仅记录真正失败的期号。
+    """
+    before = WRITE_THROUGHPUT.snapshot()
+    metrics_mark = METRICS.mark()
+    failed_issues: list[str] = []
+    written = 0
+
+    if options.snapshot_dir:
+        written = run_snapshot(task.lottery_name, options, task.issues)
+    elif options.pipeline and task.issues:
+        group_size = 1 if task.kind == "issues" else options.issues_per_task
+        progress = task.progress if task.kind == "issues" else None
+        result = run_pipelined(task.lottery_name, task.issues, options, group_size, progress)
+        written, failed_issues = result["written"], result["failed_issues"]
+    elif task.kind == "issue":
+        written = update_hit_stat(task.lottery_name, task.issues[0], options)
+        if task.progress is not None and not options.verify:
+            record_issue_progress(task.lottery_name, {task.issues[0]: task.progress})
+    else:
+        try:
+            run = run_all_streaming if options.stream else run_all
+            written = run(task.lottery_name, options, task.issues)
+        except Exception as exc:
+            if not task.issues or len(task.issues) == 1:
+                raise
+            print(f"⚠️ 分片批量计算失败（{type(exc).__name__}: {exc}），改为逐期重试")
+            for issue in task.issues:
+                try:
+                    written += update_hit_stat(task.lottery_name, issue, options)
+                    if options.checkpoint and not options.verify:
+                        record_checkpoints(task.lottery_name, [issue])
+                except Exception as issue_exc:
+                    print(f"❌ 期号失败：{issue}（{type(issue_exc).__name__}: {issue_exc}）")
+                    failed_issues.append(issue)
+
+    return {
+        "written": written,
+        "failed_issues": failed_issues,
+        "throughput": WRITE_THROUGHPUT.delta(before),
+        "metrics": METRICS.since(metrics_mark),
+    }
+
+
+def list_all_issues(conn, lottery_name: str) -> list[str]:
+    prediction_table = get_prediction_table(lottery_name)
+    issue_df = pd.read_sql(
+        f"SELECT DISTINCT issue_name FROM {prediction_table} ORDER BY issue_name ASC",
+        conn
+    )
+    return [str(issue) for issue in issue_df["issue_name"].tolist()]
+
+
+def plan_all_tasks(lottery_names: list[str], options: RunOptions) -> list[StatTask]:
+    """
+    全量任务规划：
+    - 串行时每个彩种一个任务（整彩种一次批量计算，断点随整彩种汇总一起提交）
+    - 并行时按期号顺序切分为每片 issues_per_task 期（断点按片提交）
+    - 指定期号范围 / 分片时先筛选期号，并报告每个彩种本分片的覆盖情况
+    - 启用断点时跳过本轮已完成的期号
+    """
+    if options.workers <= 1 and not (options.selective or options.checkpoint or options.pipeline):
+        return [StatTask("all", name) for name in lottery_names]
+
+    if options.snapshot_dir:
+        snapshot = get_snapshot(options.snapshot_dir)
+        issues_by_lottery = {name: snapshot.list_issues(name) for name in lottery_names}
+    else:
+        with pooled_connection() as conn:
+            issues_by_lottery = {name: list_all_issues(conn, name) for name in lottery_names}
+    done_by_lottery: dict[str, set[str]] = {}
+    if options.checkpoint:
+        with pooled_connection() as conn:
+            done_by_lottery = {name: completed_issues(conn, get_hit_checkpoint_table(name)) for name in lottery_names}
 
-    for idx, issue in enumerate(todo_issues, 1):
-        print(f"\n=== [{idx}/{len(todo_issues)}] 增量期号：{issue} ===")
-        update_hit_stat(lottery_name, issue)
+    tasks = []
+    for name, issues in issues_by_lottery.items():
+        if options.selective:
+            issues, coverage = select_issues(issues, options.issue_from, options.issue_to, options.shard)
+            print(f"🧩 [{name}] {coverage.describe()}")
+            METRICS.record("coverage", name, **asdict(coverage))
+            if not issues:
+                continue
+        done = done_by_lottery.get(name)
+        if done:
+            remaining = [issue for issue in issues if issue not in done]
+            print(f"⏩ [{name}] 断点续跑：已完成 {len(issues) - len(remaining)} / {len(issues)} 期，剩余 {len(remaining)} 期")
+            issues = remaining
+            if not issues:
+                continue
+        if options.workers <= 1:
+            # 串行不切片：未筛选期号时整彩种批量读取（不带期号列表）；流水线在任务内按 issues_per_task 分组提交
+            filtered = options.selective or bool(done) or options.pipeline
+            tasks.append(StatTask("all", name, issues if filtered else None))
+            continue
+        print(f"🚀 [{name}] 共找到 {len(issues)} 期，按每片 {options.issues_per_task} 期切分")
+        for start in range(0, len(issues), options.issues_per_task):
+            tasks.append(StatTask("all", name, issues[start:start + options.issues_per_task]))
+    return tasks
+
+
+def plan_today_tasks(lottery_names: list[str], options: RunOptions) -> list[StatTask]:
+    tasks = []
+    with pooled_connection() as conn:
+        for name in lottery_names:
+            with METRICS.stage(name, "find_today"):
+                todo = find_today_issues(conn, name, options.today_lookback)
+            if options.pipeline:
+                if todo:
+                    tasks.append(StatTask("issues", name, list(todo), todo))
+                continue
+            tasks.extend(StatTask("issue", name, [issue], snapshot) for issue, snapshot in todo.items())
+    return tasks
+
+
+def execute_tasks(tasks: list[StatTask], options: RunOptions) -> list[tuple[str, str]]:
+    """执行任务并汇总失败期号，返回 [(彩种, 期号)]，期号为 * 表示整彩种失败"""
+    progress = None
+    if len(tasks) > 1 and all(task.issues for task in tasks):
+        # 任务期号已知时按实际每期吞吐估算剩余时间
+        progress = ProgressReporter(sum(len(task.issues) for task in tasks))
+
+    def report_progress(result):
+        print(progress.update(len(result.task.issues)))
+
+    results = run_tasks(
+        tasks,
+        partial(run_stat_task, options=options),
+        workers=options.workers,
+        max_in_flight=options.max_in_flight,
+        label=StatTask.label,
+        on_result=report_progress if progress else None,
+    )
+
+    failures: list[tuple[str, str]] = []
+    for result in results:
+        task = result.task
+        if not result.ok:
+            failures.extend((task.lottery_name, issue) for issue in (task.issues or ["*"]))
+            continue
+        failures.extend((task.lottery_name, issue) for issue in result.value["failed_issues"])
+        if options.workers > 1:
+            WRITE_THROUGHPUT.merge(result.value["throughput"])
+            METRICS.merge(result.value["metrics"])
+    return failures
+
+
+def record_checkpoints(lottery_name: str, issues: list[str]):
+    """单独登记断点（逐期重试成功后，汇总已提交）"""
+    with pooled_connection() as conn:
+        mark_completed(conn, get_hit_checkpoint_table(lottery_name), issues)
+        conn.commit()
+
+
+def _clear_backfill_checkpoints(conn, lottery_name: str, options: RunOptions) -> int:
+    """清除本轮（期号范围 / 分片内）的断点"""
+    checkpoint_table = get_hit_checkpoint_table(lottery_name)
+    if not options.selective:
+        return clear_checkpoints(conn, checkpoint_table)
+    issues, _ = select_issues(
+        sorted(completed_issues(conn, checkpoint_table)), options.issue_from, options.issue_to, options.shard
+    )
+    return clear_checkpoints(conn, checkpoint_table, issues)
+
+
+def run_backfill(lottery_names: list[str], options: RunOptions, restart: bool = False) -> tuple[list[StatTask], list]:
+    """
+    全量回填（All / LOTTERY All）：启用断点时
+    - 开始前确认断点表，restart=True 时清除本轮断点从头计算
+    - 每片期号的断点随命中汇总一起提交，中断后再次运行跳过已完成的期号
+    - 彩种全部期号成功后清除其断点，下次全量重新从头计算
+    返回 (任务列表, 失败期号)
+    """
+    if options.checkpoint:
+        with pooled_connection() as conn:
+            for lottery_name in lottery_names:
+                ensure_checkpoint_table(conn, get_hit_checkpoint_table(lottery_name))
+                if restart:
+                    cleared = _clear_backfill_checkpoints(conn, lottery_name, options)
+                    if cleared:
+                        print(f"🔁 [{lottery_name}] 已清除 {cleared} 个断点，从头计算")
+
+    tasks = plan_all_tasks(lottery_names, options)
+    failures = execute_tasks(tasks, options)
+
+    if options.checkpoint:
+        failed_lotteries = {lottery_name for lottery_name, _ in failures}
+        with pooled_connection() as conn:
+            for lottery_name in lottery_names:
+                if lottery_name in failed_lotteries:
+                    print(f"⏸️ [{lottery_name}] 存在失败期号，已保留断点，重新运行将从断点继续")
+                else:
+                    _clear_backfill_checkpoints(conn, lottery_name, options)
+    return tasks, failures
+
+
+def sync_remote(lottery_names: list[str], verify: str = "count", full_check: bool = False,
+                retries: int = 3, batch_size: int = 2000) -> list[tuple[str, str]]:
+    """
+    把待同步队列中的期号推送到远程库（REMOTE_MYSQL_*），返回未能同步 / 校验不一致的 [(彩种, 期号)]。
+    - full_check=True：先全量比对两端每期聚合值，不一致的期号补登记到队列（本地库为新恢复的库时使用）
+    """
+    unsynced: list[tuple[str, str]] = []
+    with pooled_connection() as conn:
+        for lottery_name in lottery_names:
+            hit_stat_table = get_hit_stat_table(lottery_name)
+            sync_table = get_hit_sync_table(lottery_name)
+            lottery_id = LOTTERY_ID_MAP.get(lottery_name)
+            session = RemoteSession(get_remote_connection, retries)
+
+            def prepare(remote_conn):
+                with redirect_stdout(io.StringIO()):
+                    ensure_hit_stat_table_exists(remote_conn, hit_stat_table, lottery_id)
+                if full_check:
+                    return find_mismatched_issues(conn, remote_conn, hit_stat_table, lottery_id, verify)
+                return []
+
+            with METRICS.stage(lottery_name, "sync") as info:
+                ensure_sync_table(conn, sync_table)
+                try:
+                    mismatched = session.run(prepare, lottery_name)
+                    if full_check:
+                        enqueue_issues(conn, sync_table, mismatched)
+                        print(f"🔍 [{lottery_name}] 全量比对：{len(mismatched)} 期与远程不一致")
+                    issues = pending_issues(conn, sync_table)
+                    result = sync_issues(
+                        conn, session, sync_table, hit_stat_table, lottery_id, issues,
+                        batch_size=batch_size, verify=verify
+                    )
+                except (*RETRYABLE_ERRORS, RemoteConfigError) as exc:
+                    print(f"❌ [{lottery_name}] 无法连接远程库（{type(exc).__name__}: {exc}）")
+                    unsynced.extend((lottery_name, issue) for issue in pending_issues(conn, sync_table) or ["*"])
+                    continue
+                finally:
+                    session.close()
+                info["aux_rows_written"] = result["rows"]
+
+            if not issues:
+                print(f"🔄 [{lottery_name}] 无待同步期号")
+                continue
+            print(
+                f"🔄 [{lottery_name}] 已同步 {result['issues'] - len(result['failed'])} 期："
+                f"写入 {result['rows']} 行，删除 {result['deleted']} 行，校验一致 {result['verified']} 期"
+            )
+            for issue in result["mismatched"]:
+                print(f"⚠️ 校验不一致：{lottery_name} {issue}（已保留在队列中）")
+            unsynced.extend((lottery_name, issue) for issue in result["mismatched"] + result["failed"])
+    return unsynced
+
+
+def report_failures(failures: list[tuple[str, str]]):
+    if not failures:
+        return
+    print(f"\n❌ 失败期号：{len(failures)} 个，可按以下命令重试：")
+    for lottery_name, issue in failures:
+        if issue == "*":
+            print(f"   python scripts/init_expert_hit_stat.py {lottery_name} All")
+        else:
+            print(f"   python scripts/init_expert_hit_stat.py {lottery_name} {issue}")
+
+
+def run_snapshot_targets(target: list[str], options: RunOptions, restart: bool = False) -> list[tuple[str, str]]:
+    """快照模式：All / LOTTERY All / LOTTERY ISSUE（Today 依赖数据库中的进度表，不支持）"""
+    arg = target[0]
+    if arg == "All":
+        tasks, failures = run_backfill(LOTTERY_LIST, options, restart)
+    elif arg in LOTTERY_LIST and len(target) >= 2 and target[1] == "All":
+        tasks, failures = run_backfill([arg], options, restart)
+    elif arg in LOTTERY_LIST and len(target) >= 2 and target[1].isdigit():
+        tasks = [StatTask("issue", arg, [target[1]])]
+        failures = execute_tasks(tasks, options)
+    else:
+        print(f"❌ 快照模式不支持的参数：{' '.join(target)}（仅支持 All / LOTTERY All / LOTTERY ISSUE）")
+        sys.exit(1)
+
+    if options.snapshot_write == "db" and not options.verify:
+        if tasks and tasks[0].kind == "all":
+            reset_issue_progress(sorted({task.lottery_name for task in tasks}))
+        if options.shard is None:
+            refresh_rolling_after_tasks(tasks, failures)
+    return failures
+
+
+def parse_args(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        description="专家命中汇总生成",
+        usage="python scripts/init_expert_hit_stat.py [All|Today|Sync|Rolling|Predraw|LOTTERY ISSUE] [选项]"
+    )
+    parser.add_argument(
+        "target", nargs="*",
+        help=(
+            "All / Today / Sync / Rolling / Predraw / LOTTERY All / LOTTERY Today / LOTTERY Sync / "
+            "LOTTERY Rolling / LOTTERY Predraw / LOTTERY ISSUE"
+        )
+    )
+    parser.add_argument(
+        "--eval-mode", choices=EVAL_MODES, default="vector",
+        help="命中计算模式：vector（默认）/ legacy（原逐行循环）/ compare（两者对比）"
+    )
+    parser.add_argument(
+        "--writer", choices=WRITER_KINDS, default="batch",
+        help="写入方式：batch（多行 VALUES，默认）/ row（逐行）/ load（LOAD DATA 临时表合并）"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=None,
+        help="每批写入行数（默认按写入方式：batch / row 2000，load 200000）"
+    )
+    parser.add_argument(
+        "--commit", dest="commit_mode", choices=COMMIT_MODES, default="lottery",
+        help="提交粒度：lottery（每彩种/每期一次，默认）/ batch（每批一次）"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数（默认 1，串行）")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="同时在途任务上限（默认 workers × 2）")
+    parser.add_argument("--issues-per-task", type=int, default=50, help="并行全量时每个任务的期号数（默认 50）")
+    parser.add_argument("--stream", action="store_true", help="全量模式流式读取推荐记录（内存占用恒定）")
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="全量 / Today 使用预读、计算、写入三段流水线（三个线程重叠数据库 I/O 与计算，仅串行）"
+    )
+    parser.add_argument(
+        "--pipeline-depth", type=int, default=2,
+        help="流水线相邻阶段之间最多缓冲的组数（背压，默认 2；全量每组 --issues-per-task 期，Today 每组 1 期）"
+    )
+    parser.add_argument("--memory-budget-mb", type=int, default=256, help="流式读取每块内存预算（默认 256 MB）")
+    parser.add_argument(
+        "--today-lookback", type=int, default=DEFAULT_LOOKBACK,
+        help=f"Today 模式回看最近多少期检查迟到推荐 / 开奖变更（默认 {DEFAULT_LOOKBACK}）"
+    )
+    parser.add_argument(
+        "--rebuild-rolling", action="store_true",
+        help="Today / 单期模式按全部历史重建专家滚动表现表（默认增量更新）"
+    )
+    parser.add_argument(
+        "--no-mask-table", dest="mask_table", action="store_false",
+        help="不使用号码位图表，每次运行重新解析 numbers 文本"
+             "（号码被就地修改的推荐按 MD5 比对失效，自动回退解析文本）"
+    )
+    parser.add_argument(
+        "--mask-sync", action="store_true",
+        help="计算前按推荐自增 ID 水位补齐号码位图表（默认不补齐，未补齐的推荐回退解析文本；"
+             "数据库每次从备份恢复时不要开启，首次补齐需编码全部历史推荐）"
+    )
+    parser.add_argument(
+        "--no-outcome-matrix", dest="outcome_matrix", action="store_false",
+        help="单期 / Today 不使用开奖前构建的结果空间命中矩阵（Predraw 目标构建），始终读取推荐重新计算"
+    )
+    parser.add_argument(
+        "--check-schema", action="store_true",
+        help="忽略表结构版本记录，强制检查并迁移命中汇总表"
+    )
+    parser.add_argument(
+        "--snapshot", dest="snapshot_dir", default=None,
+        help="从列式快照目录读取推荐与开奖（scripts/build_snapshot.py 生成，需 pyarrow），仅支持 All / 单期"
+    )
+    parser.add_argument(
+        "--snapshot-write", choices=["parquet", "db"], default="parquet",
+        help="快照模式结果写入：parquet（快照 stats/ 目录，默认，不连接数据库）/ db（命中汇总表）"
+    )
+    parser.add_argument("--from", dest="issue_from", default=None, help="全量模式起始期号（含）")
+    parser.add_argument("--to", dest="issue_to", default=None, help="全量模式结束期号（含）")
+    parser.add_argument(
+        "--shard", default=None,
+        help="全量模式只计算第 k / n 片期号（如 1/4，按期号取模，各分片无重叠）；分片运行不更新滚动表现"
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="全量模式忽略上次中断留下的断点，从头计算（默认从断点继续）"
+    )
+    parser.add_argument(
+        "--diff", action="store_true",
+        help="差异写入：与现有汇总比对，只写新增 / 变化的行并删除已消失的 (专家, 玩法)"
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="只比对不写入：报告新增 / 更新 / 删除 / 未变行数及差异样例（不更新进度、滚动表现与同步队列）"
+    )
+    parser.add_argument(
+        "--sync", action="store_true",
+        help="写入时登记变更的期号，运行结束后增量同步到远程库（REMOTE_MYSQL_*）；目标为 Sync 时只同步不计算"
+             "（未指定时写入不登记同步队列，之后单独同步需加 --sync-full-check）"
+    )
+    parser.add_argument(
+        "--sync-verify", choices=VERIFY_MODES, default="count",
+        help="同步校验方式：count（行数 + 计数列之和，默认）/ checksum（再加逐行 CRC32，仅 MySQL）"
+    )
+    parser.add_argument(
+        "--sync-full-check", action="store_true",
+        help="同步前全量比对两端每期聚合值，不一致的期号一并同步"
+    )
+    parser.add_argument("--sync-retries", type=int, default=3, help="同步网络错误重试次数（默认 3）")
+    parser.add_argument(
+        "--metrics-file", default=os.getenv("HIT_STAT_METRICS_FILE"),
+        help="阶段耗时 / 读写行数事件流（JSON lines，追加写入）"
+    )
+    parser.add_argument(
+        "--summary-file", default=os.getenv("HIT_STAT_SUMMARY_FILE"),
+        help="运行结束时写入汇总文本（供工作流通知使用）"
+    )
+    return parser.parse_args(argv)
 
-    conn.close()
 
 if __name__ == "__main__":
-    # ✅ 先建表
-    conn = get_connection()
-    for LOTTERY_NAME in LOTTERY_LIST:
-        hit_stat_table = get_hit_stat_table(LOTTERY_NAME)
-        lottery_id = LOTTERY_ID_MAP.get(LOTTERY_NAME)
-        if lottery_id is None:
-            raise ValueError(f"未识别的彩种：{LOTTERY_NAME}")
-        ensure_hit_stat_table_exists(conn, hit_stat_table, lottery_id)
-    conn.close()
+    cli = parse_args(sys.argv[1:])
+    try:
+        shard = parse_shard(cli.shard) if cli.shard else None
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        sys.exit(1)
+    options = RunOptions(
+        eval_mode=cli.eval_mode,
+        writer=cli.writer,
+        batch_size=cli.batch_size,
+        commit_mode=cli.commit_mode,
+        workers=cli.workers,
+        max_in_flight=cli.max_in_flight,
+        issues_per_task=max(cli.issues_per_task, 1),
+        stream=cli.stream,
+        memory_budget_mb=cli.memory_budget_mb,
+        today_lookback=cli.today_lookback,
+        mask_table=cli.mask_table,
+        mask_sync=cli.mask_sync,
+        snapshot_dir=cli.snapshot_dir,
+        snapshot_write=cli.snapshot_write,
+        diff=cli.diff,
+        verify=cli.verify,
+        sync=cli.sync,
+        issue_from=cli.issue_from,
+        issue_to=cli.issue_to,
+        shard=shard,
+        pipeline=cli.pipeline,
+        pipeline_depth=max(cli.pipeline_depth, 1),
+        outcome_matrix=cli.outcome_matrix,
+    )
+    target = cli.target
 
     # ✅ 根据参数执行
-    if len(sys.argv) < 2:
-        print("❌ 缺少参数：python scripts/init_expert_hit_stat.py [All|Today|LOTTERY ISSUE]")
+    if len(target) < 1:
+        print("❌ 缺少参数：python scripts/init_expert_hit_stat.py [All|Today|Sync|Rolling|LOTTERY ISSUE]")
         sys.exit(1)
 
-    arg = sys.argv[1]
+    arg = target[0]
+    all_target = arg == "All" or (arg in LOTTERY_LIST and target[1:2] == ["All"])
+    if options.selective and not all_target:
+        print("❌ --from / --to / --shard 仅适用于 All / LOTTERY All")
+        sys.exit(1)
+    # ✅ 全量写库时按期号登记断点（快照 parquet 输出与 --verify 不写库，不登记）
+    options.checkpoint = all_target and not options.verify and not (
+        options.snapshot_dir is not None and options.snapshot_write == "parquet"
+    )
+    METRICS.start(" ".join(target), cli.metrics_file)
 
-    if arg == "All":
-        for LOTTERY_NAME in LOTTERY_LIST:
-            run_all(LOTTERY_NAME)
+    # ✅ 先建表（仅检查本次涉及的彩种，已是当前版本的表直接跳过）
+    schema_lotteries = [arg] if arg in LOTTERY_LIST else LOTTERY_LIST
+    snapshot_only = options.snapshot_dir is not None and options.snapshot_write == "parquet"
+    if snapshot_only and (cli.sync or cli.diff or cli.verify):
+        print("❌ --snapshot-write parquet 不写数据库，无法 --sync / --diff / --verify；请改用 --snapshot-write db")
+        sys.exit(1)
+    if options.pipeline and (options.workers > 1 or options.stream or options.snapshot_dir):
+        print("❌ --pipeline 仅用于串行数据库模式，不能与 --workers > 1 / --stream / --snapshot 同时使用")
+        sys.exit(1)
+    if cli.verify and cli.sync:
+        print("❌ --verify 只比对不写入，不能与 --sync 同时使用")
+        sys.exit(1)
+    if not snapshot_only:
+        with pooled_connection() as conn:
+            ensure_hit_stat_schema(conn, schema_lotteries, force=cli.check_schema)
+    sync_only = arg == "Sync" or (arg in LOTTERY_LIST and target[1:2] == ["Sync"])
+    rolling_only = arg == "Rolling" or (arg in LOTTERY_LIST and target[1:2] == ["Rolling"])
+    predraw_only = arg == "Predraw" or (arg in LOTTERY_LIST and target[1:2] == ["Predraw"])
+    if not (sync_only or rolling_only) and not options.snapshot_dir:
+        sync_mask_tables(schema_lotteries, options)
+    if not (sync_only or predraw_only or options.verify or snapshot_only):
+        sync_draw_features(schema_lotteries)
+    failures: list[tuple[str, str]] = []
+    unsynced: list[tuple[str, str]] = []
+
+    if sync_only:
+        # 仅同步：不计算，由下方统一推送待同步队列
+        pass
+    elif rolling_only:
+        # 仅重建滚动表现（如全部分片运行结束后）
+        for lottery_name in schema_lotteries:
+            refresh_rolling_stats(lottery_name)
+    elif predraw_only:
+        # 开奖前预计算数字型彩种的结果空间命中矩阵（开奖后 Today / 单期直接查表）
+        failures = run_predraw(schema_lotteries, options)
+    elif options.snapshot_dir:
+        failures = run_snapshot_targets(target, options, cli.restart)
+    elif arg == "All":
+        tasks, failures = run_backfill(LOTTERY_LIST, options, cli.restart)
+        if not options.verify:
+            reset_issue_progress(LOTTERY_LIST)
+            if options.shard is None:
+                refresh_rolling_after_tasks(tasks, failures)
     elif arg == "Today":
         # 全部彩种当日模式
-        for LOTTERY_NAME in LOTTERY_LIST:
-            run_today(LOTTERY_NAME)
-    
-    elif arg in LOTTERY_LIST and len(sys.argv) >= 3 and sys.argv[2] == "Today":
+        tasks = plan_today_tasks(LOTTERY_LIST, options)
+        failures = execute_tasks(tasks, options)
+        if not options.verify:
+            refresh_rolling_after_tasks(tasks, failures, rebuild=cli.rebuild_rolling)
+
+    elif arg in LOTTERY_LIST and len(target) >= 2 and target[1] == "All":
+        # 单彩种全量模式
+        tasks, failures = run_backfill([arg], options, cli.restart)
+        if not options.verify:
+            reset_issue_progress([arg])
+            if options.shard is None:
+                refresh_rolling_after_tasks(tasks, failures)
+
+    elif arg in LOTTERY_LIST and len(target) >= 2 and target[1] == "Today":
         # 单彩种当日模式
-        run_today(arg)
-    
-    elif arg in LOTTERY_LIST and len(sys.argv) >= 3 and sys.argv[2].isdigit():
+        tasks = plan_today_tasks([arg], options)
+        failures = execute_tasks(tasks, options)
+        if not options.verify:
+            refresh_rolling_after_tasks(tasks, failures, rebuild=cli.rebuild_rolling)
+
+    elif arg in LOTTERY_LIST and len(target) >= 2 and target[1].isdigit():
         # 单彩种指定期号模式
-        issue = sys.argv[2]
-        update_hit_stat(arg, issue)
+        issue = target[1]
+        update_hit_stat(arg, issue, options)
+        if not options.verify:
+            refresh_rolling_stats(arg, None if cli.rebuild_rolling else [issue])
 
     elif arg.isdigit():
         print("❌ 错误：单独传期号不允许，必须指定 LOTTERY")
         sys.exit(1)
     else:
         print(f"❌ 不支持的参数：{arg}")
+
+    if cli.sync or sync_only:
+        unsynced = sync_remote(
+            schema_lotteries, verify=cli.sync_verify, full_check=cli.sync_full_check, retries=cli.sync_retries
+        )
+
+    if options.shard is not None and not options.verify:
+        lottery_arg = f"{arg} " if arg in LOTTERY_LIST else ""
+        print(
+            f"\n🧩 分片运行未更新滚动表现，全部分片完成后执行："
+            f"python scripts/init_expert_hit_stat.py {lottery_arg}Rolling"
+        )
+
+    WRITE_THROUGHPUT.report()
+    METRICS.finish(cli.summary_file, failures=len(failures) + len(unsynced))
+    report_failures(failures)
+    if unsynced:
+        print(f"\n❌ 未完成同步：{len(unsynced)} 期（已保留在待同步队列中），可重新执行：")
+        for lottery_name in dict.fromkeys(name for name, _ in unsynced):
+            print(f"   python scripts/init_expert_hit_stat.py {lottery_name} Sync")
+    close_pools()
+    if failures or unsynced:
+        sys.exit(1)
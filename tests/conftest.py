@@ -0,0 +1,50 @@
+# tests/conftest.py
+"""
+测试公共夹具：SQLite 替身库（utils/sqlite_compat.py）+ 合成数据（utils/bench_data.py）
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "scripts")]
+
+from utils.bench_data import BenchConfig, generate, load_into  # noqa: E402
+from utils.db import pooled_connection, set_connection_factory  # noqa: E402
+from utils.draw_index import reset_draw_indexes  # noqa: E402
+from utils.sqlite_compat import sqlite_connection_factory  # noqa: E402
+
+
+def _reset_caches(hit_stat):
+    """进程内按表名缓存的状态（表字段、开奖索引、已建同步表）与具体库绑定，换库时清空"""
+    reset_draw_indexes()
+    hit_stat.METADATA.invalidate()
+    hit_stat._SYNC_TABLES_READY.clear()
+    hit_stat._SNAPSHOTS.clear()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """每个测试一个空的 SQLite 替身库，返回库文件路径"""
+    import init_expert_hit_stat as hit_stat
+
+    path = str(tmp_path / "test.sqlite3")
+    set_connection_factory(sqlite_connection_factory(path))
+    _reset_caches(hit_stat)
+    yield path
+    set_connection_factory(None)
+    _reset_caches(hit_stat)
+
+
+@pytest.fixture
+def load_lotteries(sqlite_db):
+    """load_lotteries(names, **config)：生成合成数据写入替身库，返回 {彩种: LotteryData}"""
+    def load(lottery_names: list[str], **config) -> dict:
+        config.setdefault("issues", 12)
+        config.setdefault("experts", 20)
+        datasets = generate(BenchConfig(**config), lottery_names)
+        with pooled_connection() as conn:
+            load_into(conn, datasets)
+        return datasets
+    return load
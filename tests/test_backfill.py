@@ -0,0 +1,29 @@
+import init_expert_hit_stat as hit_stat
+from utils.db import get_hit_checkpoint_table, pooled_connection
+from utils.hit_checkpoint import completed_issues, ensure_checkpoint_table, mark_completed
+
+LOTTERY = "福彩3D"
+
+
+def test_serial_backfill_is_one_bulk_task(load_lotteries):
+    data = load_lotteries([LOTTERY])[LOTTERY]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [LOTTERY], force=True)
+    options = hit_stat.RunOptions(checkpoint=True)
+
+    # 无断点：整彩种一次批量读取，不按 issues_per_task 切片
+    assert hit_stat.plan_all_tasks([LOTTERY], options) == [hit_stat.StatTask("all", LOTTERY)]
+
+    # 断点续跑：仍是一个任务，只含剩余期号
+    issues = [draw[0] for draw in data.draws]
+    table = get_hit_checkpoint_table(LOTTERY)
+    with pooled_connection() as conn:
+        ensure_checkpoint_table(conn, table)
+        mark_completed(conn, table, issues[:5])
+        conn.commit()
+    assert hit_stat.plan_all_tasks([LOTTERY], options) == [hit_stat.StatTask("all", LOTTERY, issues[5:])]
+
+    tasks, failures = hit_stat.run_backfill([LOTTERY], options)
+    assert len(tasks) == 1 and not failures
+    with pooled_connection() as conn:
+        assert completed_issues(conn, table) == set()
@@ -0,0 +1,63 @@
+import pytest
+
+import init_expert_hit_stat as hit_stat
+from utils.db import get_hit_stat_table, get_prediction_table, pooled_connection
+
+# 非标准号码：补零 / 不补零混写、全角与空白分隔、重复号码、越界、空值与无法解析的文本
+ODD_NUMBERS = [
+    "1,2,3", "01,02,03", "03,05", "3,5", "01,2,3", "1,02,3", "3,05", "03,5",
+    " 1 , 2 ", "01 02，03", "1,,2", "1,1,2", "2,2",
+    "99", "00,80", "1|2", "a,b", "abc", "", None,
+]
+
+
+def _stats(lottery_name: str) -> list[tuple]:
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT issue_name, user_id, playtype_id, total_count, hit_count, hit_number_count, avg_hit_gap "
+            f"FROM {get_hit_stat_table(lottery_name)} ORDER BY issue_name, user_id, playtype_id"
+        )
+        return cursor.fetchall()
+
+
+def _clear_stats(lottery_name: str):
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {get_hit_stat_table(lottery_name)}")
+        conn.commit()
+
+
+@pytest.mark.parametrize("lottery_name", ["福彩3D", "快乐8", "双色球", "大乐透"])
+def test_vector_matches_legacy(load_lotteries, lottery_name):
+    data = load_lotteries([lottery_name], messy_ratio=0.2)[lottery_name]
+    rows = []
+    for issue_name, _, _ in data.draws[:3]:
+        for index, numbers in enumerate(ODD_NUMBERS):
+            for playtype_id in data.playtype_ids.values():
+                rows.append((issue_name, 900000 + index, playtype_id, numbers))
+        # 同一专家同一玩法重复推荐
+        rows.extend(prediction for prediction in data.predictions if prediction[0] == issue_name)
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {get_prediction_table(lottery_name)} (issue_name, user_id, playtype_id, numbers) "
+                f"VALUES (%s, %s, %s, %s)",
+                rows
+            )
+        conn.commit()
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+    hit_stat.sync_mask_tables([lottery_name], hit_stat.RunOptions(mask_sync=True))
+
+    results = {}
+    for label, options in {
+        "legacy": hit_stat.RunOptions(eval_mode="legacy"),
+        "vector": hit_stat.RunOptions(),
+        "vector_text": hit_stat.RunOptions(mask_table=False),
+    }.items():
+        _clear_stats(lottery_name)
+        hit_stat.run_all(lottery_name, options)
+        results[label] = _stats(lottery_name)
+
+    assert results["legacy"]
+    assert results["vector"] == results["legacy"]
+    assert results["vector_text"] == results["legacy"]
@@ -0,0 +1,64 @@
+import pytest
+
+import init_expert_hit_stat as hit_stat
+from utils.db import get_hit_rolling_table, get_hit_stat_table, get_prediction_table, pooled_connection
+from utils.hit_rolling import STATE_COLUMNS, rebuild_rolling_stats
+
+LOTTERY = "福彩3D"
+
+
+def _states(table: str) -> list[tuple]:
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(STATE_COLUMNS)} FROM {table} ORDER BY user_id, playtype_id")
+        return cursor.fetchall()
+
+
+@pytest.mark.parametrize("position", [0, -1])
+def test_diff_deleted_rows_leave_rolling_state(load_lotteries, position):
+    data = load_lotteries([LOTTERY])[LOTTERY]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [LOTTERY], force=True)
+    hit_stat.run_all(LOTTERY)
+    hit_stat.refresh_rolling_stats(LOTTERY)
+
+    # 删除某专家在一期的全部推荐，差异写入删除其汇总行后增量更新滚动表现
+    issue_name, user_id = data.predictions[position][:2]
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {get_prediction_table(LOTTERY)} WHERE issue_name = %s AND user_id = %s",
+                (issue_name, user_id)
+            )
+        conn.commit()
+    options = hit_stat.RunOptions(diff=True)
+    hit_stat.update_hit_stat(LOTTERY, issue_name, options)
+    hit_stat.refresh_rolling_stats(LOTTERY, [issue_name])
+    incremental = _states(get_hit_rolling_table(LOTTERY))
+
+    with pooled_connection() as conn:
+        rebuild_rolling_stats(conn, get_hit_rolling_table(LOTTERY), get_hit_stat_table(LOTTERY),
+                              hit_stat.LOTTERY_ID_MAP[LOTTERY])
+    assert incremental == _states(get_hit_rolling_table(LOTTERY))
+
+
+def test_removed_expert_drops_rolling_state(load_lotteries):
+    data = load_lotteries([LOTTERY])[LOTTERY]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [LOTTERY], force=True)
+    hit_stat.run_all(LOTTERY)
+    hit_stat.refresh_rolling_stats(LOTTERY)
+
+    user_id = data.predictions[0][1]
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {get_prediction_table(LOTTERY)} WHERE user_id = %s", (user_id,))
+        conn.commit()
+    hit_stat.run_all(LOTTERY, hit_stat.RunOptions(diff=True))
+    hit_stat.refresh_rolling_stats(LOTTERY, sorted({draw[0] for draw in data.draws}))
+
+    states = _states(get_hit_rolling_table(LOTTERY))
+    assert all(row[STATE_COLUMNS.index("user_id")] != user_id for row in states)
+    with pooled_connection() as conn:
+        rebuild_rolling_stats(conn, get_hit_rolling_table(LOTTERY), get_hit_stat_table(LOTTERY),
+                              hit_stat.LOTTERY_ID_MAP[LOTTERY])
+    assert states == _states(get_hit_rolling_table(LOTTERY))
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.db import pooled_connection
+from utils.hit_stat_writer import DEFAULT_BATCH_SIZE, HitStatWriter, LoadDataWriter, create_writer
+
+
+def test_writer_base_is_abstract():
+    with pytest.raises(TypeError):
+        HitStatWriter(None, "expert_hit_stat_3d")
+
+
+def test_batch_size_defaults_per_writer():
+    assert create_writer("batch", None, "expert_hit_stat_3d").batch_size == DEFAULT_BATCH_SIZE
+    assert create_writer("row", None, "expert_hit_stat_3d", batch_size=10).batch_size == 10
+    assert LoadDataWriter.default_batch_size == 200000
+
+
+def test_batch_writer_upserts(sqlite_db):
+    import init_expert_hit_stat as hit_stat
+
+    rows = [
+        {"lottery_id": 6, "issue_name": "2024001", "playtype_id": 1, "user_id": user_id,
+         "total_count": 1, "hit_count": user_id % 2, "hit_number_count": 0, "avg_hit_gap": None}
+        for user_id in range(5)
+    ]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, ["福彩3D"], force=True)
+        writer = create_writer("batch", conn, "expert_hit_stat_3d", batch_size=2)
+        writer.write(rows)
+        writer.write(rows[:1])
+        writer.close()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM expert_hit_stat_3d")
+            assert cursor.fetchone()[0] == 5
+    assert writer.rows_written == 6
@@ -0,0 +1,26 @@
+from utils.issue_shard import combine_digests, issues_digest, select_issues
+
+ISSUES = [str(issue) for issue in range(2024001, 2024021)]
+
+
+def test_digest_detects_missing_issues():
+    total = issues_digest(ISSUES)
+    assert issues_digest(reversed(ISSUES)) == total
+    missing = [issue for issue in ISSUES if issue not in {"2024004", "2024005", "2024006", "2024007"}]
+    assert issues_digest(missing) != total
+    for issue in ISSUES:
+        assert issues_digest([other for other in ISSUES if other != issue]) != total
+
+
+def test_shard_digests_cover_all_issues():
+    shards = [select_issues(ISSUES, shard=(k, 3)) for k in (1, 2, 3)]
+    for selected, coverage in shards:
+        assert coverage.digest == issues_digest(selected)
+        assert coverage.digest != coverage.total_digest
+        assert coverage.total_digest == issues_digest(ISSUES)
+    assert sum(coverage.issues for _, coverage in shards) == len(ISSUES)
+    assert combine_digests(coverage.digest for _, coverage in shards) == issues_digest(ISSUES)
+    # 某片漏掉一期：合并指纹不再等于全部指纹
+    selected, _ = shards[0]
+    partial = [issues_digest(selected[1:])] + [coverage.digest for _, coverage in shards[1:]]
+    assert combine_digests(partial) != issues_digest(ISSUES)
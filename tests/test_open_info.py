@@ -0,0 +1,38 @@
+import pandas as pd
+import pandas.io.sql
+import pytest
+
+from utils.db import get_open_info, get_result_table, pooled_connection
+
+
+@pytest.fixture(params=["driver", "pandas"])
+def wrapped_errors(request, monkeypatch):
+    """pandas 2.3（requirements.txt 锁定版本）把非 SQLAlchemy 连接上的任何驱动异常包装为 DatabaseError；
+    pandas 3 只包装 sqlite3.Error。pandas 参数下按 2.3 的行为包装，两种情况都要覆盖"""
+    if request.param == "pandas":
+        execute = pandas.io.sql.SQLiteDatabase.execute
+
+        def execute_wrapped(self, sql, params=None):
+            try:
+                return execute(self, sql, params)
+            except pd.errors.DatabaseError:
+                raise
+            except Exception as exc:
+                raise pd.errors.DatabaseError(f"Execution failed on sql '{sql}': {exc}") from exc
+
+        monkeypatch.setattr(pandas.io.sql.SQLiteDatabase, "execute", execute_wrapped)
+    return request.param
+
+
+@pytest.mark.parametrize("lottery_name", ["福彩3D", "双色球"])
+def test_open_info_without_feature_table(load_lotteries, wrapped_errors, lottery_name):
+    data = load_lotteries([lottery_name])[lottery_name]
+    issue_name, open_code, blue_code = data.draws[-1]
+    with pooled_connection() as conn:
+        info = get_open_info(conn, get_result_table(lottery_name), issue_name, lottery_name)
+    assert info["open_code"] == open_code
+    assert info["open_nums"] and info["sum"] == sum(info["open_nums"])
+    if lottery_name == "双色球":
+        assert info["blue_code"] == blue_code
+    else:
+        assert info["blue_code"] == ""
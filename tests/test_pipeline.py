@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+import pymysql
+
+from utils.pipeline import Stage, run_pipeline
+
+
+class FakeConnection:
+    def __init__(self, number: int):
+        self.number = number
+        self.alive = True
+
+
+def test_failed_item_reopens_stage_resource():
+    opened: list[FakeConnection] = []
+    exits: list[tuple[int, type | None]] = []
+
+    @contextmanager
+    def connection():
+        conn = FakeConnection(len(opened))
+        opened.append(conn)
+        try:
+            yield conn
+        except BaseException as exc:
+            exits.append((conn.number, type(exc)))
+            raise
+        else:
+            exits.append((conn.number, None))
+
+    def write(item, value, conn):
+        if not conn.alive:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        if item == 2:
+            # 本组执行期间连接断开：之后的分组不能继续使用这个连接
+            conn.alive = False
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        return item * 10
+
+    result = run_pipeline([1, 2, 3, 4], [Stage("prepare", lambda item, _: item), Stage("write", write, connection)])
+
+    assert result.values == {1: 10, 3: 30, 4: 40}
+    assert [item for item, _ in result.failures] == [2]
+    # 失败的连接以异常退出（连接池据此丢弃），后续分组使用重新借出的连接，结束时正常归还
+    assert exits == [(0, pymysql.err.OperationalError), (1, None)]
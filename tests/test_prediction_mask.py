@@ -0,0 +1,53 @@
+import init_expert_hit_stat as hit_stat
+from utils.db import get_hit_stat_table, get_prediction_table, pooled_connection
+
+
+def _stats(lottery_name: str) -> list[tuple]:
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT issue_name, user_id, playtype_id, total_count, hit_count, hit_number_count "
+            f"FROM {get_hit_stat_table(lottery_name)} ORDER BY issue_name, user_id, playtype_id"
+        )
+        return cursor.fetchall()
+
+
+def test_edited_numbers_fall_back_to_text(load_lotteries):
+    lottery_name = "快乐8"
+    data = load_lotteries([lottery_name])[lottery_name]
+    options = hit_stat.RunOptions(mask_sync=True)
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+    hit_stat.sync_mask_tables([lottery_name], options)
+
+    # 位图同步之后就地改号：旧位图不能再被使用
+    issue_name, open_code, _ = data.draws[0]
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {get_prediction_table(lottery_name)} SET numbers = %s WHERE issue_name = %s",
+                (open_code, issue_name)
+            )
+        conn.commit()
+        df = hit_stat.read_predictions(
+            conn, get_prediction_table(lottery_name), hit_stat.LOTTERY_ID_MAP[lottery_name], [issue_name],
+            hit_stat.resolve_mask_table(conn, lottery_name, options)
+        )
+    assert (df["mask_valid"] == -1).all()
+
+    hit_stat.run_all(lottery_name, options)
+    with_masks = _stats(lottery_name)
+    hit_stat.run_all(lottery_name, hit_stat.RunOptions(mask_table=False))
+    assert _stats(lottery_name) == with_masks
+
+
+def test_mask_sync_is_opt_in(load_lotteries):
+    lottery_name = "福彩3D"
+    load_lotteries([lottery_name])
+    options = hit_stat.RunOptions()
+    hit_stat.sync_mask_tables([lottery_name], options)
+    with pooled_connection() as conn:
+        assert hit_stat.resolve_mask_table(conn, lottery_name, options) is None
+
+    hit_stat.sync_mask_tables([lottery_name], hit_stat.RunOptions(mask_sync=True))
+    with pooled_connection() as conn:
+        assert hit_stat.resolve_mask_table(conn, lottery_name, options) is not None
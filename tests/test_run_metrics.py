@@ -0,0 +1,31 @@
+import init_expert_hit_stat as hit_stat
+from utils.db import get_hit_stat_table, pooled_connection
+from utils.run_metrics import RunMetrics
+
+
+def test_aux_rows_reported_separately():
+    metrics = RunMetrics()
+    metrics.record_stage("快乐8", "mask_sync", 0.1, aux_rows_written=5)
+    metrics.record_stage("快乐8", "write", 0.2, rows_written=10)
+    summary = metrics.summary()
+    assert summary["rows_written"] == 10
+    assert summary["lotteries"]["快乐8"]["aux_rows_written"] == {"mask_sync": 5}
+    assert "附属表 mask_sync 5 条" in RunMetrics.format_summary(summary)
+
+
+def test_rows_written_counts_hit_stats_only(load_lotteries, monkeypatch):
+    monkeypatch.setattr(hit_stat, "METRICS", RunMetrics())
+    lottery_name = "福彩3D"
+    load_lotteries([lottery_name])
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+    hit_stat.sync_mask_tables([lottery_name], hit_stat.RunOptions(mask_sync=True))
+    hit_stat.sync_draw_features([lottery_name])
+    hit_stat.run_all(lottery_name)
+
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {get_hit_stat_table(lottery_name)}")
+        stat_rows = cursor.fetchone()[0]
+    totals = hit_stat.METRICS.summary()["lotteries"][lottery_name]
+    assert totals["rows_written"] == stat_rows
+    assert set(totals["aux_rows_written"]) == {"mask_sync", "features"}
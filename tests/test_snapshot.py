@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import init_expert_hit_stat as hit_stat  # noqa: E402
+from utils.db import get_hit_stat_table, pooled_connection  # noqa: E402
+from utils.snapshot import Snapshot, build_snapshot  # noqa: E402
+
+ISSUES = 1500  # 超过 pyarrow 默认的 1024 个分区
+
+
+def test_snapshot_over_1024_issues(load_lotteries, tmp_path):
+    lottery_name = "福彩3D"
+    data = load_lotteries([lottery_name], issues=ISSUES, experts=2)[lottery_name]
+    root = str(tmp_path / "snapshot")
+    with pooled_connection() as conn:
+        build_snapshot(root, [lottery_name], conn=conn)
+
+    issues = sorted({row[0] for row in data.predictions})
+    assert len(issues) > 1024
+    assert Snapshot(root).list_issues(lottery_name) == issues
+
+    options = hit_stat.RunOptions(snapshot_dir=root, snapshot_write="parquet")
+    written = hit_stat.run_snapshot(lottery_name, options)
+    assert written > 0
+    stats = os.path.join(root, "stats", get_hit_stat_table(lottery_name))
+    assert len(os.listdir(stats)) == len(issues)
@@ -0,0 +1,36 @@
+import pymysql
+import pytest
+
+import init_expert_hit_stat as hit_stat
+import utils.db as db
+from utils.db import get_hit_sync_table, pooled_connection
+from utils.hit_sync import pending_issues
+
+
+def test_sync_without_remote_config_keeps_queue(load_lotteries, monkeypatch, capsys):
+    monkeypatch.setitem(db.REMOTE_DB_CONFIG, "host", "")
+    lottery_name = "福彩3D"
+    data = load_lotteries([lottery_name])[lottery_name]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+    hit_stat.run_all(lottery_name, hit_stat.RunOptions(sync=True))
+
+    unsynced = hit_stat.sync_remote([lottery_name], retries=1)
+
+    issues = sorted(draw[0] for draw in data.draws)
+    assert sorted(issue for _, issue in unsynced) == issues
+    assert "❌ [福彩3D] 无法连接远程库（RemoteConfigError" in capsys.readouterr().out
+    with pooled_connection() as conn:
+        assert sorted(pending_issues(conn, get_hit_sync_table(lottery_name))) == issues
+
+
+def test_writes_without_sync_skip_queue(load_lotteries):
+    lottery_name = "福彩3D"
+    load_lotteries([lottery_name])
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+    hit_stat.run_all(lottery_name)
+    hit_stat.run_all(lottery_name, hit_stat.RunOptions(diff=True))
+
+    with pooled_connection() as conn, pytest.raises(pymysql.err.ProgrammingError):
+        pending_issues(conn, get_hit_sync_table(lottery_name))
@@ -0,0 +1,53 @@
+import pytest
+
+import init_expert_hit_stat as hit_stat
+from utils.db import LOTTERIES_WITH_BLUE, get_hit_stat_table, get_prediction_table, get_result_table, pooled_connection
+
+
+def _stats(lottery_name: str) -> list[tuple]:
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT issue_name, user_id, playtype_id, total_count, hit_count, hit_number_count "
+            f"FROM {get_hit_stat_table(lottery_name)} ORDER BY issue_name, user_id, playtype_id"
+        )
+        return cursor.fetchall()
+
+
+@pytest.mark.parametrize("lottery_name", ["福彩3D", "快乐8", "双色球"])
+def test_today_matches_full_run(load_lotteries, lottery_name):
+    data = load_lotteries([lottery_name])[lottery_name]
+    with pooled_connection() as conn:
+        hit_stat.ensure_hit_stat_schema(conn, [lottery_name], force=True)
+
+    hit_stat.run_today(lottery_name)
+    today = _stats(lottery_name)
+    assert {row[0] for row in today} == {draw[0] for draw in data.draws}
+
+    # 新开奖 + 新推荐：只计算新期号
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            issue_name, open_code, blue_code = data.draws[-1]
+            new_issue = str(int(issue_name) + 1)
+            if lottery_name in LOTTERIES_WITH_BLUE:
+                cursor.execute(
+                    f"INSERT INTO {get_result_table(lottery_name)} (issue_name, open_code, blue_code) VALUES (%s, %s, %s)",
+                    (new_issue, open_code, blue_code)
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {get_result_table(lottery_name)} (issue_name, open_code) VALUES (%s, %s)",
+                    (new_issue, open_code)
+                )
+            cursor.executemany(
+                f"INSERT INTO {get_prediction_table(lottery_name)} (issue_name, user_id, playtype_id, numbers) "
+                "VALUES (%s, %s, %s, %s)",
+                [(new_issue, *row[1:]) for row in data.predictions if row[0] == issue_name]
+            )
+        conn.commit()
+        todo = hit_stat.find_today_issues(conn, lottery_name)
+    assert list(todo) == [new_issue]
+
+    hit_stat.run_today(lottery_name)
+    today = _stats(lottery_name)
+    hit_stat.run_all(lottery_name)
+    assert _stats(lottery_name) == today
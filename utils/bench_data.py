@@ -0,0 +1,217 @@
+# utils/bench_data.py
+"""
+基准测试用合成数据：六个彩种的开奖号码、专家推荐与玩法字典
+
+📌 特点：
+- 固定随机种子，同样的参数生成完全相同的数据
+- 玩法名称、号码位数与书写风格（快乐8 / 双色球 / 大乐透补零）与线上一致
+- 部分专家跟随每期“热号”推荐，产生与线上相近的重复推荐比例
+- 少量推荐使用空格 / 中文逗号等非标准写法，覆盖逐行回退路径
+- 可写入 MySQL 或 SQLite 替身库（utils/sqlite_compat.py）
+- 开奖表结构与线上一致：无蓝球彩种（福彩3D / 排列3 / 排列5 / 快乐8）没有 blue_code 列
+"""
+import random
+from dataclasses import dataclass, field
+
+from utils.db import get_hit_stat_table, get_prediction_mask_table, get_prediction_table, get_result_table
+
+
+@dataclass(frozen=True)
+class LotteryProfile:
+    """
+    彩种号码规则
+    - digits=True：数字型（福彩3D / 排列3 / 排列5），开奖号为可重复的 0~9，推荐号码不补零
+    - playtypes：{玩法名: 推荐号码个数}，玩法名含“蓝球”时从蓝球号码范围选号
+    """
+    lottery_id: int
+    red_range: tuple[int, int]
+    red_count: int
+    playtypes: dict
+    digits: bool = False
+    blue_range: tuple[int, int] | None = None
+    blue_count: int = 0
+
+    @property
+    def padded(self) -> bool:
+        return not self.digits
+
+
+LOTTERY_PROFILES = {
+    "福彩3D": LotteryProfile(6, (0, 9), 3, {
+        "独胆": 1, "双胆": 2, "三胆": 3, "五码组选": 5, "六码组选": 6, "杀一": 1, "杀二": 2,
+        "百位定3": 3, "十位定3": 3, "个位定3": 3, "定位3*3*3-百位": 3, "定位3*3*3-十位": 3,
+    }, digits=True),
+    "排列3": LotteryProfile(63, (0, 9), 3, {
+        "独胆": 1, "双胆": 2, "三胆": 3, "五码组选": 5, "杀一": 1, "百位定3": 3, "个位定3": 3,
+    }, digits=True),
+    "排列5": LotteryProfile(64, (0, 9), 5, {
+        "万位定3": 3, "千位定3": 3, "百位定3": 3, "十位定3": 3, "个位定3": 3,
+        "万位杀1": 1, "个位杀1": 1, "独胆": 1, "双胆": 2,
+    }, digits=True),
+    "快乐8": LotteryProfile(8, (1, 80), 20, {
+        "1码": 1, "2码": 2, "3码": 3, "5码": 5, "8码": 8, "10码": 10, "15码": 15, "杀5码": 5, "杀10码": 10,
+    }),
+    "双色球": LotteryProfile(5, (1, 33), 6, {
+        "红球独胆": 1, "红球双胆": 2, "红球三胆": 3, "红球12码": 12, "红球20码": 20, "红球杀六": 6,
+        "龙头两码": 2, "凤尾两码": 2, "蓝球定三": 3, "蓝球杀五": 5,
+    }, blue_range=(1, 16), blue_count=1),
+    "大乐透": LotteryProfile(39, (1, 35), 5, {
+        "红球独胆": 1, "红球双胆": 2, "红球三胆": 3, "红球20码": 20, "红球杀三": 3,
+        "龙头两码": 2, "凤尾两码": 2, "蓝球定三": 3, "蓝球杀五": 5,
+    }, blue_range=(1, 12), blue_count=2),
+}
+
+# 玩法 ID 起始值：按彩种错开，避免不同彩种共用 ID
+PLAYTYPE_ID_BASE = 1000
+
+
+@dataclass
+class BenchConfig:
+    seed: int = 20240101
+    issues: int = 120
+    experts: int = 300
+    participation: float = 0.5  # 每期每个专家参与某玩法的概率
+    hot_ratio: float = 0.3  # 跟随热号的推荐比例（产生重复推荐）
+    messy_ratio: float = 0.01  # 非标准写法比例
+    first_issue: int = 2024001
+
+
+@dataclass
+class LotteryData:
+    lottery_name: str
+    profile: LotteryProfile
+    playtype_ids: dict = field(default_factory=dict)  # {玩法名: playtype_id}
+    draws: list = field(default_factory=list)  # [(issue_name, open_code, blue_code)]
+    predictions: list = field(default_factory=list)  # [(issue_name, user_id, playtype_id, numbers)]
+
+
+def _format(values, padded: bool, sep: str = ",") -> str:
+    return sep.join(f"{v:02d}" if padded else str(v) for v in values)
+
+
+def _draw(rng: random.Random, profile: LotteryProfile) -> tuple[str, str]:
+    if profile.digits:
+        open_code = _format([rng.randint(0, 9) for _ in range(profile.red_count)], False)
+    else:
+        low, high = profile.red_range
+        open_code = _format(sorted(rng.sample(range(low, high + 1), profile.red_count)), True)
+    blue_code = ""
+    if profile.blue_range:
+        low, high = profile.blue_range
+        blue_code = _format(sorted(rng.sample(range(low, high + 1), profile.blue_count)), True)
+    return open_code, blue_code
+
+
+def _pick(rng: random.Random, profile: LotteryProfile, playtype: str, count: int) -> list[int]:
+    low, high = profile.blue_range if "蓝球" in playtype and profile.blue_range else profile.red_range
+    return sorted(rng.sample(range(low, high + 1), min(count, high - low + 1)))
+
+
+def generate_lottery(lottery_name: str, config: BenchConfig) -> LotteryData:
+    profile = LOTTERY_PROFILES[lottery_name]
+    rng = random.Random(config.seed * 1000 + profile.lottery_id)
+    data = LotteryData(lottery_name, profile)
+    base = PLAYTYPE_ID_BASE + profile.lottery_id * 100
+    data.playtype_ids = {name: base + i for i, name in enumerate(profile.playtypes)}
+
+    for offset in range(config.issues):
+        issue_name = str(config.first_issue + offset)
+        data.draws.append((issue_name, *_draw(rng, profile)))
+
+        hot = {
+            name: [_pick(rng, profile, name, count) for _ in range(5)]
+            for name, count in profile.playtypes.items()
+        }
+        for expert in range(config.experts):
+            user_id = 100000 + expert
+            for name, count in profile.playtypes.items():
+                if rng.random() >= config.participation:
+                    continue
+                values = rng.choice(hot[name]) if rng.random() < config.hot_ratio else _pick(rng, profile, name, count)
+                if rng.random() < config.messy_ratio:
+                    numbers = _format(values, profile.padded, rng.choice([" ", "，", ", "]))
+                else:
+                    numbers = _format(values, profile.padded)
+                data.predictions.append((issue_name, user_id, data.playtype_ids[name], numbers))
+    return data
+
+
+def generate(config: BenchConfig, lottery_names: list[str] | None = None) -> dict[str, LotteryData]:
+    return {name: generate_lottery(name, config) for name in (lottery_names or list(LOTTERY_PROFILES))}
+
+
+def _create_tables(conn, data: LotteryData):
+    result_table = get_result_table(data.lottery_name)
+    prediction_table = get_prediction_table(data.lottery_name)
+    blue_sql = "\n                blue_code VARCHAR(32) DEFAULT NULL," if data.profile.blue_range else ""
+    with conn.cursor() as cursor:
+        # 号码位图表按推荐表自增 ID 水位补齐，推荐表重建时必须一并删除
+        derived = (get_hit_stat_table(data.lottery_name), get_prediction_mask_table(data.lottery_name))
+        for table in (result_table, prediction_table, *derived):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"""
+            CREATE TABLE {result_table} (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                issue_name VARCHAR(32) NOT NULL,
+                open_code VARCHAR(128) NOT NULL,{blue_sql}
+                KEY idx_issue_name (issue_name)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE {prediction_table} (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                issue_name VARCHAR(32) NOT NULL,
+                user_id BIGINT NOT NULL,
+                playtype_id INT NOT NULL,
+                numbers VARCHAR(255) DEFAULT NULL,
+                KEY idx_issue_name (issue_name)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+    conn.commit()
+
+
+def load_into(conn, datasets: dict[str, LotteryData], batch_size: int = 5000):
+    """
+    写入开奖表、推荐表与 playtype_dict（已存在的同名表会被删除重建，只能用于基准测试库）。
+    命中汇总表由调用方使用 ensure_hit_stat_table_exists 创建。
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS playtype_dict (
+                playtype_id INT NOT NULL,
+                lottery_id INT NOT NULL,
+                playtype_name VARCHAR(64) NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+    for data in datasets.values():
+        _create_tables(conn, data)
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM playtype_dict WHERE lottery_id = %s", (data.profile.lottery_id,))
+            cursor.executemany(
+                "INSERT INTO playtype_dict (playtype_id, lottery_id, playtype_name) VALUES (%s, %s, %s)",
+                [(pid, data.profile.lottery_id, name) for name, pid in data.playtype_ids.items()]
+            )
+            if data.profile.blue_range:
+                cursor.executemany(
+                    f"INSERT INTO {get_result_table(data.lottery_name)} (issue_name, open_code, blue_code) "
+                    "VALUES (%s, %s, %s)",
+                    data.draws
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {get_result_table(data.lottery_name)} (issue_name, open_code) VALUES (%s, %s)",
+                    [draw[:2] for draw in data.draws]
+                )
+            sql = (
+                f"INSERT INTO {get_prediction_table(data.lottery_name)} (issue_name, user_id, playtype_id, numbers) "
+                "VALUES (%s, %s, %s, %s)"
+            )
+            for offset in range(0, len(data.predictions), batch_size):
+                cursor.executemany(sql, data.predictions[offset:offset + batch_size])
+        conn.commit()
@@ -3,26 +3,76 @@ import pymysql
 import pandas as pd
 import re
 import os
+import threading
 import warnings
+from contextlib import contextmanager
 warnings.filterwarnings("ignore", category=UserWarning, message="pandas only supports SQLAlchemy.*")
 from dotenv import load_dotenv
 load_dotenv()
 
 DB_CONFIG = {
     'host': os.getenv("MYSQL_HOST"),
-    'port': int(os.getenv("MYSQL_PORT")),
+    'port': int(os.getenv("MYSQL_PORT", "3306")),
     'user': os.getenv("MYSQL_USER"),
     'password': os.getenv("MYSQL_PASSWORD"),
     'database': os.getenv("MYSQL_DATABASE"),
     'charset': 'utf8mb4'
 }
 
+# 远程库（命中汇总增量同步目标，见 utils/hit_sync.py）
+REMOTE_DB_CONFIG = {
+    'host': os.getenv("REMOTE_MYSQL_HOST"),
+    'port': int(os.getenv("REMOTE_MYSQL_PORT") or "3306"),
+    'user': os.getenv("REMOTE_MYSQL_USER"),
+    'password': os.getenv("REMOTE_MYSQL_PASSWORD"),
+    'database': os.getenv("REMOTE_MYSQL_DATABASE"),
+    'charset': 'utf8mb4'
+}
+
+
+
+# 替换底层连接创建方式（如基准测试使用 SQLite 替身库），None 表示使用 PyMySQL
+_CONNECTION_FACTORY = None
+
+
+def set_connection_factory(factory):
+    """
+    设置连接工厂：factory(**overrides) 返回 DB-API 连接；传 None 恢复 PyMySQL。
+    已有连接池中的空闲连接会被丢弃。
+    """
+    global _CONNECTION_FACTORY
+    _CONNECTION_FACTORY = factory
+    close_pools()
+
 
+# 远程库连接工厂（测试时可替换），None 表示使用 PyMySQL + REMOTE_DB_CONFIG
+_REMOTE_CONNECTION_FACTORY = None
 
-def get_connection():
-    """获取数据库连接"""
+
+def set_remote_connection_factory(factory):
+    global _REMOTE_CONNECTION_FACTORY
+    _REMOTE_CONNECTION_FACTORY = factory
+
+
+class RemoteConfigError(RuntimeError):
+    """未配置远程库（REMOTE_MYSQL_HOST 为空）"""
+
+
+def get_remote_connection(**overrides):
+    """获取远程库连接（未配置 REMOTE_MYSQL_HOST 时抛出 RemoteConfigError）"""
+    if _REMOTE_CONNECTION_FACTORY is not None:
+        return _REMOTE_CONNECTION_FACTORY(**overrides)
+    if not REMOTE_DB_CONFIG['host']:
+        raise RemoteConfigError("未配置远程库：请设置 REMOTE_MYSQL_HOST / REMOTE_MYSQL_USER 等环境变量")
+    return pymysql.connect(**{**REMOTE_DB_CONFIG, **overrides})
+
+
+def get_connection(**overrides):
+    """获取数据库连接（overrides 可覆盖连接参数，如 local_infile=True）"""
+    if _CONNECTION_FACTORY is not None:
+        return _CONNECTION_FACTORY(**overrides)
     try:
-        conn = pymysql.connect(**DB_CONFIG)
+        conn = pymysql.connect(**{**DB_CONFIG, **overrides})
         return conn
     except pymysql.MySQLError as e:
         # 判断是否在 streamlit 环境，否则打印
@@ -34,6 +84,201 @@ def get_connection():
             raise
 
 
+class ConnectionPool:
+    """
+    线程安全的 PyMySQL 连接池
+    - max_size：同时借出的连接上限，超出时等待归还
+    - 借出前 ping 检测存活，失效连接自动重连或重建
+    - 归还时回滚未提交事务，与直接 close 的语义一致
+    - fork 后的子进程不复用父进程的连接，自动重新建立
+    """
+
+    def __init__(self, max_size: int = 5, **overrides):
+        self.max_size = max(int(max_size), 1)
+        self.overrides = overrides
+        self._idle: list = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # 子进程：丢弃继承自父进程的连接（不关闭，避免影响父进程的 socket）
+            self._idle = []
+            self._in_use = 0
+            self._cond = threading.Condition()
+            self._pid = os.getpid()
+
+    def acquire(self, timeout: float | None = None):
+        self._check_pid()
+        with self._cond:
+            while not self._idle and self._in_use >= self.max_size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError(f"连接池已满（{self.max_size}），等待超时")
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if conn is not None:
+                try:
+                    conn.ping(reconnect=True)
+                except pymysql.MySQLError:
+                    self._close_quietly(conn)
+                    conn = None
+            if conn is None:
+                conn = get_connection(**self.overrides)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        if self._pid != os.getpid():
+            return
+        if not discard:
+            try:
+                conn.rollback()
+            except pymysql.MySQLError:
+                discard = True
+        if discard:
+            self._close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except pymysql.MySQLError:
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_POOLS: dict[tuple, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(**overrides) -> ConnectionPool:
+    """获取共享连接池（相同连接参数共用一个池，大小由 MYSQL_POOL_SIZE 控制，默认 5）"""
+    key = tuple(sorted(overrides.items()))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(int(os.getenv("MYSQL_POOL_SIZE", "5")), **overrides)
+            _POOLS[key] = pool
+        return pool
+
+
+def pooled_connection(**overrides):
+    """
+    从共享连接池借出连接（上下文管理器）：
+        with pooled_connection() as conn:
+            ...
+    """
+    return get_pool(**overrides).connection()
+
+
+def close_pools():
+    """关闭所有连接池中的空闲连接"""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def get_table_columns(conn, table_name: str) -> set[str]:
+    """读取数据表字段列表"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def get_table_indexes(conn, table_name: str) -> set[str]:
+    """读取数据表已有索引名称"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SHOW INDEX FROM `{table_name}`")
+        return {row[2] for row in cursor.fetchall()}
+
+
+class MetadataCache:
+    """
+    单次运行内的元数据缓存：表字段、索引、playtype_dict 只读取一次
+    - playtype_names 返回 {playtype_id: playtype_name}；
+      字典不可用或同一玩法存在多条记录（JOIN 会放大行数）时返回 None，由调用方回退 JOIN 查询
+    """
+
+    def __init__(self):
+        self._columns: dict[str, set[str]] = {}
+        self._indexes: dict[str, set[str]] = {}
+        self._playtypes: dict[int, dict | None] = {}
+        self._lock = threading.Lock()
+
+    def columns(self, conn, table_name: str) -> set[str]:
+        if table_name not in self._columns:
+            columns = get_table_columns(conn, table_name)
+            with self._lock:
+                self._columns[table_name] = columns
+        return self._columns[table_name]
+
+    def indexes(self, conn, table_name: str) -> set[str]:
+        if table_name not in self._indexes:
+            indexes = get_table_indexes(conn, table_name)
+            with self._lock:
+                self._indexes[table_name] = indexes
+        return self._indexes[table_name]
+
+    def playtype_names(self, conn, lottery_id: int) -> dict | None:
+        if lottery_id not in self._playtypes:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT playtype_id, playtype_name FROM playtype_dict WHERE lottery_id = %s",
+                        (lottery_id,)
+                    )
+                    rows = cursor.fetchall()
+                ids = [row[0] for row in rows]
+                names = {row[0]: row[1] for row in rows} if len(set(ids)) == len(ids) else None
+            except pymysql.MySQLError:
+                names = None
+            with self._lock:
+                self._playtypes[lottery_id] = names
+        return self._playtypes[lottery_id]
+
+    def invalidate(self, table_name: str | None = None):
+        with self._lock:
+            if table_name is None:
+                self._columns.clear()
+                self._indexes.clear()
+                self._playtypes.clear()
+            else:
+                self._columns.pop(table_name, None)
+                self._indexes.pop(table_name, None)
+
+
 # 给streamlit前台使用
 def get_prediction_table(lottery_name: str) -> str:
     """根据彩票名称返回对应专家预测表"""
@@ -99,6 +344,7 @@ def get_user_ids_by_source_tags(conn, table_name: str, issue_name: str, source_t
     """
     根据来源标签，在指定期号内获取所有 user_id。
     可用于排除某些来源下的专家。
+    conn 为 None 时使用共享连接池。
     """
     if not source_tags:
         return []
@@ -108,7 +354,11 @@ def get_user_ids_by_source_tags(conn, table_name: str, issue_name: str, source_t
         FROM {table_name}
         WHERE issue_name = %s AND source_tag IN ({','.join(['%s'] * len(source_tags))})
     """
-    df = pd.read_sql(query, conn, params=[issue_name, *source_tags])
+    if conn is None:
+        with pooled_connection() as pooled:
+            df = pd.read_sql(query, pooled, params=[issue_name, *source_tags])
+    else:
+        df = pd.read_sql(query, conn, params=[issue_name, *source_tags])
     return df["user_id"].tolist()
 
 
@@ -134,6 +384,7 @@ LOTTERIES_WITH_BLUE = {"双色球", "大乐透"}
 def get_open_info(conn, result_table, issue_name, lottery_name=None):
     """
     获取指定期号的开奖号码（自动判断是否包含蓝球/后区，并封装展示函数）
+    conn 为 None 时使用共享连接池。
 
     返回:
         dict {
@@ -149,11 +400,32 @@ def get_open_info(conn, result_table, issue_name, lottery_name=None):
         }
     """
 
-    result_row = pd.read_sql(
-        f"SELECT * FROM {result_table} WHERE issue_name = %s LIMIT 1",
-        conn,
-        params=[issue_name]
-    )
+    # ✅ 优先读取已物化的开奖特征表；特征表不存在或该期尚未物化时按开奖表现算
+    if lottery_name is not None:
+        feature_table = get_draw_feature_table(lottery_name)
+    else:
+        feature_table = result_table.replace("lottery_results_", "lottery_draw_features_", 1)
+    feature_query = f"""
+        SELECT open_code, blue_code, sum_value, span, odd_even_ratio, big_small_ratio
+        FROM {feature_table} WHERE issue_name = %s
+    """
+    query = f"SELECT * FROM {result_table} WHERE issue_name = %s LIMIT 1"
+
+    def read_open_info(db_conn):
+        try:
+            feature_row = pd.read_sql(feature_query, db_conn, params=[issue_name])
+        except (pymysql.err.ProgrammingError, pd.errors.DatabaseError):
+            # 特征表尚未创建：回退到开奖表（pandas 对非 SQLAlchemy 连接会把驱动异常包装为 DatabaseError）
+            feature_row = pd.DataFrame()
+        if not feature_row.empty:
+            return feature_row, True
+        return pd.read_sql(query, db_conn, params=[issue_name]), False
+
+    if conn is None:
+        with pooled_connection() as pooled:
+            result_row, materialized = read_open_info(pooled)
+    else:
+        result_row, materialized = read_open_info(conn)
 
     if result_row.empty:
         return {
@@ -175,16 +447,22 @@ def get_open_info(conn, result_table, issue_name, lottery_name=None):
     blue_nums = list(map(int, re.findall(r"\d+", blue_code))) if blue_code else []
 
     # ✅ 扩展字段
-    total_sum = sum(open_nums) if open_nums else None
-    span = max(open_nums) - min(open_nums) if open_nums else None
-    odd_count = sum(1 for n in open_nums if n % 2 == 1)
-    even_count = len(open_nums) - odd_count
-    odd_even_ratio = f"{odd_count}:{even_count}"
-
-    half = 5  # 默认分界点，5及以下为小，6及以上为大（3D/排列类）
-    big_count = sum(1 for n in open_nums if n > half)
-    small_count = len(open_nums) - big_count
-    big_small_ratio = f"{big_count}:{small_count}"
+    if materialized:
+        total_sum = None if pd.isna(row["sum_value"]) else int(row["sum_value"])
+        span = None if pd.isna(row["span"]) else int(row["span"])
+        odd_even_ratio = row["odd_even_ratio"]
+        big_small_ratio = row["big_small_ratio"]
+    else:
+        total_sum = sum(open_nums) if open_nums else None
+        span = max(open_nums) - min(open_nums) if open_nums else None
+        odd_count = sum(1 for n in open_nums if n % 2 == 1)
+        even_count = len(open_nums) - odd_count
+        odd_even_ratio = f"{odd_count}:{even_count}"
+
+        half = 5  # 默认分界点，5及以下为小，6及以上为大（3D/排列类）
+        big_count = sum(1 for n in open_nums if n > half)
+        small_count = len(open_nums) - big_count
+        big_small_ratio = f"{big_count}:{small_count}"
 
     # ✅ 渲染展示组件
     def render_open_result():
@@ -233,3 +511,124 @@ def get_hit_stat_table(lottery_name: str) -> str:
     }
     return mapping.get(lottery_name, "expert_hit_stat_3d")
 
+
+def get_hit_progress_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应命中汇总进度表（Today 增量水位）"""
+    mapping = {
+        "福彩3D": "expert_hit_progress_3d",
+        "排列3": "expert_hit_progress_p3",
+        "排列5": "expert_hit_progress_p5",
+        "快乐8": "expert_hit_progress_klb",
+        "双色球": "expert_hit_progress_ssq",
+        "大乐透": "expert_hit_progress_dlt",
+    }
+    return mapping.get(lottery_name, "expert_hit_progress_3d")
+
+def get_hit_rolling_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应专家滚动表现表"""
+    mapping = {
+        "福彩3D": "expert_hit_rolling_3d",
+        "排列3": "expert_hit_rolling_p3",
+        "排列5": "expert_hit_rolling_p5",
+        "快乐8": "expert_hit_rolling_klb",
+        "双色球": "expert_hit_rolling_ssq",
+        "大乐透": "expert_hit_rolling_dlt",
+    }
+    return mapping.get(lottery_name, "expert_hit_rolling_3d")
+
+def get_prediction_mask_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应推荐号码位图表（numbers 解析结果）"""
+    mapping = {
+        "福彩3D": "expert_prediction_mask_3d",
+        "排列3": "expert_prediction_mask_p3",
+        "排列5": "expert_prediction_mask_p5",
+        "快乐8": "expert_prediction_mask_klb",
+        "双色球": "expert_prediction_mask_ssq",
+        "大乐透": "expert_prediction_mask_dlt",
+    }
+    return mapping.get(lottery_name, "expert_prediction_mask_3d")
+
+def get_hit_sync_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应命中汇总待同步期号表"""
+    mapping = {
+        "福彩3D": "expert_hit_sync_3d",
+        "排列3": "expert_hit_sync_p3",
+        "排列5": "expert_hit_sync_p5",
+        "快乐8": "expert_hit_sync_klb",
+        "双色球": "expert_hit_sync_ssq",
+        "大乐透": "expert_hit_sync_dlt",
+    }
+    return mapping.get(lottery_name, "expert_hit_sync_3d")
+
+def get_hit_checkpoint_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应命中汇总全量回填断点表"""
+    mapping = {
+        "福彩3D": "expert_hit_checkpoint_3d",
+        "排列3": "expert_hit_checkpoint_p3",
+        "排列5": "expert_hit_checkpoint_p5",
+        "快乐8": "expert_hit_checkpoint_klb",
+        "双色球": "expert_hit_checkpoint_ssq",
+        "大乐透": "expert_hit_checkpoint_dlt",
+    }
+    return mapping.get(lottery_name, "expert_hit_checkpoint_3d")
+
+def get_hit_outcome_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应开奖前结果空间命中矩阵表（仅数字型彩种，见 utils/outcome_matrix.py）"""
+    mapping = {
+        "福彩3D": "expert_hit_outcome_3d",
+        "排列3": "expert_hit_outcome_p3",
+        "排列5": "expert_hit_outcome_p5",
+    }
+    return mapping.get(lottery_name, "expert_hit_outcome_3d")
+
+def get_hit_outcome_issue_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应结果空间命中矩阵的期号状态表（构建时的推荐数 / 最大推荐 ID）"""
+    mapping = {
+        "福彩3D": "expert_hit_outcome_issue_3d",
+        "排列3": "expert_hit_outcome_issue_p3",
+        "排列5": "expert_hit_outcome_issue_p5",
+    }
+    return mapping.get(lottery_name, "expert_hit_outcome_issue_3d")
+
+def get_draw_feature_table(lottery_name: str) -> str:
+    """根据彩票名称返回对应开奖特征表（和值 / 跨度 / 奇偶比 / 大小比，见 utils/draw_features.py）"""
+    mapping = {
+        "福彩3D": "lottery_draw_features_3d",
+        "排列3": "lottery_draw_features_p3",
+        "排列5": "lottery_draw_features_p5",
+        "快乐8": "lottery_draw_features_klb",
+        "双色球": "lottery_draw_features_ssq",
+        "大乐透": "lottery_draw_features_dlt",
+    }
+    return mapping.get(lottery_name, "lottery_draw_features_3d")
+
+def get_draw_features(conn, lottery_name: str, issue_from: str | None = None, issue_to: str | None = None,
+                      limit: int | None = None) -> pd.DataFrame:
+    """
+    一次查询期号范围内的开奖特征（走势图使用），按期号升序。
+    - issue_from / issue_to：含两端，为空时不限
+    - limit：只取范围内最近 limit 期
+    conn 为 None 时使用共享连接池。
+    """
+    conditions, params = [], []
+    if issue_from is not None:
+        conditions.append("issue_name >= %s")
+        params.append(str(issue_from))
+    if issue_to is not None:
+        conditions.append("issue_name <= %s")
+        params.append(str(issue_to))
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT issue_name, open_code, blue_code, sum_value, span, odd_count, even_count,
+               big_count, small_count, odd_even_ratio, big_small_ratio
+        FROM {get_draw_feature_table(lottery_name)} {where_sql}
+        ORDER BY issue_name DESC
+    """
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    if conn is None:
+        with pooled_connection() as pooled:
+            df = pd.read_sql(query, pooled, params=params or None)
+    else:
+        df = pd.read_sql(query, conn, params=params or None)
+    return df.iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,151 @@
+# utils/draw_features.py
+"""
+开奖特征表（lottery_draw_features_xxx）：和值 / 跨度 / 奇偶比 / 大小比按期物化
+
+📌 口径与 utils/db.get_open_info 原实现一致：
+- 开奖号取 open_code 中的全部数字；无数字时和值、跨度为空，比值为 0:0
+- 大小分界 5：6 及以上为大（各彩种统一）
+- 同一期号多行时取第一行
+
+📌 构建：一次读取开奖表，pandas 向量化计算（str.extractall + groupby），分批 upsert
+📌 增量：水位（特征表最大期号）之后的新开奖 + 最近 lookback 期按开奖指纹比对（兜底开奖号更正），均为期号范围查询
+"""
+import pandas as pd
+
+from utils.db import LOTTERIES_WITH_BLUE, get_draw_feature_table, get_result_table
+from utils.hit_progress import DEFAULT_LOOKBACK, draw_fingerprint
+
+BIG_THRESHOLD = 5
+
+FEATURE_COLUMNS = [
+    "issue_name", "open_code", "blue_code", "sum_value", "span",
+    "odd_count", "even_count", "big_count", "small_count",
+    "odd_even_ratio", "big_small_ratio", "draw_fingerprint",
+]
+
+
+def ensure_feature_table(conn, table_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                issue_name VARCHAR(32) NOT NULL PRIMARY KEY COMMENT '期号',
+                open_code VARCHAR(255) NOT NULL DEFAULT '' COMMENT '开奖号码',
+                blue_code VARCHAR(64) NOT NULL DEFAULT '' COMMENT '蓝球/后区',
+                sum_value INT DEFAULT NULL COMMENT '和值',
+                span INT DEFAULT NULL COMMENT '跨度',
+                odd_count TINYINT NOT NULL DEFAULT 0 COMMENT '奇数个数',
+                even_count TINYINT NOT NULL DEFAULT 0 COMMENT '偶数个数',
+                big_count TINYINT NOT NULL DEFAULT 0 COMMENT '大号个数',
+                small_count TINYINT NOT NULL DEFAULT 0 COMMENT '小号个数',
+                odd_even_ratio VARCHAR(16) NOT NULL DEFAULT '' COMMENT '奇偶比',
+                big_small_ratio VARCHAR(16) NOT NULL DEFAULT '' COMMENT '大小比',
+                draw_fingerprint CHAR(32) NOT NULL COMMENT '开奖号码指纹',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='开奖号码特征'
+            """
+        )
+    conn.commit()
+
+
+def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    开奖行 → 特征行（向量化）
+    - df 需包含 issue_name / open_code / blue_code
+    - 返回列见 FEATURE_COLUMNS，sum_value / span 无号码时为 None
+    """
+    df = df.assign(issue_name=df["issue_name"].astype(str))
+    df = df.drop_duplicates("issue_name", keep="first").reset_index(drop=True)
+    open_codes = df["open_code"].where(df["open_code"].map(lambda v: isinstance(v, str)), "")
+    blue_codes = df["blue_code"].where(df["blue_code"].map(lambda v: isinstance(v, str)), "")
+
+    nums = open_codes.str.extractall(r"(\d+)")[0].astype("int64").droplevel("match")
+    by_issue = nums.groupby(level=0)
+    count = by_issue.size().reindex(df.index, fill_value=0)
+    odd = (nums % 2).groupby(level=0).sum().reindex(df.index, fill_value=0)
+    big = (nums > BIG_THRESHOLD).groupby(level=0).sum().reindex(df.index, fill_value=0)
+    total = by_issue.sum().reindex(df.index)
+    span = (by_issue.max() - by_issue.min()).reindex(df.index)
+
+    result = pd.DataFrame({
+        "issue_name": df["issue_name"],
+        "open_code": open_codes,
+        "blue_code": blue_codes,
+        "sum_value": total.astype(object).where(total.notna(), None),
+        "span": span.astype(object).where(span.notna(), None),
+        "odd_count": odd.astype(int),
+        "even_count": (count - odd).astype(int),
+        "big_count": big.astype(int),
+        "small_count": (count - big).astype(int),
+    })
+    result["odd_even_ratio"] = result["odd_count"].astype(str) + ":" + result["even_count"].astype(str)
+    result["big_small_ratio"] = result["big_count"].astype(str) + ":" + result["small_count"].astype(str)
+    result["draw_fingerprint"] = [draw_fingerprint(o, b) for o, b in zip(open_codes, blue_codes)]
+    return result[FEATURE_COLUMNS]
+
+
+def _read_results(conn, lottery_name: str, where_sql: str = "", params: list | None = None) -> pd.DataFrame:
+    result_table = get_result_table(lottery_name)
+    blue_sql = "blue_code" if lottery_name in LOTTERIES_WITH_BLUE else "'' AS blue_code"
+    return pd.read_sql(
+        f"SELECT issue_name, open_code, {blue_sql} FROM {result_table} {where_sql}",
+        conn, params=params or None
+    )
+
+
+def write_features(conn, table_name: str, features: pd.DataFrame, batch_size: int = 2000) -> int:
+    if features.empty:
+        return 0
+    columns = ", ".join(FEATURE_COLUMNS)
+    updates = ", ".join(f"{column} = VALUES({column})" for column in FEATURE_COLUMNS[1:])
+    sql = f"""
+        INSERT INTO {table_name} ({columns})
+        VALUES ({', '.join(['%s'] * len(FEATURE_COLUMNS))})
+        ON DUPLICATE KEY UPDATE {updates}
+    """
+    rows = [
+        tuple(value.item() if hasattr(value, "item") else value for value in row)
+        for row in features.itertuples(index=False, name=None)
+    ]
+    with conn.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+    conn.commit()
+    return len(rows)
+
+
+def rebuild_features(conn, lottery_name: str) -> int:
+    """全量重建：清空后按开奖表一次计算写入，返回期数"""
+    table_name = get_draw_feature_table(lottery_name)
+    ensure_feature_table(conn, table_name)
+    features = compute_features(_read_results(conn, lottery_name))
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table_name}")
+    return write_features(conn, table_name, features)
+
+
+def refresh_features(conn, lottery_name: str, lookback: int = DEFAULT_LOOKBACK) -> dict:
+    """
+    增量维护：特征表为空时全量构建，否则只计算水位之后的新开奖与回看窗口内指纹变化的期号。
+    返回 {"added", "updated", "rebuilt"}
+    """
+    table_name = get_draw_feature_table(lottery_name)
+    ensure_feature_table(conn, table_name)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT issue_name, draw_fingerprint FROM {table_name} ORDER BY issue_name DESC LIMIT %s",
+            [max(lookback, 1)]
+        )
+        recent = {str(issue): fingerprint for issue, fingerprint in cursor.fetchall()}
+    if not recent:
+        return {"added": 0, "updated": 0, "rebuilt": rebuild_features(conn, lottery_name)}
+
+    # 回看窗口起点之后（含）的开奖：新期号 + 窗口内期号
+    window_start = min(recent)
+    features = compute_features(_read_results(conn, lottery_name, "WHERE issue_name >= %s", [window_start]))
+    known = features["issue_name"].isin(recent.keys())
+    changed = known & (features["draw_fingerprint"] != features["issue_name"].map(recent))
+    # recent 即特征表中窗口起点之后的全部期号：不在其中的是新开奖（含迟到补录的期号）
+    added = ~known
+    write_features(conn, table_name, features[changed | added])
+    return {"added": int(added.sum()), "updated": int(changed.sum()), "rebuilt": 0}
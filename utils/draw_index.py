@@ -0,0 +1,125 @@
+# utils/draw_index.py
+"""
+开奖号码内存索引：每个彩种每次运行只读取一次开奖表
+
+📌 每期预先解析：
+- red / blue：开奖号与蓝球号码（字符串，与 match_hit 的比较口径一致）
+- digits：按位整数（福彩3D / 排列3 / 排列5 定位玩法使用）
+- mask：开奖位图（hit_mask.DrawMask）
+全量、Today、单期模式共用同一索引；遇到索引中没有的期号时只查询更新的期号（期号范围查询）。
+"""
+import re
+from typing import NamedTuple
+
+import pandas as pd
+
+from utils.db import LOTTERIES_WITH_BLUE, get_result_table
+from utils.hit_mask import DrawMask, encode_draw, get_mask_words
+from utils.hit_rule import parse_int_list
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+class DrawEntry(NamedTuple):
+    """
+    单期开奖（前两项与 (open_code, blue_code) 元组兼容，可直接 open_code, blue_code = entry[:2]）
+    """
+    open_code: str
+    blue_code: str
+    red: tuple
+    blue: tuple
+    digits: tuple
+    mask: DrawMask
+
+    @property
+    def open_len(self) -> int:
+        return len(self.red)
+
+
+def parse_draw(open_code, blue_code, words: int) -> DrawEntry:
+    # 开奖号异常（如 NULL）时不在此处报错，保持由计算时的 match_hit 抛出
+    red = tuple(_NUMBER_RE.findall(open_code)) if isinstance(open_code, str) else ()
+    blue = tuple(_NUMBER_RE.findall(blue_code)) if isinstance(blue_code, str) else ()
+    digits = tuple(parse_int_list(open_code)) if isinstance(open_code, str) else ()
+    return DrawEntry(open_code, blue_code, red, blue, digits, encode_draw(open_code, blue_code, words))
+
+
+class DrawIndex:
+    """单个彩种的开奖索引（同一期号存在多行时取第一行，与单期模式 iloc[0] 保持一致）"""
+
+    def __init__(self, lottery_name: str):
+        self.lottery_name = lottery_name
+        self.result_table = get_result_table(lottery_name)
+        self.words = get_mask_words(lottery_name)
+        self.with_blue = lottery_name in LOTTERIES_WITH_BLUE
+        self.entries: dict[str, DrawEntry] = {}
+        self.max_issue: str | None = None
+        self.loaded = False
+
+    def _fetch(self, conn, where_sql: str = "", params: list | None = None) -> int:
+        select_cols = "issue_name, open_code" + (", blue_code" if self.with_blue else "")
+        df = pd.read_sql(
+            f"SELECT {select_cols} FROM {self.result_table} {where_sql}",
+            conn, params=params or None
+        )
+        added = 0
+        blue_codes = df["blue_code"] if self.with_blue else [""] * len(df)
+        for issue_name, open_code, blue_code in zip(df["issue_name"].astype(str), df["open_code"], blue_codes):
+            if issue_name in self.entries:
+                continue
+            self.entries[issue_name] = parse_draw(open_code, blue_code, self.words)
+            added += 1
+            if self.max_issue is None or issue_name > self.max_issue:
+                self.max_issue = issue_name
+        return added
+
+    def load(self, conn) -> int:
+        self.entries.clear()
+        self.max_issue = None
+        self.loaded = True
+        return self._fetch(conn)
+
+    def refresh(self, conn) -> int:
+        """只读取比已加载最大期号更新的开奖"""
+        if not self.loaded or self.max_issue is None:
+            return self.load(conn)
+        return self._fetch(conn, "WHERE issue_name > %s", [self.max_issue])
+
+    def invalidate(self, issues):
+        """丢弃指定期号（开奖号码可能已更正），下次访问时按期号重新读取"""
+        for issue in issues:
+            self.entries.pop(issue, None)
+
+    def draws(self, conn, issues: list[str] | None = None) -> dict[str, DrawEntry]:
+        """返回 {期号: DrawEntry}；issues 为空时返回全部期号，缺少的期号先增量刷新再补查"""
+        if not self.loaded:
+            self.load(conn)
+        elif issues is None:
+            self.refresh(conn)
+        if issues is None:
+            return dict(self.entries)
+
+        missing = [issue for issue in issues if issue not in self.entries]
+        if missing:
+            self.refresh(conn)
+            missing = [issue for issue in missing if issue not in self.entries]
+        if missing:
+            # 期号乱序写入（早于已加载最大期号）时按期号补查
+            self._fetch(conn, f"WHERE issue_name IN ({', '.join(['%s'] * len(missing))})", missing)
+        return {issue: self.entries[issue] for issue in issues if issue in self.entries}
+
+
+_INDEXES: dict[str, DrawIndex] = {}
+
+
+def get_draw_index(lottery_name: str) -> DrawIndex:
+    """进程内共享的开奖索引（进程池子进程各自加载一次）"""
+    index = _INDEXES.get(lottery_name)
+    if index is None:
+        index = _INDEXES[lottery_name] = DrawIndex(lottery_name)
+    return index
+
+
+def reset_draw_indexes():
+    """丢弃全部已加载的开奖索引（基准测试按冷启动计时）"""
+    _INDEXES.clear()
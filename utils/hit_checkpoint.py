@@ -0,0 +1,65 @@
+# utils/hit_checkpoint.py
+"""
+全量回填断点表（expert_hit_checkpoint_xxx）：记录本轮全量已完成的期号
+
+📌 写入：期号的命中汇总全部写入后，在同一连接上登记断点，随汇总一起提交
+（提交粒度为 batch 时断点随下一次提交落库：断点永远不会早于汇总提交，最坏情况是重算一次）
+
+📌 续跑：全量开始前读取断点，跳过已完成的期号；本轮（期号范围 / 分片内）全部成功后清除这些断点，
+下次全量重新从头计算。--restart 在开始前清除断点。
+"""
+import pymysql
+
+
+def ensure_checkpoint_table(conn, table_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                issue_name VARCHAR(32) NOT NULL PRIMARY KEY COMMENT '期号',
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '完成时间'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='专家命中汇总全量回填断点'
+            """
+        )
+    conn.commit()
+
+
+def completed_issues(conn, table_name: str) -> set[str]:
+    """已完成的期号（断点表不存在时为空）"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT issue_name FROM {table_name}")
+            return {str(row[0]) for row in cursor.fetchall()}
+    except pymysql.err.ProgrammingError:
+        return set()
+
+
+def mark_completed(conn, table_name: str, issues, batch_size: int = 2000):
+    """登记已完成的期号（不提交，由写入器随命中汇总一起提交）"""
+    issues = sorted({str(issue) for issue in issues})
+    sql = f"""
+        INSERT INTO {table_name} (issue_name) VALUES (%s)
+        ON DUPLICATE KEY UPDATE completed_at = CURRENT_TIMESTAMP
+    """
+    with conn.cursor() as cursor:
+        for offset in range(0, len(issues), batch_size):
+            cursor.executemany(sql, [(issue,) for issue in issues[offset:offset + batch_size]])
+
+
+def clear_checkpoints(conn, table_name: str, issues: list[str] | None = None, batch_size: int = 2000) -> int:
+    """清除断点（issues 为 None 时清空），返回清除的期号数"""
+    with conn.cursor() as cursor:
+        if issues is None:
+            cursor.execute(f"DELETE FROM {table_name}")
+            count = cursor.rowcount
+        else:
+            count = 0
+            for offset in range(0, len(issues), batch_size):
+                chunk = issues[offset:offset + batch_size]
+                cursor.execute(
+                    f"DELETE FROM {table_name} WHERE issue_name IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk
+                )
+                count += cursor.rowcount
+    conn.commit()
+    return max(count, 0)
@@ -0,0 +1,222 @@
+# utils/hit_mask.py
+"""
+号码位图编码 + NumPy 批量命中判断
+
+📌 说明：
+- 每个号码 n 对应第 n 位，快乐8 使用 2 个 uint64（0~127），其他彩种 1 个 uint64（0~63）
+- 仅对“干净”的号码串编码（纯数字 + 逗号分隔），否则返回无效，由调用方回退到 hit_rule 逐行判断
+- match_hit 按字符串比较号码（"05" 与 "5" 不相等），因此额外记录号码书写风格，
+  预测与开奖风格冲突时同样视为无效，保证与 hit_rule 结果完全一致
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from utils.hit_rule import HitRule
+
+# ✅ 彩种位图宽度（uint64 个数）
+MASK_WORDS_BY_LOTTERY = {"快乐8": 2}
+
+# ✅ 号码书写风格：个位数写作 "5" / 写作 "05"
+STYLE_PLAIN = 1
+STYLE_PADDED = 2
+
+_CLEAN_RE = re.compile(r"\s*(?:[0-9]+(?:\s*,\s*[0-9]+)*)?\s*\Z")
+_DIGITS_RE = re.compile(r"[0-9]+")
+
+
+def get_mask_words(lottery_name: str) -> int:
+    """返回彩种位图使用的 uint64 个数"""
+    return MASK_WORDS_BY_LOTTERY.get(lottery_name, 1)
+
+
+def encode_numbers(text, words: int = 1):
+    """
+    将号码串编码为位图。
+
+    返回:
+    - (mask, style, values)：mask 为 Python int 位图，style 为书写风格标记，values 为按原顺序的整数列表
+    - None：号码串无法精确表示（含非逗号分隔符、超出位宽或 "007" 之类写法）
+    """
+    if not isinstance(text, str) or not _CLEAN_RE.match(text):
+        return None
+
+    limit = 64 * words
+    mask = 0
+    style = 0
+    values = []
+    for token in _DIGITS_RE.findall(text):
+        value = int(token)
+        if value >= limit:
+            return None
+        if value < 10:
+            if len(token) == 1:
+                style |= STYLE_PLAIN
+            elif len(token) == 2:
+                style |= STYLE_PADDED
+            else:
+                return None
+        elif len(token) != len(str(value)):
+            return None
+        mask |= 1 << value
+        values.append(value)
+    return mask, style, values
+
+
+def mask_to_words(mask: int, words: int) -> np.ndarray:
+    """Python int 位图拆分为 uint64 数组"""
+    return np.array([(mask >> (64 * i)) & 0xFFFFFFFFFFFFFFFF for i in range(words)], dtype=np.uint64)
+
+
+def decode_numbers(mask_words, style: int) -> str:
+    """
+    位图 → 号码串（升序，逗号分隔；书写风格为 STYLE_PADDED 时个位数补零）
+    与原号码串编码结果相同，按位图判断的命中结果也相同
+    """
+    mask = sum(int(word) << (64 * i) for i, word in enumerate(mask_words))
+    values = []
+    while mask:
+        low = mask & -mask
+        values.append(low.bit_length() - 1)
+        mask ^= low
+    return ",".join(f"{v:02d}" if v < 10 and style == STYLE_PADDED else str(v) for v in values)
+
+
+def encode_mask_array(texts, words: int = 1):
+    """
+    批量编码号码串。
+
+    返回:
+    - masks: uint64 数组，形状 (n, words)
+    - styles: uint8 数组，书写风格
+    - valid: bool 数组，False 表示需回退逐行判断
+    """
+    texts = list(texts)
+    n = len(texts)
+    masks = np.zeros((n, words), dtype=np.uint64)
+    styles = np.zeros(n, dtype=np.uint8)
+    valid = np.zeros(n, dtype=bool)
+    for i, text in enumerate(texts):
+        encoded = encode_numbers(text, words)
+        if encoded is None:
+            continue
+        mask, style, _ = encoded
+        for w in range(words):
+            masks[i, w] = (mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+        styles[i] = style
+        valid[i] = True
+    return masks, styles, valid
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """按行统计位图中 1 的个数"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).sum(axis=-1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(masks).view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+@dataclass
+class DrawMask:
+    """
+    单期开奖号码的位图形式。
+    - red / blue：开奖号（红球）与蓝球位图
+    - open_values：按原顺序的开奖号（整数），用于定位玩法
+    - valid：开奖号可精确编码时为 True
+    """
+    words: int
+    red: np.ndarray
+    blue: np.ndarray
+    red_style: int
+    blue_style: int
+    open_values: list
+    valid: bool
+
+
+def encode_draw(open_code, blue_code="", words: int = 1) -> DrawMask:
+    """编码单期开奖号码"""
+    red = encode_numbers(open_code, words)
+    blue = encode_numbers(blue_code, words) if blue_code else (0, 0, [])
+    if red is None or blue is None:
+        zeros = np.zeros(words, dtype=np.uint64)
+        return DrawMask(words, zeros, zeros, 0, 0, [], False)
+    return DrawMask(
+        words=words,
+        red=mask_to_words(red[0], words),
+        blue=mask_to_words(blue[0], words),
+        red_style=red[1],
+        blue_style=blue[1],
+        open_values=red[2],
+        valid=True,
+    )
+
+
+def _value_mask(value: int, words: int) -> np.ndarray:
+    return mask_to_words(1 << value, words)
+
+
+def resolve_hit_rule(rule: HitRule, draw: DrawMask):
+    """
+    将命中规则代入开奖号，化简为 (操作位图, 比较符, 阈值)。
+    返回 None 表示该玩法本期必不命中。
+    """
+    kind = rule.kind
+    if kind == "never":
+        return None
+    zone = draw.blue if rule.zone == "blue" else draw.red
+    if kind == "at_least":
+        return zone, ">=", rule.threshold
+    if kind == "none":
+        return zone, "==", 0
+    if kind == "less_than":
+        return zone, "<", rule.threshold
+    if kind == "cover":
+        return zone, "==", int(popcount(zone))
+    if kind == "pos_in":
+        return _value_mask(draw.open_values[rule.position], draw.words), ">=", 1
+    if kind == "pos_not_in":
+        return _value_mask(draw.open_values[rule.position], draw.words), "==", 0
+    if kind == "group":
+        unique_count = int(popcount(draw.red))
+        if unique_count == 1:
+            return _value_mask(draw.open_values[0], draw.words), ">=", 1
+        elif unique_count == 2:
+            return draw.red, ">=", 2
+        return draw.red, "==", 3
+    return None
+
+
+def batch_hit_counts(pred_masks: np.ndarray, draw_mask: np.ndarray) -> np.ndarray:
+    """批量统计预测位图与开奖位图的交集数量"""
+    return popcount(pred_masks & draw_mask)
+
+
+def batch_hit_flags(pred_masks: np.ndarray, rule: HitRule, draw: DrawMask) -> np.ndarray:
+    """批量判断命中（与 hit_rule.match_hit 语义一致）"""
+    resolved = resolve_hit_rule(rule, draw)
+    if resolved is None:
+        return np.zeros(len(pred_masks), dtype=bool)
+    operand, op, threshold = resolved
+    counts = batch_hit_counts(pred_masks, operand)
+    if op == ">=":
+        return counts >= threshold
+    if op == "<":
+        return counts < threshold
+    return counts == threshold
+
+
+def batch_count_hits(pred_masks: np.ndarray, count_rule: HitRule, draw: DrawMask) -> np.ndarray:
+    """批量统计命中数字数量（与 hit_rule.count_hit_numbers_by_playtype 语义一致）"""
+    if count_rule.kind == "pos_in":
+        if len(draw.open_values) <= count_rule.position:
+            return np.zeros(len(pred_masks), dtype=np.int64)
+        operand = _value_mask(draw.open_values[count_rule.position], draw.words)
+        return (batch_hit_counts(pred_masks, operand) > 0).astype(np.int64)
+    return batch_hit_counts(pred_masks, draw.red)
+
+
+def style_compatible(styles: np.ndarray, rule: HitRule, draw: DrawMask) -> np.ndarray:
+    """预测与开奖号书写风格不冲突时，位图判断才与字符串判断一致"""
+    draw_style = draw.blue_style if rule.zone == "blue" else draw.red_style
+    return (styles | np.uint8(draw_style)) != (STYLE_PLAIN | STYLE_PADDED)
@@ -0,0 +1,226 @@
+# utils/hit_progress.py
+"""
+命中汇总进度表（expert_hit_progress_xxx）：Today 增量水位
+
+📌 每个已汇总期号记录一行：
+- prediction_count / max_prediction_id：汇总时该期推荐记录数与最大自增 ID
+- draw_fingerprint：开奖号码指纹（open_code + blue_code 的 MD5）
+
+📌 Today 检测（均为按期号 / 自增 ID 的范围查询，不再 DISTINCT 全表）：
+- 新期号：开奖表中期号大于水位期号
+- 迟到推荐：推荐表中 id 大于已记录最大 ID 的期号
+- 回看窗口：最近 lookback 期逐期比对推荐数与开奖指纹（兜底删除、改号等情况）
+进度表为空时（首次运行或全量后已清空）回退到原 DISTINCT 逻辑并一次性补齐进度。
+"""
+import hashlib
+from dataclasses import dataclass
+
+import pandas as pd
+import pymysql
+
+from utils.db import LOTTERIES_WITH_BLUE, get_result_table
+
+# 默认回看最近 30 期
+DEFAULT_LOOKBACK = 30
+
+
+@dataclass(frozen=True)
+class IssueSnapshot:
+    """单期当前状态：推荐记录数、最大推荐 ID、开奖指纹"""
+    prediction_count: int
+    max_prediction_id: int | None
+    draw_fingerprint: str
+
+
+def draw_fingerprint(open_code, blue_code) -> str:
+    text = f"{open_code or ''}|{blue_code or ''}"
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def ensure_progress_table(conn, table_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                issue_name VARCHAR(32) NOT NULL PRIMARY KEY COMMENT '期号',
+                prediction_count INT NOT NULL DEFAULT 0 COMMENT '汇总时推荐记录数',
+                max_prediction_id BIGINT DEFAULT NULL COMMENT '汇总时最大推荐ID',
+                draw_fingerprint CHAR(32) NOT NULL COMMENT '开奖号码指纹',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+                KEY idx_max_prediction_id (max_prediction_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='专家命中汇总进度表'
+            """
+        )
+    conn.commit()
+
+
+def _in_clause(column: str, values) -> tuple[str, list]:
+    values = list(values)
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", values
+
+
+def _read_draws(conn, lottery_name: str, where_sql: str, params: list) -> dict[str, str]:
+    """返回 {期号: 开奖指纹}（同一期号多行时取第一行；无蓝球彩种的开奖表没有 blue_code 列）"""
+    blue_sql = "blue_code" if lottery_name in LOTTERIES_WITH_BLUE else "'' AS blue_code"
+    df = pd.read_sql(
+        f"SELECT issue_name, open_code, {blue_sql} FROM {get_result_table(lottery_name)} {where_sql}",
+        conn, params=params or None
+    )
+    fingerprints = {}
+    for issue_name, open_code, blue_code in zip(
+        df["issue_name"].astype(str), df["open_code"], df["blue_code"]
+    ):
+        fingerprints.setdefault(issue_name, draw_fingerprint(open_code, blue_code))
+    return fingerprints
+
+
+def _read_prediction_counts(conn, prediction_table: str, has_id: bool, where_sql: str, params: list) -> dict[str, tuple]:
+    """返回 {期号: (推荐记录数, 最大推荐ID)}"""
+    max_id_sql = "MAX(id)" if has_id else "NULL"
+    df = pd.read_sql(
+        f"""
+        SELECT issue_name, COUNT(*) AS prediction_count, {max_id_sql} AS max_prediction_id
+        FROM {prediction_table} {where_sql}
+        GROUP BY issue_name
+        """,
+        conn, params=params or None
+    )
+    counts = {}
+    for issue_name, count, max_id in zip(
+        df["issue_name"].astype(str), df["prediction_count"], df["max_prediction_id"]
+    ):
+        counts[issue_name] = (int(count), None if pd.isna(max_id) else int(max_id))
+    return counts
+
+
+def _read_progress(conn, progress_table: str, where_sql: str = "", params: list | None = None) -> dict[str, IssueSnapshot]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT issue_name, prediction_count, max_prediction_id, draw_fingerprint
+            FROM {progress_table} {where_sql}
+            """,
+            params or None
+        )
+        return {
+            str(issue_name): IssueSnapshot(int(count), None if max_id is None else int(max_id), fingerprint)
+            for issue_name, count, max_id, fingerprint in cursor.fetchall()
+        }
+
+
+def _snapshots(draws: dict[str, str], counts: dict[str, tuple]) -> dict[str, IssueSnapshot]:
+    """已开奖且有推荐的期号 → 当前状态"""
+    return {
+        issue_name: IssueSnapshot(count, max_id, draws[issue_name])
+        for issue_name, (count, max_id) in counts.items()
+        if issue_name in draws and count > 0
+    }
+
+
+def bootstrap_progress(conn, progress_table: str, lottery_name: str, prediction_table: str,
+                       summarized_issues: set[str], has_id: bool) -> dict[str, IssueSnapshot]:
+    """
+    进度表为空时一次性补齐：已汇总期号直接记录当前状态，返回尚需计算的期号及其状态
+    """
+    current = _snapshots(
+        _read_draws(conn, lottery_name, "", []),
+        _read_prediction_counts(conn, prediction_table, has_id, "", []),
+    )
+    record_progress(conn, progress_table, {
+        issue_name: snapshot for issue_name, snapshot in current.items() if issue_name in summarized_issues
+    })
+    return {issue_name: snapshot for issue_name, snapshot in current.items() if issue_name not in summarized_issues}
+
+
+def find_changed_issues(conn, progress_table: str, lottery_name: str, prediction_table: str,
+                        has_id: bool, lookback: int = DEFAULT_LOOKBACK) -> tuple[dict[str, IssueSnapshot], dict]:
+    """
+    按水位查找需要（重新）计算的期号。
+    返回 ({期号: 当前状态}, {"new": 新期号数, "late": 迟到推荐期号数, "changed": 窗口内变更期号数})；
+    进度表为空时返回 (None, {})，由调用方执行 bootstrap_progress。
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(issue_name), MAX(max_prediction_id) FROM {progress_table}")
+        watermark_issue, watermark_id = cursor.fetchone()
+        if watermark_issue is None:
+            return None, {}
+        cursor.execute(
+            f"SELECT issue_name FROM {progress_table} ORDER BY issue_name DESC LIMIT 1 OFFSET %s",
+            (max(int(lookback), 1) - 1,)
+        )
+        row = cursor.fetchone()
+    window_start = str(row[0]) if row else ""
+    watermark_issue = str(watermark_issue)
+
+    # 回看窗口 + 新期号：同一个期号范围查询
+    draws = _read_draws(conn, lottery_name, "WHERE issue_name >= %s", [window_start])
+
+    # 迟到推荐：自增 ID 范围查询
+    late_issues: set[str] = set()
+    if has_id and watermark_id is not None:
+        late_df = pd.read_sql(
+            f"SELECT DISTINCT issue_name FROM {prediction_table} WHERE id > %s",
+            conn, params=[int(watermark_id)]
+        )
+        late_issues = {str(issue) for issue in late_df["issue_name"].tolist()} - draws.keys()
+        if late_issues:
+            in_sql, in_params = _in_clause("issue_name", late_issues)
+            draws.update(_read_draws(conn, lottery_name, f"WHERE {in_sql}", in_params))
+            late_issues &= draws.keys()
+
+    counts = _read_prediction_counts(conn, prediction_table, has_id, "WHERE issue_name >= %s", [window_start])
+    progress_where, progress_params = "WHERE issue_name >= %s", [window_start]
+    if late_issues:
+        in_sql, in_params = _in_clause("issue_name", late_issues)
+        counts.update(_read_prediction_counts(conn, prediction_table, has_id, f"WHERE {in_sql}", in_params))
+        progress_where += f" OR {in_sql}"
+        progress_params += in_params
+    recorded = _read_progress(conn, progress_table, progress_where, progress_params)
+
+    todo: dict[str, IssueSnapshot] = {}
+    stats = {"new": 0, "late": 0, "changed": 0}
+    for issue_name, snapshot in sorted(_snapshots(draws, counts).items()):
+        previous = recorded.get(issue_name)
+        if previous == snapshot:
+            continue
+        todo[issue_name] = snapshot
+        if previous is None and issue_name > watermark_issue:
+            stats["new"] += 1
+        elif issue_name in late_issues:
+            stats["late"] += 1
+        else:
+            stats["changed"] += 1
+    return todo, stats
+
+
+def record_progress(conn, progress_table: str, snapshots: dict[str, IssueSnapshot]):
+    """记录期号汇总时的状态（重复执行幂等）"""
+    if not snapshots:
+        return
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"""
+            INSERT INTO {progress_table} (issue_name, prediction_count, max_prediction_id, draw_fingerprint)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                prediction_count = VALUES(prediction_count),
+                max_prediction_id = VALUES(max_prediction_id),
+                draw_fingerprint = VALUES(draw_fingerprint)
+            """,
+            [
+                (issue_name, s.prediction_count, s.max_prediction_id, s.draw_fingerprint)
+                for issue_name, s in snapshots.items()
+            ]
+        )
+    conn.commit()
+
+
+def clear_progress(conn, progress_table: str):
+    """全量重算后清空进度，下次 Today 重新补齐"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {progress_table}")
+        conn.commit()
+    except pymysql.err.ProgrammingError:
+        # 进度表尚未创建
+        conn.rollback()
@@ -0,0 +1,251 @@
+# utils/hit_rolling.py
+"""
+专家滚动表现表（expert_hit_rolling_xxx）：每个 彩种 + 专家 + 玩法 一行
+
+📌 口径（以专家“参与的期号”为序列，即 expert_hit_stat 中存在记录的期号）：
+- 命中期：该期 hit_count > 0
+- current_miss_streak / max_miss_streak：当前 / 历史最长连续未命中期数
+- avg_hit_interval：相邻两次命中期之间的平均间隔期数（真实命中间隔，而非单期 total / hit）
+- hit_rate_10 / 30 / 100：最近 10 / 30 / 100 个参与期的命中率（hit_history 保存最近 100 期命中标记）
+
+📌 更新方式：
+- 增量：新期号只读取本期汇总行与相关专家的上一状态，每个专家 O(1) 更新
+- 乱序（重算旧期号）：仅对受影响的专家按历史重放
+- 差异写入删除了汇总行（状态已覆盖该期号、但该期已无汇总行）：同样按历史重放，历史为空时删除状态
+- 全量重建：按期号顺序对全部历史重放同一更新函数，结果与增量路径完全一致
+"""
+from dataclasses import dataclass, fields
+
+import pandas as pd
+
+# 命中标记保留期数（最大统计窗口）
+HISTORY_SIZE = 100
+HIT_RATE_WINDOWS = (10, 30, 100)
+
+
+@dataclass
+class RollingState:
+    lottery_id: int
+    user_id: int
+    playtype_id: int
+    first_issue: str | None = None
+    last_issue: str | None = None
+    last_hit_issue: str | None = None
+    issue_count: int = 0
+    hit_issue_count: int = 0
+    current_miss_streak: int = 0
+    max_miss_streak: int = 0
+    last_hit_seq: int = 0
+    gap_sum: int = 0
+    gap_count: int = 0
+    hit_history: str = ""
+
+    def apply(self, issue_name: str, hit: bool):
+        """按期号顺序追加一期结果"""
+        self.issue_count += 1
+        if self.first_issue is None:
+            self.first_issue = issue_name
+        self.last_issue = issue_name
+        if hit:
+            if self.hit_issue_count:
+                self.gap_sum += self.issue_count - self.last_hit_seq
+                self.gap_count += 1
+            self.hit_issue_count += 1
+            self.last_hit_seq = self.issue_count
+            self.last_hit_issue = issue_name
+            self.current_miss_streak = 0
+        else:
+            self.current_miss_streak += 1
+            self.max_miss_streak = max(self.max_miss_streak, self.current_miss_streak)
+        self.hit_history = ("1" if hit else "0") + self.hit_history[:HISTORY_SIZE - 1]
+
+    @property
+    def avg_hit_interval(self) -> float | None:
+        return round(self.gap_sum / self.gap_count, 2) if self.gap_count else None
+
+    def hit_rate(self, window: int) -> float | None:
+        recent = self.hit_history[:window]
+        return round(recent.count("1") / len(recent), 4) if recent else None
+
+
+STATE_COLUMNS = [f.name for f in fields(RollingState)]
+DERIVED_COLUMNS = ["avg_hit_interval"] + [f"hit_rate_{window}" for window in HIT_RATE_WINDOWS]
+KEY_COLUMNS = ["lottery_id", "user_id", "playtype_id"]
+
+
+def ensure_rolling_table(conn, table_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                lottery_id INT NOT NULL COMMENT '彩种ID',
+                user_id BIGINT NOT NULL COMMENT '专家ID',
+                playtype_id INT NOT NULL COMMENT '玩法ID',
+                first_issue VARCHAR(32) DEFAULT NULL COMMENT '首个参与期号',
+                last_issue VARCHAR(32) DEFAULT NULL COMMENT '最近参与期号',
+                last_hit_issue VARCHAR(32) DEFAULT NULL COMMENT '最近命中期号',
+                issue_count INT NOT NULL DEFAULT 0 COMMENT '参与期数',
+                hit_issue_count INT NOT NULL DEFAULT 0 COMMENT '命中期数',
+                current_miss_streak INT NOT NULL DEFAULT 0 COMMENT '当前连续未中期数',
+                max_miss_streak INT NOT NULL DEFAULT 0 COMMENT '最长连续未中期数',
+                last_hit_seq INT NOT NULL DEFAULT 0 COMMENT '最近命中期的参与序号',
+                gap_sum INT NOT NULL DEFAULT 0 COMMENT '命中间隔累计',
+                gap_count INT NOT NULL DEFAULT 0 COMMENT '命中间隔个数',
+                hit_history VARCHAR({HISTORY_SIZE}) NOT NULL DEFAULT '' COMMENT '最近命中标记（新→旧）',
+                avg_hit_interval FLOAT DEFAULT NULL COMMENT '平均命中间隔（期）',
+                hit_rate_10 FLOAT DEFAULT NULL COMMENT '近10期命中率',
+                hit_rate_30 FLOAT DEFAULT NULL COMMENT '近30期命中率',
+                hit_rate_100 FLOAT DEFAULT NULL COMMENT '近100期命中率',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+                PRIMARY KEY (lottery_id, user_id, playtype_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='专家滚动表现表'
+            """
+        )
+    conn.commit()
+
+
+def state_row_params(state: RollingState) -> tuple:
+    return (
+        *(getattr(state, name) for name in STATE_COLUMNS),
+        state.avg_hit_interval,
+        *(state.hit_rate(window) for window in HIT_RATE_WINDOWS),
+    )
+
+
+def save_states(conn, table_name: str, states, batch_size: int = 2000):
+    columns = STATE_COLUMNS + DERIVED_COLUMNS
+    updates = ",\n".join(f"{c} = VALUES({c})" for c in columns if c not in KEY_COLUMNS)
+    sql = f"""
+        INSERT INTO {table_name} ({", ".join(columns)})
+        VALUES ({", ".join(["%s"] * len(columns))})
+        ON DUPLICATE KEY UPDATE
+        {updates}
+    """
+    rows = [state_row_params(state) for state in states]
+    with conn.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+    conn.commit()
+
+
+def _in_clause(column: str, values) -> tuple[str, list]:
+    values = list(values)
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", values
+
+
+def _select_states(conn, table_name: str, lottery_id: int, where_sql: str, params: list) -> dict[tuple, RollingState]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(STATE_COLUMNS)} FROM {table_name} WHERE lottery_id = %s AND {where_sql}",
+            [lottery_id, *params]
+        )
+        states = {}
+        for row in cursor.fetchall():
+            state = RollingState(**dict(zip(STATE_COLUMNS, row)))
+            state.hit_history = state.hit_history or ""
+            states[(int(state.user_id), int(state.playtype_id))] = state
+        return states
+
+
+def load_states(conn, table_name: str, lottery_id: int, user_ids) -> dict[tuple, RollingState]:
+    """读取指定专家的滚动状态（主键前缀 lottery_id + user_id 查询）"""
+    if not user_ids:
+        return {}
+    in_sql, in_params = _in_clause("user_id", user_ids)
+    return _select_states(conn, table_name, lottery_id, in_sql, in_params)
+
+
+def delete_states(conn, table_name: str, lottery_id: int, keys, batch_size: int = 2000):
+    """删除指定 (专家, 玩法) 的滚动状态（不提交）"""
+    keys = sorted(keys)
+    with conn.cursor() as cursor:
+        for offset in range(0, len(keys), batch_size):
+            cursor.executemany(
+                f"DELETE FROM {table_name} WHERE lottery_id = %s AND user_id = %s AND playtype_id = %s",
+                [(lottery_id, user_id, playtype_id) for user_id, playtype_id in keys[offset:offset + batch_size]]
+            )
+
+
+def replay(lottery_id: int, history: pd.DataFrame, states: dict[tuple, RollingState] | None = None) -> dict[tuple, RollingState]:
+    """
+    按期号顺序重放命中汇总行（issue_name / user_id / playtype_id / hit_count），返回 {(专家, 玩法): 状态}
+    """
+    states = {} if states is None else states
+    history = history.sort_values("issue_name", kind="stable")
+    for issue_name, user_id, playtype_id, hit_count in zip(
+        history["issue_name"].astype(str).tolist(),
+        history["user_id"].tolist(),
+        history["playtype_id"].tolist(),
+        history["hit_count"].tolist(),
+    ):
+        key = (int(user_id), int(playtype_id))
+        state = states.get(key)
+        if state is None:
+            state = states[key] = RollingState(lottery_id, key[0], key[1])
+        state.apply(issue_name, hit_count > 0)
+    return states
+
+
+def _read_stat_rows(conn, hit_stat_table: str, lottery_id: int, where_sql: str = "", params: list | None = None) -> pd.DataFrame:
+    return pd.read_sql(
+        f"""
+        SELECT issue_name, user_id, playtype_id, hit_count
+        FROM {hit_stat_table}
+        WHERE lottery_id = %s {where_sql}
+        ORDER BY issue_name
+        """,
+        conn, params=[lottery_id, *(params or [])]
+    )
+
+
+def update_rolling_stats(conn, rolling_table: str, hit_stat_table: str, lottery_id: int, issues: list[str]) -> dict:
+    """
+    增量更新：按期号顺序把指定期号的汇总行叠加到上一状态。
+    专家已处理过更晚（或同一）期号时，该专家改为按历史重放；
+    已处理过这些期号、但本次没有汇总行的专家玩法（如 --diff 删除了该行）同样重放，历史为空时删除其状态。
+    返回 {"updated": 增量更新数, "replayed": 重放专家玩法数, "removed": 删除专家玩法数}
+    """
+    if not issues:
+        return {"updated": 0, "replayed": 0, "removed": 0}
+    in_sql, in_params = _in_clause("issue_name", issues)
+    rows = _read_stat_rows(conn, hit_stat_table, lottery_id, f"AND {in_sql}", in_params)
+
+    states = load_states(conn, rolling_table, lottery_id, sorted({int(u) for u in rows["user_id"].tolist()}))
+    keys = list(zip(rows["user_id"].astype(int), rows["playtype_id"].astype(int)))
+    first_issue = rows.assign(key=keys).groupby("key", sort=False)["issue_name"].min().astype(str)
+    stale = {
+        key for key, issue_name in first_issue.items()
+        if key in states and states[key].last_issue is not None and issue_name <= str(states[key].last_issue)
+    }
+    # 状态已覆盖这些期号、本次却没有汇总行：旧贡献可能来自已删除的行
+    covered = _select_states(conn, rolling_table, lottery_id, "last_issue >= %s", [min(issues)])
+    stale.update(set(covered) - set(keys))
+
+    fresh_mask = [key not in stale for key in keys]
+    replayed = replay(lottery_id, rows[fresh_mask], states)
+    changed = {key: replayed[key] for key, fresh in zip(keys, fresh_mask) if fresh}
+
+    removed: set[tuple] = set()
+    if stale:
+        # 乱序：受影响专家按全部历史重放（只取这些专家）
+        user_sql, user_params = _in_clause("user_id", sorted({user_id for user_id, _ in stale}))
+        history = _read_stat_rows(conn, hit_stat_table, lottery_id, f"AND {user_sql}", user_params)
+        history_keys = zip(history["user_id"].astype(int), history["playtype_id"].astype(int))
+        history = history[[key in stale for key in history_keys]]
+        restored = replay(lottery_id, history)
+        changed.update(restored)
+        removed = stale - set(restored)
+        delete_states(conn, rolling_table, lottery_id, removed)
+
+    save_states(conn, rolling_table, changed.values())
+    return {"updated": len(changed) - len(stale) + len(removed), "replayed": len(stale) - len(removed),
+            "removed": len(removed)}
+
+
+def rebuild_rolling_stats(conn, rolling_table: str, hit_stat_table: str, lottery_id: int) -> int:
+    """全量重建：清空后按期号顺序重放全部历史，返回专家玩法数"""
+    states = replay(lottery_id, _read_stat_rows(conn, hit_stat_table, lottery_id))
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {rolling_table} WHERE lottery_id = %s", (lottery_id,))
+    save_states(conn, rolling_table, states.values())
+    return len(states)
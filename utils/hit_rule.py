@@ -1,146 +1,243 @@
 # utils/hit_rule.py
 import re
+from dataclasses import dataclass
 
-def match_hit(playtype: str, numbers: str, open_code: str, blue_code: str = "") -> bool:
+_NUMBER_RE = re.compile(r"\d+")
+
+# ✅ 双色球专属玩法（独立于大乐透）
+SSQ_PLAYTYPES = {
+    "红球独胆", "红球双胆", "红球三胆",
+    "红球12码", "红球20码", "红球25码",
+    "红球杀三", "红球杀六",
+    "龙头两码", "凤尾两码",
+    "蓝球定三", "蓝球定五", "蓝球杀五"
+}
+
+# ✅ 快乐8玩法
+KL8_PICK_PLAYTYPES = {
+    "1码", "2码", "3码", "4码", "5码", "6码", "7码", "8码", "9码", "10码", "12码", "15码"
+}
+KL8_KILL_PLAYTYPES = {"杀5码", "杀8码", "杀10码"}
+
+# ✅ 排列5 位置映射（开奖号为 5 位时按位判断）
+P5_POSITION_MAP = {"万位": 0, "千位": 1, "百位": 2, "十位": 3, "个位": 4}
+D3_POSITION_MAP = {"百位": 0, "十位": 1, "个位": 2}
+
+
+@dataclass(frozen=True)
+class HitRule:
     """
-    命中判断（支持 福彩3D / 排列3 / 排列5 / 双色球 / 大乐透 / 快乐8）
+    预编译后的玩法规则。
+    - kind: at_least / none / less_than / cover / pos_in / pos_not_in / group / overlap / never
+    - threshold: 交集数量阈值（at_least / less_than）
+    - position: 开奖号位置下标（pos_in / pos_not_in）
+    - zone: 读取的号码区，red（开奖号/红球）或 blue（蓝球/后区）
     """
-    nums = re.findall(r"\d+", numbers)
-    open_nums = re.findall(r"\d+", open_code)
+    kind: str
+    threshold: int = 0
+    position: int = -1
+    zone: str = "red"
 
-    nums_set = set(nums)
-    open_set = set(open_nums)
 
-    # ✅ 双色球专属判断（独立于大乐透）
-    if playtype in [
-        "红球独胆", "红球双胆", "红球三胆",
-        "红球12码", "红球20码", "红球25码",
-        "红球杀三", "红球杀六",
-        "龙头两码", "凤尾两码",
-        "蓝球定三", "蓝球定五", "蓝球杀五"
-    ]:
-        blue_nums = re.findall(r"\d+", blue_code) if blue_code else []
-        blue_set = set(blue_nums)
+NEVER = HitRule("never")
 
+_HIT_RULE_CACHE: dict[tuple[str, int], HitRule] = {}
+_COUNT_RULE_CACHE: dict[tuple[str, str], HitRule] = {}
+
+
+def _draw_shape(open_len: int) -> int:
+    """数字型彩种分支只区分 3 位、5 位与其他长度"""
+    return open_len if open_len in (3, 5) else 0
+
+
+def _compile_hit_rule(playtype: str, shape: int) -> HitRule:
+    # ✅ 双色球专属判断（独立于大乐透）
+    if playtype in SSQ_PLAYTYPES:
         if playtype == "红球独胆":
-            return len(nums_set & open_set) >= 1
+            return HitRule("at_least", threshold=1)
         elif playtype == "红球双胆":
-            return len(nums_set & open_set) >= 2
+            return HitRule("at_least", threshold=2)
         elif playtype == "红球三胆":
-            return len(nums_set & open_set) >= 3
+            return HitRule("at_least", threshold=3)
         elif playtype in ["红球12码", "红球20码", "红球25码"]:
-            return open_set.issubset(nums_set)  # 必须包含全部6个红球
+            return HitRule("cover")  # 必须包含全部6个红球
         elif playtype in ["红球杀三", "红球杀六"]:
-            return len(nums_set & open_set) == 0
+            return HitRule("none")
         elif playtype in ["龙头两码", "凤尾两码"]:
-            return len(nums_set & open_set) >= 2
+            return HitRule("at_least", threshold=2)
         elif playtype in ["蓝球定三", "蓝球定五"]:
-            return len(nums_set & blue_set) >= 1
+            return HitRule("at_least", threshold=1, zone="blue")
         elif playtype == "蓝球杀五":
-            return len(nums_set & blue_set) == 0
-
-    # ✅ 快乐8命中判断（已更新）
-    if playtype in [
-        "1码", "2码", "3码", "4码", "5码", "6码", "7码", "8码", "9码", "10码", "12码", "15码"
-    ]:
-        required_hit = int(re.findall(r"\d+", playtype)[0])
-        hit_count = len(nums_set & open_set)
-        return hit_count >= required_hit
-    elif playtype in ["杀5码", "杀8码", "杀10码"]:
-        return len(nums_set & open_set) == 0  # 完全不能命中
+            return HitRule("none", zone="blue")
+
+    # ✅ 快乐8命中判断
+    if playtype in KL8_PICK_PLAYTYPES:
+        return HitRule("at_least", threshold=int(_NUMBER_RE.findall(playtype)[0]))
+    elif playtype in KL8_KILL_PLAYTYPES:
+        return HitRule("none")  # 完全不能命中
 
     # ✅ 大乐透专用命中规则（严格匹配）
     if "红球" in playtype or "蓝球" in playtype or "龙头" in playtype or "凤尾" in playtype:
-        open_nums = re.findall(r"\d+", open_code) if open_code else []
-        blue_nums = re.findall(r"\d+", blue_code) if blue_code else []
-        nums = re.findall(r"\d+", numbers)
-
         # 🎯 红球区
         if "红球" in playtype:
             if "独胆" in playtype:
-                return len(set(nums) & set(open_nums)) >= 1
+                return HitRule("at_least", threshold=1)
             elif "双胆" in playtype:
-                return len(set(nums) & set(open_nums)) >= 2
+                return HitRule("at_least", threshold=2)
             elif "三胆" in playtype:
-                return len(set(nums) & set(open_nums)) >= 3
+                return HitRule("at_least", threshold=3)
             elif "12码" in playtype or "20码" in playtype or "25码" in playtype:
-                # 必须包含全部开奖号
-                return all(str(n) in nums for n in open_nums)
+                return HitRule("cover")  # 必须包含全部开奖号
             elif "杀三" in playtype:
-                return len(set(nums) & set(open_nums)) < 3
+                return HitRule("less_than", threshold=3)
             elif "杀六" in playtype:
-                return len(set(nums) & set(open_nums)) == 0
+                return HitRule("none")
 
         # 🎯 龙头凤尾
         elif "龙头" in playtype or "凤尾" in playtype:
-            return len(set(nums) & set(open_nums)) >= 2
+            return HitRule("at_least", threshold=2)
 
         # 🎯 蓝球区
         elif "蓝球" in playtype:
             if "定三" in playtype or "定五" in playtype:
-                return all(str(n) in nums for n in blue_nums)
+                return HitRule("cover", zone="blue")
             elif "杀五" in playtype:
-                return len(set(nums) & set(blue_nums)) == 0
+                return HitRule("none", zone="blue")
 
         # 其他 → 默认命中失败
-        return False
-
-
-    # ✅ 排列3/排列5/福彩3D命中判断（不改动）
-    if len(open_nums) not in [3, 5]:
-        return False
-
-    hit_count = len(set(nums) & set(open_nums))
-    unique_count = len(set(open_nums))
-    is_group3 = unique_count == 2
-    is_triplet = unique_count == 1
+        return NEVER
 
-    if len(open_nums) == 5:
-        position_map = {
-            "万位": 0,
-            "千位": 1,
-            "百位": 2,
-            "十位": 3,
-            "个位": 4,
-        }
+    # ✅ 排列3/排列5/福彩3D命中判断
+    if shape == 0:
+        return NEVER
 
-        for pos_name, idx in position_map.items():
+    if shape == 5:
+        for pos_name, idx in P5_POSITION_MAP.items():
             if playtype.startswith(f"{pos_name}杀"):
-                return str(open_nums[idx]) not in nums
+                return HitRule("pos_not_in", position=idx)
             if playtype.startswith(f"{pos_name}定"):
-                return str(open_nums[idx]) in nums
+                return HitRule("pos_in", position=idx)
 
-    if playtype == "杀一":
-        return len(set(nums) & set(open_nums)) == 0
-    elif playtype == "杀二":
-        return len(set(nums) & set(open_nums)) == 0
+    if playtype == "杀一" or playtype == "杀二":
+        return HitRule("none")
     elif "独胆" in playtype:
-        return hit_count >= 1
+        return HitRule("at_least", threshold=1)
     elif "双胆" in playtype:
-        return hit_count >= 2
+        return HitRule("at_least", threshold=2)
     elif "三胆" in playtype or any(x in playtype for x in ["五码", "六码", "七码"]):
-        if is_triplet:
-            return open_nums[0] in nums
-        elif is_group3:
-            return hit_count >= 2
-        else:
-            return hit_count == 3
+        return HitRule("group")
     elif "定位" in playtype and "-百位" in playtype:
-        return len(set(nums) & {open_nums[0]}) >= 1
+        return HitRule("pos_in", position=0)
     elif "定位" in playtype and "-十位" in playtype:
-        return len(set(nums) & {open_nums[1]}) >= 1
+        return HitRule("pos_in", position=1)
     elif "定位" in playtype and "-个位" in playtype:
-        return len(set(nums) & {open_nums[2]}) >= 1
+        return HitRule("pos_in", position=2)
     elif playtype.startswith("百位定"):
-        return len(set(nums) & {open_nums[0]}) >= 1
+        return HitRule("pos_in", position=0)
     elif playtype.startswith("十位定"):
-        return len(set(nums) & {open_nums[1]}) >= 1
+        return HitRule("pos_in", position=1)
     elif playtype.startswith("个位定"):
-        return len(set(nums) & {open_nums[2]}) >= 1
+        return HitRule("pos_in", position=2)
+
+    return NEVER
+
+
+def get_hit_rule(playtype: str, open_len: int) -> HitRule:
+    """
+    获取玩法对应的命中规则（按 玩法名 + 开奖号长度 编译一次后缓存）
+    """
+    key = (playtype, _draw_shape(open_len))
+    rule = _HIT_RULE_CACHE.get(key)
+    if rule is None:
+        rule = _compile_hit_rule(playtype, key[1])
+        _HIT_RULE_CACHE[key] = rule
+    return rule
 
+
+def evaluate_hit_rule(rule: HitRule, nums_set: set, open_nums: list, open_set: set, blue_set: set) -> bool:
+    """
+    使用预编译规则判断命中（号码均为已解析的字符串）
+    """
+    kind = rule.kind
+    if kind == "never":
+        return False
+    zone_set = blue_set if rule.zone == "blue" else open_set
+    if kind == "at_least":
+        return len(nums_set & zone_set) >= rule.threshold
+    if kind == "none":
+        return nums_set.isdisjoint(zone_set)
+    if kind == "cover":
+        return zone_set <= nums_set
+    if kind == "less_than":
+        return len(nums_set & zone_set) < rule.threshold
+    if kind == "pos_in":
+        return open_nums[rule.position] in nums_set
+    if kind == "pos_not_in":
+        return open_nums[rule.position] not in nums_set
+    if kind == "group":
+        unique_count = len(open_set)
+        if unique_count == 1:
+            return open_nums[0] in nums_set
+        elif unique_count == 2:
+            return len(nums_set & open_set) >= 2
+        return len(nums_set & open_set) == 3
     return False
 
 
+def match_hit(playtype: str, numbers: str, open_code: str, blue_code: str = "") -> bool:
+    """
+    命中判断（支持 福彩3D / 排列3 / 排列5 / 双色球 / 大乐透 / 快乐8）
+    """
+    nums_set = set(_NUMBER_RE.findall(numbers))
+    open_nums = _NUMBER_RE.findall(open_code)
+    rule = get_hit_rule(playtype, len(open_nums))
+
+    blue_set = set(_NUMBER_RE.findall(blue_code)) if rule.zone == "blue" and blue_code else set()
+    return evaluate_hit_rule(rule, nums_set, open_nums, set(open_nums), blue_set)
+
+
+def get_count_rule(playtype_name: str, lottery_name: str = "") -> HitRule:
+    """
+    获取命中数字统计规则（按 玩法名 + 彩种 编译一次后缓存）
+    - 定位玩法：pos_in，position 为开奖号位置
+    - 非定位玩法：overlap，按交集计数
+    """
+    key = (playtype_name, lottery_name)
+    rule = _COUNT_RULE_CACHE.get(key)
+    if rule is None:
+        # ✅ 使用 expert_hit_analysis.py 中定义的 POSITION_NAME_MAP 规则
+        if lottery_name in ["排列5", "排列五"]:
+            position_map = P5_POSITION_MAP
+        elif lottery_name in ["福彩3D", "排列3"]:
+            position_map = D3_POSITION_MAP
+        else:
+            position_map = {}  # 非定位彩种
+
+        rule = HitRule("overlap")
+        for pos_name, idx in position_map.items():
+            if pos_name in playtype_name:
+                rule = HitRule("pos_in", position=idx)
+                break
+        _COUNT_RULE_CACHE[key] = rule
+    return rule
+
+
+def parse_int_list(text: str) -> list[int]:
+    """按逗号拆分号码字符串，仅保留纯数字项"""
+    return [int(n) for n in text.strip().split(",") if n.strip().isdigit()]
+
+
+def count_hit_by_rule(rule: HitRule, pred_list: list[int], open_list: list[int]) -> int:
+    """使用预编译规则统计命中数字数量（号码均为已解析的整数）"""
+    if rule.kind == "pos_in":
+        if len(open_list) <= rule.position:
+            return 0
+        return 1 if open_list[rule.position] in pred_list else 0
+
+    # 非定位玩法统一使用交集判断
+    return len(set(pred_list) & set(open_list))
+
+
 def count_hit_numbers_by_playtype(playtype_name: str, pred_numbers: str, open_code: str, lottery_name: str = "") -> int:
     """
     根据彩票类型 + 玩法名判断推荐数字与开奖号码之间的命中数量。
@@ -156,22 +253,5 @@ def count_hit_numbers_by_playtype(playtype_name: str, pred_numbers: str, open_co
     返回:
     - 命中数字数量（int）
     """
-    pred_list = [int(n) for n in pred_numbers.strip().split(",") if n.strip().isdigit()]
-    open_list = [int(n) for n in open_code.strip().split(",") if n.strip().isdigit()]
-
-    # ✅ 使用 expert_hit_analysis.py 中定义的 POSITION_NAME_MAP 规则
-    if lottery_name in ["排列5", "排列五"]:
-        position_map = {"万位": 0, "千位": 1, "百位": 2, "十位": 3, "个位": 4}
-    elif lottery_name in ["福彩3D", "排列3"]:
-        position_map = {"百位": 0, "十位": 1, "个位": 2}
-    else:
-        position_map = {}  # 非定位彩种
-
-    for pos_name, idx in position_map.items():
-        if pos_name in playtype_name:
-            if len(open_list) <= idx:
-                return 0
-            return 1 if open_list[idx] in pred_list else 0
-
-    # 非定位玩法统一使用交集判断
-    return len(set(pred_list) & set(open_list))
+    rule = get_count_rule(playtype_name, lottery_name)
+    return count_hit_by_rule(rule, parse_int_list(pred_numbers), parse_int_list(open_code))
@@ -0,0 +1,429 @@
+# utils/hit_stat.py
+"""
+专家命中汇总计算引擎
+
+📌 模式：
+- vector：整表一次性按 期号 + 玩法 批量计算逐行命中标记与命中数字数，再一次聚合（默认）
+- legacy：原 groupby + iterrows 逐行调用 match_hit / count_hit_numbers_by_playtype
+- compare：两种模式同时计算并打印差异，返回 legacy 结果，用于真实数据核对
+"""
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.hit_mask import (
+    STYLE_PADDED,
+    STYLE_PLAIN,
+    batch_count_hits,
+    batch_hit_flags,
+    decode_numbers,
+    encode_draw,
+    encode_numbers,
+    get_mask_words,
+    mask_to_words,
+    style_compatible,
+)
+from utils.hit_rule import (
+    count_hit_numbers_by_playtype,
+    get_count_rule,
+    get_hit_rule,
+    match_hit,
+)
+from utils.prediction_mask import exact_mask_rows, materialized_masks
+
+EVAL_MODES = ("vector", "legacy", "compare")
+
+_NUMBER_RE = re.compile(r"\d+")
+# 与 hit_mask 一致：纯数字 + 逗号分隔
+_CLEAN_RE = re.compile(r"\s*(?:[0-9]+(?:\s*,\s*[0-9]+)*)?\s*\Z")
+
+STAT_KEYS = ["issue_name", "user_id", "playtype_id"]
+STAT_VALUE_FIELDS = ["total_count", "hit_count", "hit_number_count", "avg_hit_gap"]
+COUNT_FIELDS = ["total_count", "hit_count", "hit_number_count"]
+
+
+def compute_hit_stats_legacy(df: pd.DataFrame, lottery_name: str, lottery_id: int, draws: dict[str, tuple]) -> list[dict]:
+    """
+    按 期号 + 专家 + 玩法 分组逐行计算命中汇总（原始实现）。
+    - df 需包含 issue_name / user_id / playtype_id / playtype_name / numbers
+    - draws 为 {期号: (open_code, blue_code)} 或 {期号: DrawEntry}，缺少开奖号码的期号需由调用方提前过滤
+    """
+    stat_list = []
+
+    for (issue_name, user_id, playtype_id), group in df.groupby(STAT_KEYS):
+        open_code, blue_code = draws[issue_name][:2]
+        playtype_name = group["playtype_name"].iloc[0] or str(playtype_id)
+        total_count = len(group)
+        hit_count = 0
+        hit_number_count = 0
+
+        for _, row in group.iterrows():
+            numbers = row["numbers"]
+            if match_hit(playtype_name, numbers, open_code, blue_code):
+                hit_count += 1
+
+            # ✅ 使用标准命中数字统计逻辑
+            hit_number_count += count_hit_numbers_by_playtype(
+                playtype_name, numbers, open_code, lottery_name
+            )
+
+        avg_hit_gap = round(total_count / hit_count, 2) if hit_count else None
+
+        stat_list.append({
+            "lottery_id": lottery_id,
+            "issue_name": issue_name,
+            "user_id": user_id,
+            "playtype_id": playtype_id,
+            "total_count": total_count,
+            "hit_count": hit_count,
+            "hit_number_count": hit_number_count,
+            "avg_hit_gap": avg_hit_gap
+        })
+
+    return stat_list
+
+
+def normalize_numbers(text: str) -> str:
+    """
+    号码串去重键：干净号码串（纯数字 + 逗号）按号码去重排序，其余仅去除首尾空白。
+    match_hit 与 count_hit_numbers_by_playtype 只依赖号码集合，因此同键的推荐结果必然相同。
+    """
+    if _CLEAN_RE.match(text):
+        return ",".join(sorted(set(_NUMBER_RE.findall(text))))
+    return text.strip()
+
+
+def encode_issue_numbers(numbers: np.ndarray, words: int, materialized=None):
+    """
+    单期号码去重 + 位图编码。
+    - 已物化、可精确编码且书写风格唯一的行（紧凑帧中 numbers 为 None）直接按 (位图, 风格) 向量化去重，
+      代表文本由位图还原
+    - 其余行先按原始文本分组（哈希，不解析）；已物化的文本直接使用位图表结果，否则解析文本
+    - 可精确编码且书写风格唯一的号码按 (位图, 风格) 去重，其余按 normalize_numbers 去重
+    返回 (每行去重键编号, 去重键代表文本, 位图 (k, words), 风格, 有效标记)
+    """
+    row_keys = np.empty(len(numbers), dtype=np.int64)
+    key_index: dict = {}
+    texts, masks, styles, valid = [], [], [], []
+
+    def add_key(key, text, mask_words, style, is_valid) -> int:
+        index = key_index.get(key)
+        if index is None:
+            index = key_index[key] = len(texts)
+            texts.append(text)
+            masks.append(mask_words)
+            styles.append(style)
+            valid.append(is_valid)
+        return index
+
+    if materialized is not None:
+        exact = exact_mask_rows(materialized[1], materialized[2])
+    else:
+        exact = np.zeros(len(numbers), dtype=bool)
+
+    exact_rows = np.flatnonzero(exact)
+    if len(exact_rows):
+        pairs = np.concatenate(
+            [materialized[0][exact_rows], materialized[1][exact_rows, None].astype(np.uint64)], axis=1
+        )
+        unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        pair_to_key = np.empty(len(unique_pairs), dtype=np.int64)
+        for i, pair in enumerate(unique_pairs):
+            mask_words = tuple(int(w) for w in pair[:words])
+            style = int(pair[words])
+            pair_to_key[i] = add_key(
+                (mask_words, style), decode_numbers(mask_words, style), mask_words, style, True
+            )
+        row_keys[exact_rows] = pair_to_key[inverse.reshape(-1)]
+
+    other_rows = np.flatnonzero(~exact)
+    if len(other_rows):
+        raw_codes, raw_uniques = pd.factorize(numbers[other_rows])
+        _, first_rows = np.unique(raw_codes, return_index=True)
+        raw_to_key = np.empty(len(raw_uniques), dtype=np.int64)
+        for code, text in enumerate(raw_uniques):
+            row = other_rows[first_rows[code]]
+            if materialized is not None and materialized[2][row] >= 0:
+                is_valid = bool(materialized[2][row])
+                mask_words = tuple(int(w) for w in materialized[0][row])
+                style = int(materialized[1][row])
+            else:
+                encoded = encode_numbers(text, words)
+                is_valid = encoded is not None
+                mask_words = tuple(int(w) for w in mask_to_words(encoded[0], words)) if is_valid else (0,) * words
+                style = encoded[1] if is_valid else 0
+
+            if is_valid and style != STYLE_PLAIN | STYLE_PADDED:
+                key = (mask_words, style)
+            else:
+                key = normalize_numbers(text)
+            raw_to_key[code] = add_key(key, text, mask_words, style, is_valid)
+        row_keys[other_rows] = raw_to_key[raw_codes]
+
+    return (
+        row_keys,
+        np.array(texts, dtype=object),
+        np.array(masks, dtype=np.uint64).reshape(len(texts), words),
+        np.array(styles, dtype=np.uint8),
+        np.array(valid, dtype=bool),
+    )
+
+
+def evaluate_keys(playtype_name: str, lottery_name: str, texts: np.ndarray, masks: np.ndarray, styles: np.ndarray,
+                  valid: np.ndarray, open_code: str, blue_code: str, open_len: int, draw) -> tuple[np.ndarray, np.ndarray]:
+    """
+    同一玩法的一组去重号码对一期开奖的命中标记与命中数字数（texts / masks / styles / valid 与 encode_issue_numbers 一致）
+    - 位图无法精确表示或书写风格冲突的号码回退到 match_hit / count_hit_numbers_by_playtype
+    """
+    rule = get_hit_rule(playtype_name, open_len)
+    count_rule = get_count_rule(playtype_name, lottery_name)
+
+    key_hit = np.zeros(len(texts), dtype=bool)
+    key_hit_numbers = np.zeros(len(texts), dtype=np.int64)
+    if draw.valid:
+        key_hit[:] = batch_hit_flags(masks, rule, draw)
+        key_hit_numbers[:] = batch_count_hits(masks, count_rule, draw)
+        fallback = np.flatnonzero(~(valid & style_compatible(styles, rule, draw)))
+    else:
+        fallback = range(len(texts))
+
+    for i in fallback:
+        text = texts[i]
+        key_hit[i] = match_hit(playtype_name, text, open_code, blue_code)
+        key_hit_numbers[i] = count_hit_numbers_by_playtype(playtype_name, text, open_code, lottery_name)
+    return key_hit, key_hit_numbers
+
+
+def evaluate_predictions(df: pd.DataFrame, lottery_name: str, draws: dict[str, tuple],
+                         dedup_stats: list | None = None) -> pd.DataFrame:
+    """
+    逐行计算命中标记（hit）与命中数字数（hit_numbers），以列的形式写回 df。
+    - 按 期号 + 玩法 分组：同组共用一条预编译规则与一份开奖位图
+    - 同期内 (玩法, 规范号码串) 相同的推荐只计算一次，再按行广播
+    - df 含位图表列（mask_0 / mask_1 / mask_style / mask_valid）时直接使用，不再解析文本
+    - 位图无法精确表示的号码回退到 match_hit / count_hit_numbers_by_playtype
+    - dedup_stats 不为 None 时按期号追加去重统计（行数、去重后数量、耗时、估算节省耗时）
+    """
+    n = len(df)
+    hit = np.zeros(n, dtype=bool)
+    hit_numbers = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        df["hit"] = hit
+        df["hit_numbers"] = hit_numbers
+        return df
+
+    words = get_mask_words(lottery_name)
+    numbers = df["numbers"].to_numpy()
+    playtype_names = df["playtype_name"].to_numpy()
+    materialized = materialized_masks(df, words)
+
+    for issue_name, issue_rows in df.groupby("issue_name", sort=False).indices.items():
+        start = time.perf_counter()
+        entry = draws[issue_name]
+        open_code, blue_code = entry[:2]
+        draw = getattr(entry, "mask", None)
+        if draw is not None and draw.words == words:
+            # 开奖索引（draw_index.DrawEntry）中已预先解析
+            open_len = entry.open_len
+        else:
+            open_len = len(_NUMBER_RE.findall(open_code))
+            draw = encode_draw(open_code, blue_code, words)
+        number_codes, number_keys, masks, styles, valid = encode_issue_numbers(
+            numbers[issue_rows], words,
+            None if materialized is None else tuple(column[issue_rows] for column in materialized)
+        )
+        distinct = 0
+
+        issue_names = pd.Series(playtype_names[issue_rows])
+        for playtype_name, local_rows in issue_names.groupby(issue_names, sort=False).indices.items():
+            rows = issue_rows[local_rows]
+            keys, inverse = np.unique(number_codes[local_rows], return_inverse=True)
+            distinct += len(keys)
+            key_hit, key_hit_numbers = evaluate_keys(
+                playtype_name, lottery_name, number_keys[keys], masks[keys], styles[keys], valid[keys],
+                open_code, blue_code, open_len, draw
+            )
+            hit[rows] = key_hit[inverse]
+            hit_numbers[rows] = key_hit_numbers[inverse]
+
+        if dedup_stats is not None:
+            seconds = time.perf_counter() - start
+            dedup_stats.append({
+                "issue_name": issue_name,
+                "rows": len(issue_rows),
+                "distinct": distinct,
+                "seconds": seconds,
+                "saved_seconds": seconds / distinct * (len(issue_rows) - distinct) if distinct else 0.0,
+            })
+
+    df["hit"] = hit
+    df["hit_numbers"] = hit_numbers
+    return df
+
+
+def report_dedup_stats(lottery_name: str, dedup_stats: list[dict], per_issue: bool = False):
+    """打印去重统计：去重率 = 1 - 去重后数量 / 行数，节省耗时按单个去重键平均耗时估算"""
+    if not dedup_stats:
+        return
+    if per_issue:
+        for item in dedup_stats:
+            print(
+                f"♻️ [{lottery_name}] 期号 {item['issue_name']}：{item['rows']} 条推荐 → {item['distinct']} 个不同组合"
+                f"（去重率 {_dedup_ratio(item['rows'], item['distinct'])}，"
+                f"耗时 {item['seconds'] * 1000:.1f}ms，估算节省 {item['saved_seconds'] * 1000:.1f}ms）"
+            )
+        return
+    rows = sum(item["rows"] for item in dedup_stats)
+    distinct = sum(item["distinct"] for item in dedup_stats)
+    seconds = sum(item["seconds"] for item in dedup_stats)
+    saved = sum(item["saved_seconds"] for item in dedup_stats)
+    ratios = [1 - item["distinct"] / item["rows"] for item in dedup_stats if item["rows"]]
+    print(
+        f"♻️ [{lottery_name}] 去重：{len(dedup_stats)} 期，{rows} 条推荐 → {distinct} 个不同组合"
+        f"（去重率 {_dedup_ratio(rows, distinct)}，单期 {min(ratios):.1%} ~ {max(ratios):.1%}；"
+        f"耗时 {seconds:.2f}s，估算节省 {saved:.2f}s）"
+    )
+
+
+def _dedup_ratio(rows: int, distinct: int) -> str:
+    return f"{1 - distinct / rows:.1%}" if rows else "-"
+
+
+def count_hits(df: pd.DataFrame) -> pd.DataFrame:
+    """将逐行 hit / hit_numbers 聚合为可累加的分组计数（索引为 期号 + 专家 + 玩法）"""
+    return df.groupby(STAT_KEYS, sort=True).agg(
+        total_count=("hit", "size"),
+        hit_count=("hit", "sum"),
+        hit_number_count=("hit_numbers", "sum"),
+    )
+
+
+def stats_from_counts(counts: pd.DataFrame, lottery_id: int) -> list[dict]:
+    """分组计数 → 命中汇总行（avg_hit_gap 在此统一计算）"""
+    agg = counts.reset_index()
+    stat_list = []
+    for issue_name, user_id, playtype_id, total_count, hit_count, hit_number_count in zip(
+        agg["issue_name"].tolist(),
+        agg["user_id"].tolist(),
+        agg["playtype_id"].tolist(),
+        agg["total_count"].tolist(),
+        agg["hit_count"].tolist(),
+        agg["hit_number_count"].tolist(),
+    ):
+        stat_list.append({
+            "lottery_id": lottery_id,
+            "issue_name": issue_name,
+            "user_id": user_id,
+            "playtype_id": playtype_id,
+            "total_count": total_count,
+            "hit_count": hit_count,
+            "hit_number_count": hit_number_count,
+            # 与逐行实现保持一致：使用 Python round 而非 numpy round
+            "avg_hit_gap": round(total_count / hit_count, 2) if hit_count else None
+        })
+    return stat_list
+
+
+def aggregate_hit_stats(df: pd.DataFrame, lottery_id: int) -> list[dict]:
+    """
+    将逐行 hit / hit_numbers 一次聚合为 期号 + 专家 + 玩法 汇总
+    """
+    if df.empty:
+        return []
+    return stats_from_counts(count_hits(df), lottery_id)
+
+
+def compute_hit_stats_vector(df: pd.DataFrame, lottery_name: str, lottery_id: int, draws: dict[str, tuple],
+                             dedup_stats: list | None = None) -> list[dict]:
+    """整表向量化计算命中汇总"""
+    df = evaluate_predictions(df, lottery_name, draws, dedup_stats)
+    return aggregate_hit_stats(df, lottery_id)
+
+
+def diff_hit_stats(expected: list[dict], actual: list[dict]) -> list[tuple]:
+    """
+    对比两份命中汇总，返回差异列表 [(key, expected_row, actual_row)]
+    """
+    def index(stat_list):
+        return {(str(r["issue_name"]), int(r["user_id"]), int(r["playtype_id"])): r for r in stat_list}
+
+    expected_map = index(expected)
+    actual_map = index(actual)
+    diffs = []
+    for key in sorted(expected_map.keys() | actual_map.keys()):
+        left = expected_map.get(key)
+        right = actual_map.get(key)
+        if left is None or right is None or any(left[f] != right[f] for f in STAT_VALUE_FIELDS):
+            diffs.append((key, left, right))
+    return diffs
+
+
+def compute_hit_stats(df: pd.DataFrame, lottery_name: str, lottery_id: int, draws: dict[str, tuple],
+                      mode: str = "vector", dedup_stats: list | None = None) -> list[dict]:
+    """
+    计算命中汇总（按 mode 选择引擎，见模块说明；dedup_stats 仅 vector 模式填充）
+    """
+    if mode == "legacy":
+        return compute_hit_stats_legacy(df, lottery_name, lottery_id, draws)
+    if mode == "vector":
+        return compute_hit_stats_vector(df, lottery_name, lottery_id, draws, dedup_stats)
+    if mode == "compare":
+        legacy = compute_hit_stats_legacy(df, lottery_name, lottery_id, draws)
+        vector = compute_hit_stats_vector(df.copy(), lottery_name, lottery_id, draws)
+        diffs = diff_hit_stats(legacy, vector)
+        if diffs:
+            print(f"❌ [{lottery_name}] vector 与 legacy 结果不一致：{len(diffs)} 条")
+            for key, left, right in diffs[:20]:
+                print(f"   {key}: legacy={left} vector={right}")
+        else:
+            print(f"✅ [{lottery_name}] vector 与 legacy 结果一致（{len(legacy)} 条）")
+        return legacy
+    raise ValueError(f"未知计算模式：{mode}")
+
+
+def partial_hit_counts(df: pd.DataFrame, lottery_name: str, draws: dict[str, tuple],
+                       mode: str = "vector", dedup_stats: list | None = None) -> pd.DataFrame:
+    """
+    计算一批推荐记录的分组计数（流式读取时逐块调用，结果可直接累加）
+    """
+    if df.empty:
+        return pd.DataFrame(columns=STAT_KEYS + COUNT_FIELDS).set_index(STAT_KEYS)
+    if mode == "vector":
+        return count_hits(evaluate_predictions(df, lottery_name, draws, dedup_stats))
+    stat_list = compute_hit_stats(df, lottery_name, 0, draws, mode)
+    return pd.DataFrame(stat_list, columns=STAT_KEYS + COUNT_FIELDS).set_index(STAT_KEYS)
+
+
+class HitStatAccumulator:
+    """
+    流式增量聚合：按期号累加各块的分组计数，期号完整后即可取出并释放
+    - 同一 (期号, 专家, 玩法) 的记录可分布在多个块中
+    """
+
+    def __init__(self, lottery_id: int):
+        self.lottery_id = lottery_id
+        self._parts: dict[str, list[pd.DataFrame]] = {}
+
+    def add(self, counts: pd.DataFrame):
+        if counts.empty:
+            return
+        for issue_name, part in counts.groupby(level="issue_name", sort=False):
+            self._parts.setdefault(issue_name, []).append(part)
+
+    def pending_issues(self) -> list[str]:
+        return list(self._parts.keys())
+
+    def pop(self, issues) -> list[dict]:
+        """取出指定期号的汇总行并释放其累加状态"""
+        parts = []
+        for issue_name in issues:
+            parts.extend(self._parts.pop(issue_name, []))
+        if not parts:
+            return []
+        counts = pd.concat(parts).groupby(level=STAT_KEYS, sort=True)[COUNT_FIELDS].sum()
+        return stats_from_counts(counts, self.lottery_id)
+
+    def pop_all(self) -> list[dict]:
+        return self.pop(self.pending_issues())
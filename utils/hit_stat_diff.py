@@ -0,0 +1,113 @@
+# utils/hit_stat_diff.py
+"""
+命中汇总差异写入：重算时只写新增 / 变化的行，删除已消失的 (专家, 玩法)
+
+📌 比对范围：本次计算的期号（单期 / 全量分片 / 流式已完整的期号）
+- 读取这些期号的现有汇总，按 (期号, 专家, 玩法) 与新结果比对
+- total_count / hit_count / hit_number_count 相等、avg_hit_gap 按两位小数相等视为未变（avg_hit_gap 为 FLOAT）
+- 现有汇总中存在、新结果中不存在的键为删除（推荐被撤回 / 玩法变更）
+
+📌 计数：inserted / updated / deleted / unchanged，随 write 阶段事件记入运行指标
+"""
+from utils.hit_stat import STAT_VALUE_FIELDS
+
+DIFF_FIELDS = ("inserted", "updated", "deleted", "unchanged")
+
+# 现有汇总按期号分批读取，避免 IN 列表过长
+ISSUES_PER_QUERY = 500
+
+# 每彩种最多打印的差异样例数（--verify）
+SAMPLE_LIMIT = 10
+
+
+def _values(row) -> tuple:
+    total_count, hit_count, hit_number_count, avg_hit_gap = row
+    return (
+        int(total_count),
+        int(hit_count),
+        int(hit_number_count),
+        None if avg_hit_gap is None else round(float(avg_hit_gap), 2),
+    )
+
+
+def load_existing_stats(conn, hit_stat_table: str, lottery_id: int, issues: list[str]) -> dict[tuple, tuple]:
+    """读取期号范围内的现有汇总，返回 {(期号, 专家, 玩法): (total, hit, hit_number, avg_gap)}"""
+    existing: dict[tuple, tuple] = {}
+    issues = sorted({str(issue) for issue in issues})
+    with conn.cursor() as cursor:
+        for offset in range(0, len(issues), ISSUES_PER_QUERY):
+            chunk = issues[offset:offset + ISSUES_PER_QUERY]
+            cursor.execute(
+                f"""
+                SELECT issue_name, user_id, playtype_id, {', '.join(STAT_VALUE_FIELDS)}
+                FROM {hit_stat_table}
+                WHERE lottery_id = %s AND issue_name IN ({', '.join(['%s'] * len(chunk))})
+                """,
+                [lottery_id, *chunk]
+            )
+            for row in cursor.fetchall():
+                existing[(str(row[0]), int(row[1]), int(row[2]))] = _values(row[3:])
+    return existing
+
+
+class StatDiff:
+    """新结果与现有汇总的差异：changed 为需写入的行（新增 + 变化），deleted 为需删除的键"""
+
+    def __init__(self):
+        self.changed: list[dict] = []
+        self.deleted: list[tuple] = []
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.samples: list[str] = []
+
+    @property
+    def changed_issues(self) -> set[str]:
+        return {row["issue_name"] for row in self.changed} | {key[0] for key in self.deleted}
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": len(self.deleted),
+            "unchanged": self.unchanged,
+        }
+
+    def _sample(self, text: str):
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append(text)
+
+
+def diff_stats(existing: dict[tuple, tuple], stat_list: list[dict]) -> StatDiff:
+    """按 (期号, 专家, 玩法) 比对，existing 为 load_existing_stats 的结果"""
+    diff = StatDiff()
+    seen: set[tuple] = set()
+    for row in stat_list:
+        key = (str(row["issue_name"]), int(row["user_id"]), int(row["playtype_id"]))
+        seen.add(key)
+        new_values = _values(tuple(row[field] for field in STAT_VALUE_FIELDS))
+        old_values = existing.get(key)
+        if old_values is None:
+            diff.inserted += 1
+            diff.changed.append(row)
+            diff._sample(f"+ {key} {new_values}")
+        elif old_values != new_values:
+            diff.updated += 1
+            diff.changed.append(row)
+            diff._sample(f"~ {key} {old_values} → {new_values}")
+        else:
+            diff.unchanged += 1
+    for key in existing.keys() - seen:
+        diff.deleted.append(key)
+        diff._sample(f"- {key} {existing[key]}")
+    diff.deleted.sort()
+    return diff
+
+
+def delete_stats(conn, hit_stat_table: str, lottery_id: int, keys: list[tuple], batch_size: int = 2000) -> int:
+    """按唯一键删除已消失的行（不提交，由写入器统一提交）"""
+    sql = f"DELETE FROM {hit_stat_table} WHERE lottery_id = %s AND issue_name = %s AND user_id = %s AND playtype_id = %s"
+    with conn.cursor() as cursor:
+        for offset in range(0, len(keys), batch_size):
+            cursor.executemany(sql, [(lottery_id, *key) for key in keys[offset:offset + batch_size]])
+    return len(keys)
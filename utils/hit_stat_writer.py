@@ -0,0 +1,211 @@
+# utils/hit_stat_writer.py
+"""
+expert_hit_stat_xxx 写入器
+
+📌 写入方式：
+- row：逐行 INSERT ... ON DUPLICATE KEY UPDATE（原始实现）
+- batch：多行 VALUES 分批写入（默认），每批一次网络往返
+- load：LOAD DATA LOCAL INFILE 导入临时表，再一次性 INSERT ... SELECT 合并（需连接开启 local_infile）
+
+📌 提交粒度：
+- batch：每批写入后提交
+- lottery：写入器关闭时统一提交（单期模式即每期一次）
+
+📌 每批行数：未指定时使用各写入器自己的默认值（row / batch 2000，load 200000）
+"""
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+
+WRITER_KINDS = ("row", "batch", "load")
+COMMIT_MODES = ("batch", "lottery")
+DEFAULT_BATCH_SIZE = 2000
+
+STAT_COLUMNS = [
+    "lottery_id", "issue_name", "playtype_id", "user_id",
+    "total_count", "hit_count", "hit_number_count", "avg_hit_gap",
+]
+
+UPSERT_SQL = """
+    INSERT INTO {table}
+    (lottery_id, issue_name, playtype_id, user_id,
+     total_count, hit_count, hit_number_count, avg_hit_gap)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        total_count = VALUES(total_count),
+        hit_count = VALUES(hit_count),
+        hit_number_count = VALUES(hit_number_count),
+        avg_hit_gap = VALUES(avg_hit_gap)
+"""
+
+
+def stat_row_params(row: dict) -> tuple:
+    return (
+        row["lottery_id"],
+        row["issue_name"],
+        row["playtype_id"],
+        row["user_id"],
+        row["total_count"],
+        row["hit_count"],
+        row["hit_number_count"],
+        row["avg_hit_gap"]
+    )
+
+
+class HitStatWriter(ABC):
+    """写入器基类：统计写入行数与耗时，按提交粒度提交事务（batch_size 为 None 时使用 default_batch_size）"""
+
+    default_batch_size = DEFAULT_BATCH_SIZE
+
+    def __init__(self, conn, table: str, batch_size: int | None = None, commit_mode: str = "lottery"):
+        self.conn = conn
+        self.table = table
+        self.batch_size = max(int(batch_size or self.default_batch_size), 1)
+        self.commit_mode = commit_mode
+        self.rows_written = 0
+        self.seconds = 0.0
+
+    def write(self, stat_list: list[dict]) -> int:
+        start = time.perf_counter()
+        for offset in range(0, len(stat_list), self.batch_size):
+            chunk = stat_list[offset:offset + self.batch_size]
+            self._write_chunk(chunk)
+            self.rows_written += len(chunk)
+            if self.commit_mode == "batch":
+                self.conn.commit()
+        self.seconds += time.perf_counter() - start
+        return len(stat_list)
+
+    def close(self):
+        start = time.perf_counter()
+        self.conn.commit()
+        self.seconds += time.perf_counter() - start
+
+    @abstractmethod
+    def _write_chunk(self, chunk: list[dict]):
+        """写入一批汇总行（不提交）"""
+
+
+class RowWriter(HitStatWriter):
+    """逐行写入"""
+
+    def _write_chunk(self, chunk: list[dict]):
+        sql = UPSERT_SQL.format(table=self.table)
+        with self.conn.cursor() as cursor:
+            for row in chunk:
+                cursor.execute(sql, stat_row_params(row))
+
+
+class BatchWriter(HitStatWriter):
+    """多行 VALUES 写入：executemany 会被 PyMySQL 改写为一条多行 INSERT"""
+
+    def _write_chunk(self, chunk: list[dict]):
+        with self.conn.cursor() as cursor:
+            cursor.executemany(
+                UPSERT_SQL.format(table=self.table),
+                [stat_row_params(row) for row in chunk]
+            )
+
+
+class LoadDataWriter(HitStatWriter):
+    """LOAD DATA LOCAL INFILE 导入临时表后集合合并"""
+
+    default_batch_size = 200000
+
+    def __init__(self, conn, table: str, batch_size: int | None = None, commit_mode: str = "lottery"):
+        super().__init__(conn, table, batch_size, commit_mode)
+        self.staging_table = f"{table}_staging"
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_table} LIKE {table}")
+
+    def _write_chunk(self, chunk: list[dict]):
+        fd, path = tempfile.mkstemp(suffix=".tsv", prefix="hit_stat_")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for row in chunk:
+                    values = ["\\N" if v is None else str(v) for v in stat_row_params(row)]
+                    f.write("\t".join(values) + "\n")
+
+            columns = ", ".join(STAT_COLUMNS)
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.staging_table}")
+                cursor.execute(
+                    f"""
+                    LOAD DATA LOCAL INFILE %s INTO TABLE {self.staging_table}
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'
+                    ({columns})
+                    """,
+                    (path,)
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO {self.table} ({columns})
+                    SELECT {columns} FROM {self.staging_table}
+                    ON DUPLICATE KEY UPDATE
+                        total_count = VALUES(total_count),
+                        hit_count = VALUES(hit_count),
+                        hit_number_count = VALUES(hit_number_count),
+                        avg_hit_gap = VALUES(avg_hit_gap)
+                    """
+                )
+        finally:
+            os.remove(path)
+
+
+def create_writer(kind: str, conn, table: str, batch_size: int | None = None,
+                  commit_mode: str = "lottery") -> HitStatWriter:
+    """按写入方式创建写入器（load 需使用 get_connection(local_infile=True) 获取的连接；batch_size 为 None 时用写入器默认值）"""
+    if kind == "row":
+        return RowWriter(conn, table, batch_size, commit_mode)
+    if kind == "batch":
+        return BatchWriter(conn, table, batch_size, commit_mode)
+    if kind == "load":
+        return LoadDataWriter(conn, table, batch_size, commit_mode)
+    raise ValueError(f"未知写入方式：{kind}")
+
+
+class WriteThroughput:
+    """按彩种累计写入行数与耗时，运行结束时输出 rows/sec"""
+
+    def __init__(self):
+        self.totals: dict[str, list] = {}
+
+    def record(self, lottery_name: str, writer: HitStatWriter):
+        total = self.totals.setdefault(lottery_name, [0, 0.0])
+        total[0] += writer.rows_written
+        total[1] += writer.seconds
+
+    def snapshot(self) -> dict[str, list]:
+        return {name: list(total) for name, total in self.totals.items()}
+
+    def delta(self, before: dict[str, list]) -> dict[str, list]:
+        """返回自 snapshot 以来新增的行数与耗时（供子进程回传）"""
+        result = {}
+        for name, (rows, seconds) in self.totals.items():
+            base_rows, base_seconds = before.get(name, [0, 0.0])
+            if rows != base_rows or seconds != base_seconds:
+                result[name] = [rows - base_rows, seconds - base_seconds]
+        return result
+
+    def merge(self, totals: dict[str, list]):
+        for name, (rows, seconds) in totals.items():
+            total = self.totals.setdefault(name, [0, 0.0])
+            total[0] += rows
+            total[1] += seconds
+
+    def report(self):
+        if not self.totals:
+            return
+        print("\n📊 写入吞吐：")
+        all_rows, all_seconds = 0, 0.0
+        for lottery_name, (rows, seconds) in self.totals.items():
+            all_rows += rows
+            all_seconds += seconds
+            print(f"   {lottery_name}：{rows} 行 / {seconds:.2f}s（{_rate(rows, seconds)} 行/秒）")
+        print(f"   合计：{all_rows} 行 / {all_seconds:.2f}s（{_rate(all_rows, all_seconds)} 行/秒）")
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:.0f}" if seconds > 0 else "-"
@@ -0,0 +1,225 @@
+# utils/hit_sync.py
+"""
+命中汇总增量同步：只把本地变更过的 (彩种, 期号) 推送到远程库
+
+📌 变更队列（expert_hit_sync_xxx，每个期号一行）：
+- 写入命中汇总前先登记期号（先登记后写入：写入失败时期号仍在队列中，不会漏同步）
+- 仅 --sync 的运行登记；未登记的写入由 --sync-full-check 的全量比对补齐
+- 推送并校验一致后才出队；中断、重试失败的期号留在队列中，下次运行继续（断点续传）
+
+📌 推送（按期号分组，每组一个远程事务）：
+- 本地该组期号的全部行分批 INSERT ... ON DUPLICATE KEY UPDATE（幂等，可重复执行）
+- 远程存在而本地已不存在的 (专家, 玩法) 行按唯一键删除
+- 网络 / 连接错误按指数退避重试，重连后整组重做
+
+📌 校验（每个期号两端各一条聚合查询）：
+- count：行数 + total_count / hit_count / hit_number_count 之和
+- checksum：在 count 基础上加每行 CRC32 的 BIT_XOR（仅 MySQL）
+"""
+import time
+
+import pymysql
+
+from utils.hit_stat_writer import STAT_COLUMNS, UPSERT_SQL
+
+VERIFY_MODES = ("count", "checksum")
+
+# 网络类错误：重连后重试；其余错误（如 SQL 错误）直接抛出
+RETRYABLE_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+# avg_hit_gap 为 FLOAT，两端按相同精度取整后参与校验
+_CHECKSUM_EXPR = (
+    "BIT_XOR(CRC32(CONCAT_WS('|', user_id, playtype_id, total_count, hit_count, "
+    "hit_number_count, ROUND(avg_hit_gap, 4))))"
+)
+
+
+def ensure_sync_table(conn, table_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                issue_name VARCHAR(32) NOT NULL PRIMARY KEY COMMENT '期号',
+                queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '登记时间',
+                attempts INT NOT NULL DEFAULT 0 COMMENT '已尝试同步次数'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='命中汇总待同步期号'
+            """
+        )
+    conn.commit()
+
+
+def enqueue_issues(conn, table_name: str, issues, batch_size: int = 2000):
+    """登记变更期号（已在队列中的期号重置尝试次数）"""
+    issues = sorted({str(issue) for issue in issues})
+    if not issues:
+        return
+    sql = f"""
+        INSERT INTO {table_name} (issue_name, attempts) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE attempts = VALUES(attempts)
+    """
+    with conn.cursor() as cursor:
+        for offset in range(0, len(issues), batch_size):
+            cursor.executemany(sql, [(issue,) for issue in issues[offset:offset + batch_size]])
+    conn.commit()
+
+
+def pending_issues(conn, table_name: str) -> list[str]:
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT issue_name FROM {table_name} ORDER BY issue_name")
+        return [str(row[0]) for row in cursor.fetchall()]
+
+
+def _in_clause(column: str, values) -> tuple[str, list]:
+    values = list(values)
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", values
+
+
+def _mark_attempt(conn, table_name: str, issues: list[str]):
+    in_sql, params = _in_clause("issue_name", issues)
+    with conn.cursor() as cursor:
+        cursor.execute(f"UPDATE {table_name} SET attempts = attempts + 1 WHERE {in_sql}", params)
+    conn.commit()
+
+
+def _dequeue(conn, table_name: str, issues: list[str]):
+    in_sql, params = _in_clause("issue_name", issues)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table_name} WHERE {in_sql}", params)
+    conn.commit()
+
+
+def issue_digests(conn, hit_stat_table: str, lottery_id: int, issues: list[str] | None = None,
+                  verify: str = "count") -> dict[str, tuple]:
+    """按期号聚合校验值，返回 {期号: (行数, Σtotal, Σhit, Σhit_number[, checksum])}"""
+    checksum = f", {_CHECKSUM_EXPR}" if verify == "checksum" else ""
+    where_sql, params = "WHERE lottery_id = %s", [lottery_id]
+    if issues is not None:
+        in_sql, in_params = _in_clause("issue_name", issues)
+        where_sql += f" AND {in_sql}"
+        params += in_params
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT issue_name, COUNT(*), SUM(total_count), SUM(hit_count), SUM(hit_number_count){checksum}
+            FROM {hit_stat_table} {where_sql}
+            GROUP BY issue_name
+            """,
+            params
+        )
+        return {str(row[0]): tuple(int(v or 0) for v in row[1:]) for row in cursor.fetchall()}
+
+
+def find_mismatched_issues(source_conn, remote_conn, hit_stat_table: str, lottery_id: int,
+                           verify: str = "count") -> list[str]:
+    """全量比对两端每期聚合值，返回不一致的期号（远程缺失 / 多余 / 数值不同）"""
+    source = issue_digests(source_conn, hit_stat_table, lottery_id, verify=verify)
+    remote = issue_digests(remote_conn, hit_stat_table, lottery_id, verify=verify)
+    return sorted(issue for issue in source.keys() | remote.keys() if source.get(issue) != remote.get(issue))
+
+
+def _read_source_rows(conn, hit_stat_table: str, lottery_id: int, issues: list[str]) -> list[tuple]:
+    in_sql, params = _in_clause("issue_name", issues)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(STAT_COLUMNS)} FROM {hit_stat_table} WHERE lottery_id = %s AND {in_sql}",
+            [lottery_id, *params]
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def _push_group(remote_conn, hit_stat_table: str, lottery_id: int, issues: list[str], rows: list[tuple],
+                batch_size: int) -> tuple[int, int]:
+    """在远程一个事务内写入该组期号的全部行并删除多余行，返回 (写入行数, 删除行数)"""
+    in_sql, params = _in_clause("issue_name", issues)
+    with remote_conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT issue_name, user_id, playtype_id FROM {hit_stat_table} WHERE lottery_id = %s AND {in_sql}",
+            [lottery_id, *params]
+        )
+        remote_keys = {(str(issue), int(user), int(playtype)) for issue, user, playtype in cursor.fetchall()}
+        # STAT_COLUMNS：lottery_id, issue_name, playtype_id, user_id, ...
+        source_keys = {(str(row[1]), int(row[3]), int(row[2])) for row in rows}
+        stale = sorted(remote_keys - source_keys)
+
+        sql = UPSERT_SQL.format(table=hit_stat_table)
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+        if stale:
+            cursor.executemany(
+                f"DELETE FROM {hit_stat_table} WHERE lottery_id = %s AND issue_name = %s AND user_id = %s AND playtype_id = %s",
+                [(lottery_id, *key) for key in stale]
+            )
+    remote_conn.commit()
+    return len(rows), len(stale)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class RemoteSession:
+    """远程连接：网络类错误时关闭连接，按指数退避重连后重做整组"""
+
+    def __init__(self, connect_remote, retries: int = 3, backoff: float = 2.0):
+        self.connect_remote = connect_remote
+        self.retries = max(retries, 1)
+        self.backoff = backoff
+        self.conn = None
+
+    def run(self, func, label: str):
+        for attempt in range(1, self.retries + 1):
+            try:
+                if self.conn is None:
+                    self.conn = self.connect_remote()
+                return func(self.conn)
+            except RETRYABLE_ERRORS as exc:
+                self.close()
+                if attempt == self.retries:
+                    raise
+                wait = self.backoff ** (attempt - 1)
+                print(f"⚠️ 同步出错：{label}（{type(exc).__name__}: {exc}），{wait:.0f}s 后第 {attempt + 1} 次尝试")
+                time.sleep(wait)
+
+    def close(self):
+        if self.conn is not None:
+            _close_quietly(self.conn)
+            self.conn = None
+
+
+def sync_issues(source_conn, session: RemoteSession, sync_table: str, hit_stat_table: str, lottery_id: int,
+                issues: list[str], batch_size: int = 2000, issues_per_group: int = 50, verify: str = "count") -> dict:
+    """
+    推送队列中的期号到远程库并校验，校验一致的期号出队（远程连接由调用方关闭）。
+    返回 {"issues", "rows", "deleted", "verified", "mismatched": [期号], "failed": [期号]}
+    """
+    result = {"issues": len(issues), "rows": 0, "deleted": 0, "verified": 0, "mismatched": [], "failed": []}
+    group_size = max(issues_per_group, 1)
+    for start in range(0, len(issues), group_size):
+        group = issues[start:start + group_size]
+        label = f"{group[0]} → {group[-1]}"
+        _mark_attempt(source_conn, sync_table, group)
+        rows = _read_source_rows(source_conn, hit_stat_table, lottery_id, group)
+
+        def push(remote_conn):
+            counts = _push_group(remote_conn, hit_stat_table, lottery_id, group, rows, batch_size)
+            return counts, issue_digests(remote_conn, hit_stat_table, lottery_id, group, verify)
+
+        try:
+            (written, deleted), remote = session.run(push, label)
+        except RETRYABLE_ERRORS as exc:
+            print(f"❌ 同步失败：{label}（{type(exc).__name__}: {exc}），已保留在队列中")
+            result["failed"].extend(group)
+            continue
+
+        source = issue_digests(source_conn, hit_stat_table, lottery_id, group, verify)
+        verified = [issue for issue in group if source.get(issue) == remote.get(issue)]
+        result["rows"] += written
+        result["deleted"] += deleted
+        result["verified"] += len(verified)
+        result["mismatched"].extend(issue for issue in group if source.get(issue) != remote.get(issue))
+        if verified:
+            _dequeue(source_conn, sync_table, verified)
+    return result
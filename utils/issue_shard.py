@@ -0,0 +1,101 @@
+# utils/issue_shard.py
+"""
+期号范围选择与确定性分片（--from / --to / --shard k/n）
+
+📌 分片规则：期号对 n 取模，余数 = k - 1 的期号属于第 k 片（纯数字期号按数值轮转，其余按 CRC32）
+- 只依赖期号本身：各执行器看到的期号集合不同（如运行期间新增了一期）时也不会重叠
+- 连续期号轮流分到各片，各片期数相差不超过 1 期（年内）
+- 同一期号在任意次运行中总落在同一分片
+
+📌 覆盖校验：每片报告 (片内期数, 全部期数, 片内指纹, 全部指纹)
+- 指纹为各期号 BLAKE2b 前 8 字节之和（mod 2**64）：n 片的期数之和 = 全部期数、指纹之和 = 全部指纹，即无遗漏、无重叠
+  （不用 CRC32 异或：CRC32 是仿射的，缺失若干期时异或可能恰好抵消）
+"""
+import hashlib
+import zlib
+from dataclasses import dataclass
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """解析 k/n（1 ≤ k ≤ n），格式错误时抛出 ValueError"""
+    try:
+        k, n = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为 k/n，如 1/4：{text}") from None
+    if not 1 <= k <= n:
+        raise ValueError(f"分片序号需满足 1 ≤ k ≤ n：{text}")
+    return k, n
+
+
+def _issue_key(issue: str):
+    return (0, int(issue), "") if issue.isdigit() else (1, 0, issue)
+
+
+def in_range(issue: str, issue_from: str | None, issue_to: str | None) -> bool:
+    """期号是否在 [issue_from, issue_to] 内（纯数字期号按数值比较）"""
+    key = _issue_key(issue)
+    if issue_from is not None and key < _issue_key(issue_from):
+        return False
+    if issue_to is not None and key > _issue_key(issue_to):
+        return False
+    return True
+
+
+def shard_of(issue: str, n: int) -> int:
+    """期号所属分片（1 ~ n）"""
+    value = int(issue) if issue.isdigit() else zlib.crc32(issue.encode("utf-8"))
+    return value % n + 1
+
+
+_DIGEST_MOD = 1 << 64
+
+
+def _issue_hash(issue: str) -> int:
+    return int.from_bytes(hashlib.blake2b(issue.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def issues_digest(issues) -> str:
+    """期号集合指纹（与顺序无关；各片指纹按 combine_digests 相加等于全部指纹）"""
+    return f"{sum(_issue_hash(issue) for issue in issues) % _DIGEST_MOD:016x}"
+
+
+def combine_digests(digests) -> str:
+    """合并各片指纹：无遗漏、无重叠时等于全部期号的指纹"""
+    return f"{sum(int(digest, 16) for digest in digests) % _DIGEST_MOD:016x}"
+
+
+@dataclass
+class ShardCoverage:
+    """一个彩种在本分片中的覆盖情况"""
+    shard: str
+    issues: int
+    total: int
+    digest: str
+    total_digest: str
+    first: str | None = None
+    last: str | None = None
+
+    def describe(self) -> str:
+        span = f"{self.first} → {self.last}" if self.first else "无"
+        return (
+            f"分片 {self.shard}：{self.issues} / {self.total} 期（{span}），"
+            f"指纹 {self.digest} / 全部 {self.total_digest}"
+        )
+
+
+def select_issues(issues: list[str], issue_from: str | None = None, issue_to: str | None = None,
+                  shard: tuple[int, int] | None = None) -> tuple[list[str], ShardCoverage]:
+    """按范围过滤后取本分片的期号（保持原顺序），返回 (期号列表, 覆盖情况)"""
+    ranged = [issue for issue in issues if in_range(issue, issue_from, issue_to)]
+    k, n = shard or (1, 1)
+    selected = [issue for issue in ranged if shard_of(issue, n) == k] if n > 1 else ranged
+    coverage = ShardCoverage(
+        shard=f"{k}/{n}",
+        issues=len(selected),
+        total=len(ranged),
+        digest=issues_digest(selected),
+        total_digest=issues_digest(ranged),
+        first=selected[0] if selected else None,
+        last=selected[-1] if selected else None,
+    )
+    return selected, coverage
@@ -0,0 +1,67 @@
+# utils/memory_usage.py
+"""
+内存占用测量：区间峰值 RSS + DataFrame 实际占用
+
+📌 峰值 RSS：
+- Linux：读取 /proc/self/status 的 VmHWM；向 /proc/self/clear_refs 写入 5 可把峰值重置为当前 RSS，
+  因此可以按期 / 按彩种测量区间峰值
+- 其他平台：resource.getrusage 的 ru_maxrss（进程启动以来的峰值，无法重置，只作上限参考）
+- 峰值是整个进程的：流水线多线程并发时无法归属到单期，只按整次运行记录
+
+📌 帧占用：DataFrame.memory_usage(deep=True)，含字符串对象本身，与平台无关，可直接比较列布局
+"""
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+
+_CLEAR_REFS = "/proc/self/clear_refs"
+_STATUS = "/proc/self/status"
+
+
+def reset_peak() -> bool:
+    """把进程峰值 RSS 重置为当前 RSS，平台不支持时返回 False"""
+    try:
+        with open(_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float | None:
+    """进程峰值 RSS（MB），无法获取时为 None"""
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    """DataFrame 实际占用（MB，含字符串对象）"""
+    return float(df.memory_usage(deep=True).sum()) / 1024 / 1024
+
+
+@contextmanager
+def track_peak(info: dict):
+    """
+    测量区间峰值：with track_peak(info): ...，结束后 info["peak_rss_mb"] 为区间内峰值
+    （不支持重置的平台上为进程启动以来的峰值）
+    """
+    reset_peak()
+    try:
+        yield info
+    finally:
+        peak = peak_rss_mb()
+        if peak is not None:
+            info["peak_rss_mb"] = round(peak, 1)
@@ -0,0 +1,431 @@
+# utils/outcome_matrix.py
+"""
+开奖前结果空间命中矩阵（福彩3D / 排列3 / 排列5）
+
+📌 数字型彩种的开奖结果只有 10^位数 种（3 位 1,000 种，排列5 100,000 种），而推荐在开奖前已全部确定：
+开奖前为每个 (专家, 玩法) 预先算好所有可能开奖下的命中数与命中数字数，开奖后写汇总只需查表。
+
+📌 按玩法压缩结果空间（口径与 match_hit / count_hit_numbers_by_playtype 一致）：
+- 定位规则（pos_in / pos_not_in）只取决于该位开奖号：10 个槽位
+- 其余规则（胆码、组选、杀号、交集计数等）只取决于开奖号码集合：3 位 175 个、5 位 637 个槽位
+- 命中规则与计数规则依赖不同位置时按组合划分（space 如 "pos0+set"），排列5 即按位分组
+每个槽位取一个代表开奖，用 hit_stat.evaluate_keys 对该玩法的去重号码计算一次；
+槽位 ↔ 开奖结果的映射只与位数和 space 有关，运行时按需生成，不入库。
+
+📌 存储：
+- expert_hit_outcome_xxx：每个 (期号, 专家, 玩法) 一行，hit_vector / hit_number_vector 为按槽位排列的
+  定长小端整数数组（最大值小于 65536 时每槽 2 字节，否则 4 字节）
+- expert_hit_outcome_issue_xxx：每期构建时的推荐数与最大推荐 ID，开奖后与当前推荐比对，不一致时不使用矩阵
+
+📌 使用：
+- 开奖后：开奖号为 位数 个单个数字且期号状态一致时，按开奖号取槽位生成汇总行（lookup_hit_stats）
+- 开奖前：outcome_coverage 统计"开出 X 时有多少专家 / 专家玩法命中"
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+from utils.db import get_hit_outcome_issue_table, get_hit_outcome_table, get_result_table
+from utils.hit_mask import encode_draw, get_mask_words
+from utils.hit_rule import HitRule, get_count_rule, get_hit_rule
+from utils.hit_stat import encode_issue_numbers, evaluate_keys
+from utils.prediction_mask import materialized_masks
+
+# ✅ 支持结果空间预计算的彩种及开奖号位数
+OUTCOME_DIGITS = {"福彩3D": 3, "排列3": 3, "排列5": 5}
+
+_NUMBER_RE = re.compile(r"\d+")
+
+# 槽位编码宽度：号码集合为 10 位位图，单个位置为 0 ~ 9
+SET_WIDTH = 1 << 10
+POS_WIDTH = 10
+
+# 单次展开的 槽位 × (专家玩法, 号码) 元素上限（控制构建时的内存）
+BLOCK_ELEMENTS = 4_000_000
+
+
+@dataclass
+class SlotSpace:
+    """
+    一种槽位划分
+    - outcome_slots：开奖结果编号（号码按位拼成的整数）→ 槽位
+    - representatives：每个槽位的代表开奖（按位数字）
+    """
+    name: str
+    outcome_slots: np.ndarray
+    representatives: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.representatives)
+
+
+_OUTCOMES: dict[int, np.ndarray] = {}
+_SPACES: dict[tuple[int, str], SlotSpace] = {}
+
+
+def outcome_digits(length: int) -> np.ndarray:
+    """全部开奖结果，(10^length, length)，第 i 行为 i 按位拆开的数字"""
+    outcomes = _OUTCOMES.get(length)
+    if outcomes is None:
+        index = np.arange(10 ** length)
+        outcomes = np.stack([index // 10 ** (length - 1 - pos) % 10 for pos in range(length)], axis=1)
+        _OUTCOMES[length] = outcomes
+    return outcomes
+
+
+def outcome_index(open_code, length: int) -> int | None:
+    """开奖号 → 结果编号；不是 length 个单个数字（如 NULL、补零写法）时返回 None"""
+    tokens = _NUMBER_RE.findall(open_code) if isinstance(open_code, str) else []
+    if len(tokens) != length or any(len(token) != 1 for token in tokens):
+        return None
+    return int("".join(tokens))
+
+
+def _rule_part(rule: HitRule, length: int) -> str | None:
+    if rule.kind == "never":
+        return None
+    if rule.kind in ("pos_in", "pos_not_in"):
+        return f"pos{rule.position}" if rule.position < length else None
+    return "set"
+
+
+def playtype_space(playtype_name: str, lottery_name: str) -> str:
+    """玩法的命中规则与计数规则共同依赖的开奖信息（槽位划分名）"""
+    length = OUTCOME_DIGITS[lottery_name]
+    parts = {
+        _rule_part(get_hit_rule(playtype_name, length), length),
+        _rule_part(get_count_rule(playtype_name, lottery_name), length),
+    }
+    parts.discard(None)
+    return "+".join(sorted(parts)) or "const"
+
+
+def slot_space(lottery_name: str, name: str) -> SlotSpace:
+    """按划分名生成（并缓存）槽位映射"""
+    length = OUTCOME_DIGITS[lottery_name]
+    space = _SPACES.get((length, name))
+    if space is None:
+        outcomes = outcome_digits(length)
+        codes = np.zeros(len(outcomes), dtype=np.int64)
+        for part in ([] if name == "const" else name.split("+")):
+            if part == "set":
+                codes = codes * SET_WIDTH + np.bitwise_or.reduce(np.left_shift(1, outcomes), axis=1)
+            else:
+                codes = codes * POS_WIDTH + outcomes[:, int(part[3:])]
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        space = _SPACES[(length, name)] = SlotSpace(name, inverse.astype(np.int32), outcomes[first])
+    return space
+
+
+def build_outcome_matrix(df: pd.DataFrame, lottery_name: str) -> pd.DataFrame:
+    """
+    单期推荐 → 每个 (专家, 玩法) 在各槽位下的命中数 / 命中数字数
+    - df 为同一期的推荐记录（列与 compute_hit_stats 相同，可含位图表列）
+    返回列：user_id / playtype_id / space / total_count / hit_vector / hit_number_vector（按槽位的 numpy 数组）
+    """
+    columns = ["user_id", "playtype_id", "space", "total_count", "hit_vector", "hit_number_vector"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    length = OUTCOME_DIGITS[lottery_name]
+    words = get_mask_words(lottery_name)
+    number_codes, texts, masks, styles, valid = encode_issue_numbers(
+        df["numbers"].to_numpy(), words, materialized_masks(df, words)
+    )
+    draws: dict[str, object] = {}
+    parts = []
+
+    playtype_names = pd.Series(df["playtype_name"].to_numpy())
+    for playtype_name, rows in playtype_names.groupby(playtype_names, sort=False).indices.items():
+        space = slot_space(lottery_name, playtype_space(playtype_name, lottery_name))
+        keys, key_inverse = np.unique(number_codes[rows], return_inverse=True)
+
+        # 每个槽位的代表开奖 × 去重号码
+        hit = np.zeros((space.size, len(keys)), dtype=np.int32)
+        hit_numbers = np.zeros((space.size, len(keys)), dtype=np.int32)
+        for slot, digits in enumerate(space.representatives):
+            open_code = ",".join(str(digit) for digit in digits)
+            draw = draws.get(open_code)
+            if draw is None:
+                draw = draws[open_code] = encode_draw(open_code, "", words)
+            hit[slot], hit_numbers[slot] = evaluate_keys(
+                playtype_name, lottery_name, texts[keys], masks[keys], styles[keys], valid[keys],
+                open_code, "", length, draw
+            )
+
+        # (专家, 玩法) × 去重号码 的条数，按组累加各号码的命中向量
+        group_frame = df.iloc[rows][["user_id", "playtype_id"]]
+        group_codes = group_frame.groupby(["user_id", "playtype_id"], sort=True).ngroup().to_numpy()
+        labels = group_frame.drop_duplicates().sort_values(["user_id", "playtype_id"])
+        pair_codes, pair_counts = np.unique(group_codes * len(keys) + key_inverse, return_counts=True)
+        pair_groups, pair_keys = np.divmod(pair_codes, len(keys))
+        starts = np.flatnonzero(np.r_[True, pair_groups[1:] != pair_groups[:-1]])
+
+        group_hit = np.zeros((len(labels), space.size), dtype=np.int64)
+        group_hit_numbers = np.zeros((len(labels), space.size), dtype=np.int64)
+        block = max(BLOCK_ELEMENTS // max(len(pair_keys), 1), 1)
+        for first in range(0, space.size, block):
+            last = min(first + block, space.size)
+            counts = pair_counts.astype(np.int32)
+            group_hit[:, first:last] = np.add.reduceat(hit[first:last, pair_keys] * counts, starts, axis=1).T
+            group_hit_numbers[:, first:last] = np.add.reduceat(
+                hit_numbers[first:last, pair_keys] * counts, starts, axis=1
+            ).T
+
+        parts.append(pd.DataFrame({
+            "user_id": labels["user_id"].to_numpy(),
+            "playtype_id": labels["playtype_id"].to_numpy(),
+            "space": space.name,
+            "total_count": np.add.reduceat(pair_counts, starts),
+            "hit_vector": list(group_hit),
+            "hit_number_vector": list(group_hit_numbers),
+        }))
+    return pd.concat(parts, ignore_index=True)[columns]
+
+
+def _pack(vector: np.ndarray) -> bytes:
+    dtype = "<u2" if vector.max(initial=0) < 1 << 16 else "<u4"
+    return vector.astype(dtype).tobytes()
+
+
+def _unpack(blob: bytes, size: int) -> np.ndarray:
+    return np.frombuffer(blob, dtype=f"<u{len(blob) // size}")
+
+
+def _slot_value(blob: bytes, size: int, slot: int) -> int:
+    itemsize = len(blob) // size
+    return int(np.frombuffer(blob, dtype=f"<u{itemsize}", count=1, offset=slot * itemsize)[0])
+
+
+def ensure_outcome_tables(conn, lottery_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {get_hit_outcome_table(lottery_name)} (
+                issue_name VARCHAR(32) NOT NULL COMMENT '期号',
+                user_id BIGINT NOT NULL COMMENT '专家ID',
+                playtype_id INT NOT NULL COMMENT '玩法ID',
+                space VARCHAR(32) NOT NULL COMMENT '槽位划分（见 utils/outcome_matrix.py）',
+                total_count INT NOT NULL DEFAULT 0 COMMENT '总记录数',
+                hit_vector BLOB NOT NULL COMMENT '各槽位命中记录数',
+                hit_number_vector BLOB NOT NULL COMMENT '各槽位命中数字数量',
+                PRIMARY KEY (issue_name, user_id, playtype_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='专家推荐结果空间命中矩阵'
+            """
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {get_hit_outcome_issue_table(lottery_name)} (
+                issue_name VARCHAR(32) NOT NULL PRIMARY KEY COMMENT '期号',
+                prediction_count INT NOT NULL DEFAULT 0 COMMENT '构建时推荐记录数',
+                max_prediction_id BIGINT DEFAULT NULL COMMENT '构建时最大推荐ID',
+                group_count INT NOT NULL DEFAULT 0 COMMENT '专家玩法数',
+                built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '构建时间'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='结果空间命中矩阵期号状态'
+            """
+        )
+    conn.commit()
+
+
+def prediction_state(conn, prediction_table: str, issue_name: str, has_id: bool) -> tuple[int, int | None]:
+    """单期当前 (推荐记录数, 最大推荐ID)，与进度表的比对口径一致"""
+    max_id_sql = "MAX(id)" if has_id else "NULL"
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*), {max_id_sql} FROM {prediction_table} WHERE issue_name = %s", [issue_name]
+        )
+        count, max_id = cursor.fetchone()
+    return int(count), None if max_id is None else int(max_id)
+
+
+def stored_state(conn, lottery_name: str, issue_name: str) -> tuple[int, int | None] | None:
+    """矩阵构建时的 (推荐记录数, 最大推荐ID)；未构建或表不存在时为 None"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT prediction_count, max_prediction_id
+                FROM {get_hit_outcome_issue_table(lottery_name)} WHERE issue_name = %s
+                """,
+                [issue_name]
+            )
+            row = cursor.fetchone()
+    except pymysql.err.ProgrammingError:
+        return None
+    if row is None:
+        return None
+    return int(row[0]), None if row[1] is None else int(row[1])
+
+
+def store_outcome_matrix(conn, lottery_name: str, issue_name: str, matrix: pd.DataFrame,
+                         state: tuple[int, int | None], batch_size: int = 500) -> int:
+    """替换该期的矩阵并记录构建状态（同一事务），返回写入行数"""
+    table = get_hit_outcome_table(lottery_name)
+    rows = [
+        (issue_name, int(user_id), int(playtype_id), space, int(total), _pack(hit), _pack(hit_numbers))
+        for user_id, playtype_id, space, total, hit, hit_numbers in matrix.itertuples(index=False, name=None)
+    ]
+    sql = f"""
+        INSERT INTO {table} (issue_name, user_id, playtype_id, space, total_count, hit_vector, hit_number_vector)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE issue_name = %s", [issue_name])
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+        cursor.execute(
+            f"""
+            INSERT INTO {get_hit_outcome_issue_table(lottery_name)}
+                (issue_name, prediction_count, max_prediction_id, group_count)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                prediction_count = VALUES(prediction_count),
+                max_prediction_id = VALUES(max_prediction_id),
+                group_count = VALUES(group_count),
+                built_at = CURRENT_TIMESTAMP
+            """,
+            [issue_name, state[0], state[1], len(rows)]
+        )
+    conn.commit()
+    return len(rows)
+
+
+def latest_draw_issue(conn, lottery_name: str) -> str | None:
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(issue_name) FROM {get_result_table(lottery_name)}")
+        row = cursor.fetchone()
+    return None if row is None or row[0] is None else str(row[0])
+
+
+def pending_outcome_issues(conn, lottery_name: str, prediction_table: str, latest_issue: str | None) -> list[str]:
+    """已有推荐、期号晚于最新开奖的期号（期号范围查询）"""
+    where_sql, params = ("WHERE issue_name > %s", [latest_issue]) if latest_issue else ("", [])
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT issue_name FROM {prediction_table} {where_sql}", params or None)
+        return sorted(str(row[0]) for row in cursor.fetchall())
+
+
+def prune_outcome_matrices(conn, lottery_name: str, latest_issue: str | None) -> int:
+    """
+    删除早于最新开奖期号的矩阵（已被 Today 使用或已过期），返回删除的期数。
+    最新一期保留到下一期开奖，留给开奖后的 Today 查表。
+    """
+    if latest_issue is None:
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {get_hit_outcome_table(lottery_name)} WHERE issue_name < %s", [latest_issue])
+        cursor.execute(f"DELETE FROM {get_hit_outcome_issue_table(lottery_name)} WHERE issue_name < %s", [latest_issue])
+        count = cursor.rowcount
+    conn.commit()
+    return max(count, 0)
+
+
+def lookup_hit_stats(conn, lottery_name: str, issue_name: str, open_code, blue_code, lottery_id: int,
+                     state: tuple[int, int | None]) -> list[dict] | None:
+    """
+    开奖后按开奖号查表生成命中汇总行（与 compute_hit_stats 结果一致）。
+    以下情况返回 None，由调用方正常计算：
+    - 彩种不支持、开奖号不是 位数 个单个数字、带蓝球
+    - 该期未构建矩阵，或构建后推荐数 / 最大推荐 ID 已变化
+    """
+    length = OUTCOME_DIGITS.get(lottery_name)
+    if length is None or blue_code:
+        return None
+    index = outcome_index(open_code, length)
+    if index is None or stored_state(conn, lottery_name, issue_name) != state:
+        return None
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT user_id, playtype_id, space, total_count, hit_vector, hit_number_vector
+            FROM {get_hit_outcome_table(lottery_name)}
+            WHERE issue_name = %s
+            ORDER BY user_id, playtype_id
+            """,
+            [issue_name]
+        )
+        rows = cursor.fetchall()
+
+    stat_list = []
+    for user_id, playtype_id, space_name, total_count, hit_vector, hit_number_vector in rows:
+        space = slot_space(lottery_name, space_name)
+        slot = space.outcome_slots[index]
+        hit_count = _slot_value(bytes(hit_vector), space.size, slot)
+        stat_list.append({
+            "lottery_id": lottery_id,
+            "issue_name": issue_name,
+            "user_id": int(user_id),
+            "playtype_id": int(playtype_id),
+            "total_count": int(total_count),
+            "hit_count": hit_count,
+            "hit_number_count": _slot_value(bytes(hit_number_vector), space.size, slot),
+            "avg_hit_gap": round(total_count / hit_count, 2) if hit_count else None
+        })
+    return stat_list
+
+
+def outcome_coverage(conn, lottery_name: str, issue_name: str, open_codes: list[str] | None = None,
+                     playtype_ids: list[int] | None = None, chunk_size: int = 1000) -> pd.DataFrame:
+    """
+    开奖前覆盖查询：开出各号码时命中的专家数 / 专家玩法数 / 推荐记录数
+    - open_codes 为空时遍历全部结果（排列5 为 100,000 种，按 chunk_size 分块计算）
+    - playtype_ids 不为空时只统计这些玩法
+    返回列：open_code / experts / groups / hit_count（按 open_codes 顺序或结果编号顺序）
+    """
+    length = OUTCOME_DIGITS[lottery_name]
+    if open_codes is None:
+        indexes = np.arange(10 ** length)
+    else:
+        indexes = np.array([outcome_index(code, length) for code in open_codes], dtype=object)
+        if any(index is None for index in indexes):
+            raise ValueError(f"开奖号需为 {length} 个单个数字：{[c for c, i in zip(open_codes, indexes) if i is None]}")
+        indexes = indexes.astype(np.int64)
+
+    matrix = pd.read_sql(
+        f"""
+        SELECT user_id, playtype_id, space, hit_vector
+        FROM {get_hit_outcome_table(lottery_name)} WHERE issue_name = %s
+        """,
+        conn, params=[issue_name]
+    )
+    if playtype_ids is not None:
+        matrix = matrix[matrix["playtype_id"].isin(playtype_ids)]
+    user_codes, users = pd.factorize(matrix["user_id"])
+    matrix = matrix.assign(user_code=user_codes).sort_values("user_code")
+
+    # 每种槽位划分：(专家玩法 × 槽位) 命中数，及按专家分段的起点
+    spaces = []
+    for space_name, part in matrix.groupby("space", sort=False):
+        space = slot_space(lottery_name, space_name)
+        vectors = np.stack([_unpack(bytes(blob), space.size) for blob in part["hit_vector"]]).astype(np.int64)
+        part_users = part["user_code"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, part_users[1:] != part_users[:-1]])
+        spaces.append((space, vectors, part_users[starts], starts))
+
+    experts, groups, hit_counts = [], [], []
+    for first in range(0, len(indexes), chunk_size):
+        chunk = indexes[first:first + chunk_size]
+        user_hit = np.zeros((len(users), len(chunk)), dtype=bool)
+        chunk_groups = np.zeros(len(chunk), dtype=np.int64)
+        chunk_hits = np.zeros(len(chunk), dtype=np.int64)
+        for space, vectors, space_users, starts in spaces:
+            values = vectors[:, space.outcome_slots[chunk]]
+            chunk_groups += (values > 0).sum(axis=0)
+            chunk_hits += values.sum(axis=0)
+            user_hit[space_users] |= np.logical_or.reduceat(values > 0, starts, axis=0)
+        experts.append(user_hit.sum(axis=0))
+        groups.append(chunk_groups)
+        hit_counts.append(chunk_hits)
+
+    outcomes = outcome_digits(length)[indexes]
+    return pd.DataFrame({
+        "open_code": [",".join(str(digit) for digit in digits) for digits in outcomes],
+        "experts": np.concatenate(experts) if experts else np.zeros(0, dtype=np.int64),
+        "groups": np.concatenate(groups) if groups else np.zeros(0, dtype=np.int64),
+        "hit_count": np.concatenate(hit_counts) if hit_counts else np.zeros(0, dtype=np.int64),
+    })
@@ -0,0 +1,166 @@
+# utils/pipeline.py
+"""
+三段流水线：预读 → 计算 → 写入，阶段之间以有界队列连接
+
+📌 每个阶段一个线程，同时处理相邻的三组：
+- 预读线程读取第 N+1 组时，计算线程处理第 N 组，写入线程提交第 N-1 组
+- PyMySQL 等待网络时释放 GIL，pandas / numpy 向量化计算的大部分时间也不持有 GIL
+- 队列容量 depth 即背压：下游跟不上时上游最多领先 depth 组，内存占用有上限
+
+📌 资源：阶段可声明 resource（如 pooled_connection），在阶段线程内打开，跨组复用
+- 某组在该阶段抛出异常时，以该异常退出资源的上下文（连接池据此回滚或丢弃已断开的连接），下一组重新打开
+
+📌 错误：某组在任一阶段抛出异常时记为该组失败，后续阶段跳过该组，其余组继续
+
+📌 利用率：每个阶段统计 忙碌 / 等待上游 / 等待下游 的耗时，忙碌占比最高的阶段即瓶颈
+"""
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    流水线阶段
+    - func(item, value) 或 func(item, value, resource)：value 为上一阶段的返回值（第一阶段为 None）
+    - resource：无参函数，返回在阶段线程内打开的上下文管理器
+    """
+    name: str
+    func: Callable
+    resource: Callable | None = None
+
+
+@dataclass
+class StageStats:
+    name: str
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    items: int = 0
+
+    def to_dict(self, wall: float) -> dict:
+        return {
+            "busy": round(self.busy, 4),
+            "starved": round(self.starved, 4),
+            "blocked": round(self.blocked, 4),
+            "items": self.items,
+            "utilization": round(self.busy / wall, 4) if wall > 0 else 0.0,
+        }
+
+
+@dataclass
+class PipelineResult:
+    values: dict = field(default_factory=dict)
+    failures: list[tuple[Any, str]] = field(default_factory=list)
+    stages: list[StageStats] = field(default_factory=list)
+    wall: float = 0.0
+
+    @property
+    def bottleneck(self) -> str | None:
+        return max(self.stages, key=lambda s: s.busy).name if self.stages else None
+
+    def utilization(self) -> dict[str, dict]:
+        return {stats.name: stats.to_dict(self.wall) for stats in self.stages}
+
+    def describe(self) -> str:
+        parts = [
+            f"{stats.name} {stats.busy / self.wall:.0%}" if self.wall > 0 else stats.name
+            for stats in self.stages
+        ]
+        return f"{' / '.join(parts)}（{self.wall:.2f}s，瓶颈：{self.bottleneck}）"
+
+
+def _stage_loop(stage: Stage, stats: StageStats, inbox: queue.Queue, outbox: queue.Queue | None,
+                result: PipelineResult, on_done: Callable | None):
+    def forward(item, value, error):
+        if outbox is not None:
+            tick = time.perf_counter()
+            outbox.put((item, value, error))
+            stats.blocked += time.perf_counter() - tick
+            return
+        if error is None:
+            result.values[item] = value
+        else:
+            result.failures.append((item, error))
+        if on_done:
+            on_done(item, value, error)
+
+    context = resource = None
+    try:
+        while True:
+            tick = time.perf_counter()
+            message = inbox.get()
+            stats.starved += time.perf_counter() - tick
+            if message is _DONE:
+                break
+            item, value, error = message
+            if error is None:
+                tick = time.perf_counter()
+                try:
+                    if stage.resource and context is None:
+                        # 首组或上一组失败后（重新）打开资源
+                        opening = stage.resource()
+                        resource = opening.__enter__()
+                        context = opening
+                    value = stage.func(item, value, resource) if stage.resource else stage.func(item, value)
+                except Exception as exc:
+                    traceback.print_exc()
+                    print(f"❌ 流水线 {stage.name} 失败：{item}（{type(exc).__name__}: {exc}）")
+                    value, error = None, f"{type(exc).__name__}: {exc}"
+                    if context is not None:
+                        _exit_quietly(context, exc)
+                        context = resource = None
+                stats.busy += time.perf_counter() - tick
+                stats.items += 1
+            forward(item, value, error)
+    finally:
+        try:
+            if context is not None:
+                context.__exit__(None, None, None)
+        finally:
+            if outbox is not None:
+                outbox.put(_DONE)
+
+
+def _exit_quietly(context, exc: Exception):
+    """以异常退出资源上下文（如连接池丢弃失效连接）；退出本身的错误只打印，不影响后续分组"""
+    try:
+        context.__exit__(type(exc), exc, exc.__traceback__)
+    except Exception as exit_exc:
+        if exit_exc is not exc:
+            traceback.print_exc()
+
+
+def run_pipeline(items: list, stages: list[Stage], depth: int = 2, on_done: Callable | None = None) -> PipelineResult:
+    """
+    按顺序把 items 依次送入各阶段，返回每项最后一个阶段的返回值、失败项与各阶段耗时。
+    - depth：相邻阶段之间最多缓冲的项数（背压）
+    - on_done(item, value, error)：最后一个阶段处理完一项后调用（在该阶段线程中）
+    """
+    depth = max(int(depth), 1)
+    result = PipelineResult(stages=[StageStats(stage.name) for stage in stages])
+    inboxes = [queue.Queue()] + [queue.Queue(maxsize=depth) for _ in stages[1:]]
+    for item in items:
+        inboxes[0].put((item, None, None))
+    inboxes[0].put(_DONE)
+
+    start = time.perf_counter()
+    threads = []
+    for index, stage in enumerate(stages):
+        outbox = inboxes[index + 1] if index + 1 < len(stages) else None
+        thread = threading.Thread(
+            target=_stage_loop, name=f"pipeline-{stage.name}", daemon=True,
+            args=(stage, result.stages[index], inboxes[index], outbox, result, on_done),
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    result.wall = time.perf_counter() - start
+    return result
@@ -0,0 +1,67 @@
+# utils/prediction_frame.py
+"""
+推荐帧紧凑布局：快乐8 等大表一次读取多期时控制常驻内存
+
+📌 列布局：
+- user_id / playtype_id：取值在范围内时降为 int32
+- playtype_name：category（每个玩法名只存一份，行内为整数编码）
+- numbers：同一号码串共享一个字符串对象；已物化且可精确表示的行（见 prediction_mask.exact_mask_rows）
+  置为 None，号码由位图列表示，计算引擎按位图 + 风格还原
+- mask_style / mask_valid：uint8 / int8
+
+📌 原地整理：逐列替换，不对整帧 fillna / replace / .loc 赋值产生副本
+"""
+import numpy as np
+import pandas as pd
+
+from utils.prediction_mask import exact_mask_rows
+
+_INT32 = np.iinfo(np.int32)
+
+
+def compact_predictions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    原地整理推荐帧并返回同一对象：
+    - 玩法名称缺失 / 为空时回退为 playtype_id 字符串
+    - numbers 缺失时为空串，非字符串转为字符串
+    """
+    if "playtype_name" not in df.columns:
+        df["playtype_name"] = None
+    df["playtype_name"] = _playtype_categories(df["playtype_name"], df["playtype_id"])
+    df["numbers"] = _interned_numbers(df)
+    for column in ("user_id", "playtype_id"):
+        df[column] = _downcast_int(df[column])
+    if "mask_valid" in df.columns:
+        df["mask_style"] = df["mask_style"].to_numpy(dtype=np.uint8)
+        df["mask_valid"] = df["mask_valid"].to_numpy(dtype=np.int8)
+    return df
+
+
+def _playtype_categories(names: pd.Series, playtype_ids: pd.Series) -> pd.Categorical:
+    categorical = pd.Categorical(names)
+    missing = categorical.codes == -1
+    empty = categorical.categories.get_indexer([""])[0]
+    if empty >= 0:
+        missing |= categorical.codes == empty
+    if missing.any():
+        fallback = playtype_ids.to_numpy()[missing].astype(str)
+        categorical = categorical.add_categories(sorted(set(fallback) - set(categorical.categories)))
+        categorical[missing] = fallback
+    return categorical.remove_unused_categories()
+
+
+def _interned_numbers(df: pd.DataFrame) -> np.ndarray:
+    codes, uniques = pd.factorize(df["numbers"].to_numpy(dtype=object))
+    texts = np.array([text if isinstance(text, str) else str(text) for text in uniques] + [""], dtype=object)
+    numbers = texts[codes]
+    if "mask_valid" in df.columns:
+        numbers[exact_mask_rows(df["mask_style"].to_numpy(), df["mask_valid"].to_numpy())] = None
+    return numbers
+
+
+def _downcast_int(values: pd.Series):
+    if values.empty or values.dtype == np.int32 or not pd.api.types.is_integer_dtype(values.dtype):
+        return values
+    if values.min() < _INT32.min or values.max() > _INT32.max:
+        return values
+    return values.to_numpy(dtype=np.int32)
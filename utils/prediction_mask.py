@@ -0,0 +1,136 @@
+# utils/prediction_mask.py
+"""
+推荐号码位图表（expert_prediction_mask_xxx）：numbers 文本只解析一次
+
+📌 每条推荐记录（按 prediction_id = expert_predictions_xxx.id）一行：
+- mask_0 / mask_1：号码位图（uint64 按位存为有符号 BIGINT，快乐8 使用两列，其余 mask_1 = 0）
+- style：号码书写风格（见 hit_mask.STYLE_*）
+- valid：1 = 位图可精确表示；0 = 需回退文本逐行判断
+- numbers_md5：编码时号码文本（NULL 按空串）的 MD5
+按自增 ID 水位增量补齐新推荐记录（仅 --mask-sync 时执行，适用于长期保留的数据库）。
+读取推荐时 LEFT JOIN 本表并比对 numbers_md5：未补齐、或号码在推荐表中被就地修改过的行 mask_valid = -1，
+由计算引擎回退解析文本，结果始终与当前号码一致（被修改的行不会重新编码，只是失去位图加速）。
+"""
+import hashlib
+
+import numpy as np
+import pymysql
+
+from utils.hit_mask import STYLE_PADDED, STYLE_PLAIN, encode_numbers
+
+# 读取推荐记录时附加的位图列
+MASK_SELECT_SQL = """,
+                COALESCE(m.mask_0, 0) AS mask_0,
+                COALESCE(m.mask_1, 0) AS mask_1,
+                COALESCE(m.style, 0) AS mask_style,
+                COALESCE(m.valid, -1) AS mask_valid"""
+MASK_JOIN_SQL = """LEFT JOIN {mask_table} AS m
+          ON m.prediction_id = p.id AND m.numbers_md5 = MD5(COALESCE(p.numbers, ''))"""
+MASK_COLUMNS = ["mask_0", "mask_1", "mask_style", "mask_valid"]
+
+
+def mask_join_sql(mask_table: str | None) -> tuple[str, str]:
+    """返回 (附加 SELECT 列, LEFT JOIN 子句)；mask_table 为 None 时均为空"""
+    if mask_table is None:
+        return "", ""
+    return MASK_SELECT_SQL, MASK_JOIN_SQL.format(mask_table=mask_table)
+
+
+def ensure_mask_table(conn, table_name: str):
+    """建表；旧版本位图表（无 numbers_md5）为派生数据，直接删除重建，随后按水位从头补齐"""
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+            columns = {row[0] for row in cursor.fetchall()}
+        except pymysql.err.ProgrammingError:
+            columns = set()
+        if columns and "numbers_md5" not in columns:
+            cursor.execute(f"DROP TABLE {table_name}")
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                prediction_id BIGINT NOT NULL PRIMARY KEY COMMENT '推荐记录ID',
+                mask_0 BIGINT NOT NULL DEFAULT 0 COMMENT '号码位图 0~63',
+                mask_1 BIGINT NOT NULL DEFAULT 0 COMMENT '号码位图 64~127',
+                style TINYINT NOT NULL DEFAULT 0 COMMENT '号码书写风格',
+                valid TINYINT NOT NULL DEFAULT 0 COMMENT '位图是否可精确表示',
+                numbers_md5 CHAR(32) NOT NULL DEFAULT '' COMMENT '编码时号码文本的MD5'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='推荐号码位图表'
+            """
+        )
+    conn.commit()
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def encode_mask_row(prediction_id: int, numbers, words: int) -> tuple:
+    """单条推荐 → 位图表行参数（numbers 为空按空串处理，与读取推荐时一致）"""
+    text = "" if numbers is None else str(numbers)
+    digest = hashlib.md5(text.encode("utf-8")).hexdigest()
+    encoded = encode_numbers(text, words)
+    if encoded is None:
+        return prediction_id, 0, 0, 0, 0, digest
+    mask, style, _ = encoded
+    return (
+        prediction_id,
+        _signed(mask & 0xFFFFFFFFFFFFFFFF),
+        _signed((mask >> 64) & 0xFFFFFFFFFFFFFFFF),
+        style,
+        1,
+        digest,
+    )
+
+
+def sync_prediction_masks(conn, mask_table: str, prediction_table: str, words: int, batch_size: int = 50000) -> int:
+    """按自增 ID 水位补齐新推荐记录的位图，返回本次新增行数"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(prediction_id) FROM {mask_table}")
+        last_id = cursor.fetchone()[0] or 0
+
+    total = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, numbers FROM {prediction_table} WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                f"""
+                INSERT INTO {mask_table} (prediction_id, mask_0, mask_1, style, valid, numbers_md5)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    mask_0 = VALUES(mask_0),
+                    mask_1 = VALUES(mask_1),
+                    style = VALUES(style),
+                    valid = VALUES(valid),
+                    numbers_md5 = VALUES(numbers_md5)
+                """,
+                [encode_mask_row(prediction_id, numbers, words) for prediction_id, numbers in rows]
+            )
+        conn.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+    return total
+
+
+def materialized_masks(df, words: int):
+    """
+    从推荐记录中取出已物化的位图列。
+    返回 (masks (n, words) uint64, styles uint8, valid int8：1 / 0 / -1 未物化)；无位图列时返回 None
+    """
+    if "mask_valid" not in df.columns:
+        return None
+    masks = np.stack(
+        [df[column].to_numpy(dtype=np.int64) for column in ("mask_0", "mask_1")[:words]], axis=1
+    ).view(np.uint64)
+    return masks, df["mask_style"].to_numpy(dtype=np.uint8), df["mask_valid"].to_numpy(dtype=np.int8)
+
+
+def exact_mask_rows(styles: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """已物化、可精确表示且书写风格单一的行：位图 + 风格即可还原号码语义，紧凑帧中不再保留文本"""
+    return (valid == 1) & (styles != STYLE_PLAIN | STYLE_PADDED)
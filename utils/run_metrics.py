@@ -0,0 +1,249 @@
+# utils/run_metrics.py
+"""
+运行指标：阶段计时、JSON lines 事件流与运行汇总
+
+📌 事件（每行一个 JSON 对象，event 字段区分类型）：
+- stage：某彩种（可选期号）一个阶段的耗时与读写行数，如 read_draws / read_predictions / compute / write
+  （差异写入时 write 阶段另有 inserted / updated / deleted / unchanged）
+  rows_written 只计命中汇总表；位图表 / 开奖特征表 / 结果空间矩阵 / 远程同步等附属表的写入行数
+  记为 aux_rows_written，汇总时按阶段单独列出
+- issue：单期计算的端到端耗时（单期 / Today 模式）
+- lottery：批量计算一个彩种（或分片）的期数与总耗时
+- pipeline：流水线运行时各阶段的忙碌 / 等待耗时与利用率（见 utils/pipeline.py）
+- coverage：指定期号范围 / 分片时，某彩种本分片的期数与期号指纹（见 utils/issue_shard.py）
+- run：运行结束时的汇总（与 summary() 相同）
+
+📌 内存：read_predictions 阶段带 frame_mb（推荐帧实际占用），issue / lottery / pipeline 事件带 peak_rss_mb
+（区间峰值 RSS，见 utils/memory_usage.py），汇总中按彩种取最大值。
+
+📌 多进程：事件先记录在当前进程，子进程的事件随任务结果回传（mark / since），
+主进程 merge 后再写入事件流并累计，汇总口径与串行一致。
+📌 多线程（流水线各阶段）：记录事件时加锁。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.hit_stat_diff import DIFF_FIELDS
+
+MEMORY_FIELDS = ("peak_rss_mb", "frame_mb")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class LotteryTotals:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_written = 0
+        self.aux_rows_written: dict[str, int] = {}
+        self.issues = 0
+        self.stages: dict[str, float] = {}
+        self.issue_seconds: list[float] = []
+        self.diff: dict[str, int] = {}
+        self.coverage: dict | None = None
+        self.pipeline: dict | None = None
+        self.memory: dict[str, float] = {}
+
+    def to_dict(self) -> dict:
+        result = {
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "issues": self.issues,
+            "seconds": round(sum(self.stages.values()), 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+        }
+        if self.issue_seconds:
+            result["issue_latency"] = {
+                "count": len(self.issue_seconds),
+                "p50": round(_percentile(self.issue_seconds, 50), 4),
+                "p95": round(_percentile(self.issue_seconds, 95), 4),
+                "max": round(max(self.issue_seconds), 4),
+            }
+        if self.aux_rows_written:
+            result["aux_rows_written"] = dict(self.aux_rows_written)
+        if self.coverage:
+            result["coverage"] = self.coverage
+        if self.pipeline:
+            result["pipeline"] = self.pipeline
+        if self.memory:
+            result["memory"] = {field: round(value, 1) for field, value in self.memory.items()}
+        if self.diff:
+            result["diff"] = {field: self.diff.get(field, 0) for field in DIFF_FIELDS}
+        return result
+
+
+class RunMetrics:
+    """单次运行的指标收集器（模块级单例见 init_expert_hit_stat.METRICS）"""
+
+    def __init__(self):
+        self.events: list[dict] = []
+        self.totals: dict[str, LotteryTotals] = {}
+        self.mode: str | None = None
+        self.started = time.time()
+        self._owner_pid: int | None = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def start(self, mode: str, stream_path: str | None = None):
+        """主进程调用：记录运行模式，stream_path 不为空时逐行写出事件"""
+        self.mode = mode
+        self.started = time.time()
+        self._owner_pid = os.getpid()
+        if stream_path:
+            os.makedirs(os.path.dirname(os.path.abspath(stream_path)), exist_ok=True)
+            self._stream = open(stream_path, "a", encoding="utf-8", buffering=1)
+
+    def _emit(self, event: dict):
+        with self._lock:
+            self._emit_locked(event)
+
+    def _emit_locked(self, event: dict):
+        self.events.append(event)
+        totals = self.totals.setdefault(event["lottery"], LotteryTotals()) if "lottery" in event else None
+        if event["event"] == "stage":
+            totals.stages[event["stage"]] = totals.stages.get(event["stage"], 0.0) + event["seconds"]
+            totals.rows_read += event.get("rows_read", 0)
+            totals.rows_written += event.get("rows_written", 0)
+            if "aux_rows_written" in event:
+                totals.aux_rows_written[event["stage"]] = (
+                    totals.aux_rows_written.get(event["stage"], 0) + event["aux_rows_written"]
+                )
+            for field in DIFF_FIELDS:
+                if field in event:
+                    totals.diff[field] = totals.diff.get(field, 0) + event[field]
+        elif event["event"] == "issue":
+            totals.issues += 1
+            totals.issue_seconds.append(event["seconds"])
+        elif event["event"] == "lottery":
+            totals.issues += event["issues"]
+        elif event["event"] == "pipeline":
+            totals.pipeline = {
+                "bottleneck": event["bottleneck"],
+                "utilization": {name: stage["utilization"] for name, stage in event["stages"].items()},
+            }
+        elif event["event"] == "coverage":
+            totals.coverage = {key: event.get(key) for key in ("shard", "issues", "total", "digest", "total_digest")}
+        if totals is not None:
+            for field in MEMORY_FIELDS:
+                if field in event:
+                    totals.memory[field] = max(totals.memory.get(field, 0.0), event[field])
+        # 子进程（fork 继承了文件句柄）不直接写事件流，由主进程 merge 后写出
+        if self._stream is not None and os.getpid() == self._owner_pid:
+            self._stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def record(self, event: str, lottery_name: str | None = None, **fields):
+        payload = {"ts": round(time.time(), 3), "event": event}
+        if self.mode:
+            payload["mode"] = self.mode
+        if lottery_name is not None:
+            payload["lottery"] = lottery_name
+        for key, value in fields.items():
+            if value is not None:
+                payload[key] = round(value, 4) if isinstance(value, float) else value
+        self._emit(payload)
+
+    def record_stage(self, lottery_name: str, stage: str, seconds: float, issue: str | None = None,
+                     rows_read: int | None = None, rows_written: int | None = None, **fields):
+        self.record("stage", lottery_name, issue=issue, stage=stage, seconds=seconds,
+                    rows_read=rows_read, rows_written=rows_written, **fields)
+
+    @contextmanager
+    def stage(self, lottery_name: str, stage: str, issue: str | None = None):
+        """
+        计时一个阶段：with METRICS.stage(...) as info: info["rows_read"] = ...
+        阶段内抛出异常时同样记录耗时（error 字段为异常类型）
+        """
+        info: dict = {}
+        start = time.perf_counter()
+        try:
+            yield info
+        except Exception as exc:
+            info["error"] = type(exc).__name__
+            raise
+        finally:
+            self.record("stage", lottery_name, issue=issue, stage=stage,
+                        seconds=time.perf_counter() - start, **info)
+
+    def mark(self) -> int:
+        return len(self.events)
+
+    def since(self, mark: int) -> list[dict]:
+        """返回 mark 之后记录的事件（供子进程随任务结果回传）"""
+        return self.events[mark:]
+
+    def merge(self, events: list[dict]):
+        for event in events:
+            self._emit(event)
+
+    def summary(self, failures: int = 0) -> dict:
+        lotteries = {name: totals.to_dict() for name, totals in self.totals.items()}
+        return {
+            "mode": self.mode,
+            "wall_seconds": round(time.time() - self.started, 2),
+            "rows_read": sum(t["rows_read"] for t in lotteries.values()),
+            "rows_written": sum(t["rows_written"] for t in lotteries.values()),
+            "issues": sum(t["issues"] for t in lotteries.values()),
+            "failures": failures,
+            "lotteries": lotteries,
+        }
+
+    @staticmethod
+    def format_summary(summary: dict) -> str:
+        """面向通知消息的多行文本"""
+        lines = [
+            f"总耗时：{summary['wall_seconds']:.1f}s，期数：{summary['issues']}，"
+            f"读取：{summary['rows_read']} 条，写入：{summary['rows_written']} 条"
+        ]
+        for name, totals in summary["lotteries"].items():
+            stages = " ".join(f"{stage} {seconds:.1f}s" for stage, seconds in totals["stages"].items())
+            line = f"{name}：{totals['issues']} 期 / 写入 {totals['rows_written']} 条 / {stages}"
+            aux = totals.get("aux_rows_written")
+            if aux:
+                line += " / 附属表 " + " ".join(f"{stage} {rows} 条" for stage, rows in aux.items())
+            latency = totals.get("issue_latency")
+            if latency:
+                line += f" / 单期 p50 {latency['p50']:.2f}s p95 {latency['p95']:.2f}s"
+            coverage = totals.get("coverage")
+            if coverage:
+                line += (
+                    f" / 分片 {coverage['shard']} 覆盖 {coverage['issues']}/{coverage['total']} 期"
+                    f"（指纹 {coverage['digest']}/{coverage['total_digest']}）"
+                )
+            pipeline = totals.get("pipeline")
+            if pipeline:
+                utilization = " ".join(f"{name} {value:.0%}" for name, value in pipeline["utilization"].items())
+                line += f" / 流水线 {utilization}（瓶颈 {pipeline['bottleneck']}）"
+            memory = totals.get("memory")
+            if memory:
+                line += f" / 峰值内存 {memory.get('peak_rss_mb', 0):.0f} MB（推荐帧 {memory.get('frame_mb', 0):.1f} MB）"
+            diff = totals.get("diff")
+            if diff:
+                line += (
+                    f" / 新增 {diff['inserted']} 更新 {diff['updated']} "
+                    f"删除 {diff['deleted']} 未变 {diff['unchanged']}"
+                )
+            lines.append(line)
+        if summary["failures"]:
+            lines.append(f"失败期号：{summary['failures']} 个")
+        return "\n".join(lines)
+
+    def finish(self, summary_path: str | None = None, failures: int = 0) -> dict:
+        """写出 run 事件、打印汇总，summary_path 不为空时写入汇总文本（供工作流通知使用）"""
+        summary = self.summary(failures)
+        self.record("run", **summary)
+        text = self.format_summary(summary)
+        print(f"\n⏱️ 运行汇总：\n{text}")
+        if summary_path:
+            os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+            with open(summary_path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        return summary
@@ -0,0 +1,389 @@
+# utils/snapshot.py
+"""
+列式快照：推荐表 / 开奖表 / 玩法字典转换为 Parquet 文件，统计引擎直接读取（无需先恢复 MySQL）
+
+📌 目录结构（推荐与命中汇总按期号 hive 分区，每个彩种一个目录）：
+  <root>/manifest.json                                         来源、生成时间、各表行数
+  <root>/playtype_dict.parquet                                 playtype_id, lottery_id, playtype_name
+  <root>/results/<开奖表名>.parquet                             issue_name, open_code, blue_code
+  <root>/predictions/<推荐表名>/issue_name=<期号>/*.parquet      user_id, playtype_id, numbers
+  <root>/stats/<命中汇总表名>/issue_name=<期号>/*.parquet         计算结果（--snapshot-write parquet）
+
+📌 转换来源：
+- mysqldump 导出的 .sql 文件（逐行解析 INSERT，不经过 MySQL）
+- 已恢复的数据库（服务端游标分块读取）
+
+📌 读取：文件内存映射，只读取需要的列，期号条件下推到分区目录
+
+📌 依赖：pyarrow（可选依赖，仅快照功能需要：pip install pyarrow）
+"""
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from utils.db import LOTTERIES_WITH_BLUE, get_hit_stat_table, get_prediction_table, get_result_table
+from utils.draw_index import DrawEntry, parse_draw
+from utils.hit_mask import get_mask_words
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:  # pragma: no cover - 可选依赖
+    pa = None
+
+# 快照中保留的列（其余列在转换时丢弃）
+PREDICTION_COLUMNS = ["issue_name", "user_id", "playtype_id", "numbers"]
+RESULT_COLUMNS = ["issue_name", "open_code", "blue_code"]
+PLAYTYPE_COLUMNS = ["playtype_id", "lottery_id", "playtype_name"]
+STAT_PARTITION = "issue_name"
+
+# 转换时每攒够多少行写出一批文件
+FLUSH_ROWS = 500_000
+# 分区写出时同时打开的文件数上限（低于常见的 ulimit -n 1024；行已按期号排序，超出时按 LRU 关闭不会重开）
+MAX_OPEN_FILES = 512
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("列式快照需要 pyarrow：pip install pyarrow")
+
+
+def _schema(kind: str):
+    if kind == "predictions":
+        return pa.schema([
+            ("issue_name", pa.string()), ("user_id", pa.int64()),
+            ("playtype_id", pa.int32()), ("numbers", pa.string()),
+        ])
+    if kind == "results":
+        return pa.schema([("issue_name", pa.string()), ("open_code", pa.string()), ("blue_code", pa.string())])
+    if kind == "playtype_dict":
+        return pa.schema([("playtype_id", pa.int32()), ("lottery_id", pa.int32()), ("playtype_name", pa.string())])
+    return pa.schema([
+        ("lottery_id", pa.int32()), ("issue_name", pa.string()), ("playtype_id", pa.int32()),
+        ("user_id", pa.int64()), ("total_count", pa.int32()), ("hit_count", pa.int32()),
+        ("hit_number_count", pa.int32()), ("avg_hit_gap", pa.float32()),
+    ])
+
+
+def _issue_partitioning():
+    # 期号按字符串分区（否则会被推断为整数，丢失前导零等写法）
+    return ds.partitioning(pa.schema([(STAT_PARTITION, pa.string())]), flavor="hive")
+
+
+def _write_issue_partitions(table, path: str, basename_template: str):
+    """
+    按期号分区写出一批行：分区数上限按本批期号数设置（pyarrow 默认 1024，全量历史会超出），
+    先按期号排序，使每个分区的文件只打开一次
+    """
+    partitions = max(len(pc.unique(table[STAT_PARTITION])), 1)
+    ds.write_dataset(
+        table.sort_by(STAT_PARTITION), path, format="parquet", partitioning=_issue_partitioning(),
+        basename_template=basename_template, existing_data_behavior="overwrite_or_ignore",
+        max_partitions=partitions, max_open_files=min(partitions, MAX_OPEN_FILES),
+    )
+
+
+# ---------------------------------------------------------------- mysqldump 解析
+
+_INSERT_RE = re.compile(r"^INSERT INTO `?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.I)
+_CREATE_RE = re.compile(r"^CREATE TABLE `?(\w+)`?", re.I)
+_COLUMN_RE = re.compile(r"^\s*`(\w+)`\s")
+_TOKEN_RE = re.compile(r"""'((?:[^'\\]|\\.|'')*)'|(NULL)|([-+0-9.eE]+)|(\()|(\))""")
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+_ESCAPE_RE = re.compile(r"\\(.)|''")
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text and "''" not in text:
+        return text
+    return _ESCAPE_RE.sub(lambda m: "'" if m.group(0) == "''" else _ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def parse_insert_values(values_sql: str):
+    """解析 VALUES (...),(...) 部分，逐行返回元组（字符串 / 数字文本 / None）"""
+    row = None
+    for match in _TOKEN_RE.finditer(values_sql):
+        text, null, number, open_paren, close_paren = match.groups()
+        if open_paren:
+            row = []
+        elif close_paren:
+            yield tuple(row)
+            row = None
+        elif row is not None:
+            if text is not None:
+                row.append(_unescape(text))
+            elif null:
+                row.append(None)
+            else:
+                row.append(number)
+
+
+def iter_dump_rows(path: str, tables: set[str]):
+    """
+    逐行扫描 mysqldump 文件，返回 (表名, 列名列表, 行元组)。
+    列名取自 INSERT 自带的列清单，否则取自该表的 CREATE TABLE。
+    """
+    columns: dict[str, list[str]] = {}
+    creating = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if creating is not None:
+                match = _COLUMN_RE.match(line)
+                if match:
+                    columns[creating].append(match.group(1))
+                elif line.startswith(")"):
+                    creating = None
+                continue
+            match = _CREATE_RE.match(line)
+            if match:
+                creating = match.group(1)
+                columns[creating] = []
+                continue
+            match = _INSERT_RE.match(line)
+            if not match or match.group(1) not in tables:
+                continue
+            table = match.group(1)
+            names = [c.strip(" `") for c in match.group(2).split(",")] if match.group(2) else columns.get(table, [])
+            for row in parse_insert_values(line[match.end():]):
+                yield table, names, row
+
+
+# ---------------------------------------------------------------- 写入
+
+class _TableBuffer:
+    """按列缓存行，攒够 FLUSH_ROWS 行写出一批（分区表每个期号目录各写一个文件）"""
+
+    def __init__(self, path: str, kind: str, columns: list[str], partitioned: bool):
+        self.path = path
+        self.kind = kind
+        self.columns = columns
+        self.partitioned = partitioned
+        self.data: dict[str, list] = {c: [] for c in columns}
+        self.rows = 0
+        self.batches = 0
+        self._writer = None
+
+    def add(self, record: dict):
+        for column in self.columns:
+            self.data[column].append(record.get(column))
+        self.rows += 1
+        if len(self.data[self.columns[0]]) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.data[self.columns[0]]:
+            return
+        table = pa.Table.from_pydict(self.data, schema=_schema(self.kind))
+        self.data = {c: [] for c in self.columns}
+        if self.partitioned:
+            _write_issue_partitions(table, self.path, f"part-{self.batches}-{{i}}.parquet")
+        else:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        self.batches += 1
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _coerce(kind: str, record: dict) -> dict:
+    """转换为快照列类型（dump 中数字为文本）"""
+    if kind == "predictions":
+        return {
+            "issue_name": str(record["issue_name"]),
+            "user_id": int(record["user_id"]),
+            "playtype_id": int(record["playtype_id"]),
+            "numbers": None if record.get("numbers") is None else str(record["numbers"]),
+        }
+    if kind == "results":
+        return {
+            "issue_name": str(record["issue_name"]),
+            "open_code": None if record.get("open_code") is None else str(record["open_code"]),
+            "blue_code": None if record.get("blue_code") is None else str(record["blue_code"]),
+        }
+    return {
+        "playtype_id": int(record["playtype_id"]),
+        "lottery_id": int(record["lottery_id"]),
+        "playtype_name": None if record.get("playtype_name") is None else str(record["playtype_name"]),
+    }
+
+
+class SnapshotBuilder:
+    """把来源数据写成快照目录（目录已存在时整体重建）"""
+
+    def __init__(self, root: str, lottery_names: list[str]):
+        require_pyarrow()
+        self.root = root
+        self.lottery_names = lottery_names
+        self.buffers: dict[str, _TableBuffer] = {}
+        self.kinds: dict[str, str] = {"playtype_dict": "playtype_dict"}
+        for lottery_name in lottery_names:
+            self.kinds[get_prediction_table(lottery_name)] = "predictions"
+            self.kinds[get_result_table(lottery_name)] = "results"
+
+    def _buffer(self, table: str) -> _TableBuffer:
+        buffer = self.buffers.get(table)
+        if buffer is None:
+            kind = self.kinds[table]
+            if kind == "predictions":
+                buffer = _TableBuffer(os.path.join(self.root, "predictions", table), kind, PREDICTION_COLUMNS, True)
+            elif kind == "results":
+                buffer = _TableBuffer(os.path.join(self.root, "results", f"{table}.parquet"), kind, RESULT_COLUMNS, False)
+            else:
+                buffer = _TableBuffer(os.path.join(self.root, "playtype_dict.parquet"), kind, PLAYTYPE_COLUMNS, False)
+            self.buffers[table] = buffer
+        return buffer
+
+    def add(self, table: str, record: dict):
+        self._buffer(table).add(_coerce(self.kinds[table], record))
+
+    def from_dump(self, paths: list[str]):
+        for path in paths:
+            for table, names, row in iter_dump_rows(path, set(self.kinds)):
+                self.add(table, dict(zip(names, row)))
+
+    def from_database(self, conn, cursor_class=None, fetch_size: int = 50_000):
+        """从已恢复的数据库读取（cursor_class 传 pymysql.cursors.SSCursor 时服务端流式读取）"""
+        queries = {"playtype_dict": f"SELECT {', '.join(PLAYTYPE_COLUMNS)} FROM playtype_dict"}
+        for lottery_name in self.lottery_names:
+            result_columns = RESULT_COLUMNS if lottery_name in LOTTERIES_WITH_BLUE else RESULT_COLUMNS[:2]
+            queries[get_prediction_table(lottery_name)] = (
+                f"SELECT {', '.join(PREDICTION_COLUMNS)} FROM {get_prediction_table(lottery_name)} ORDER BY issue_name"
+            )
+            queries[get_result_table(lottery_name)] = (
+                f"SELECT {', '.join(result_columns)} FROM {get_result_table(lottery_name)}"
+            )
+        for table, sql in queries.items():
+            with (conn.cursor(cursor_class) if cursor_class else conn.cursor()) as cursor:
+                cursor.execute(sql)
+                names = [d[0] for d in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        self.add(table, dict(zip(names, row)))
+
+    def close(self, source: str) -> dict:
+        for buffer in self.buffers.values():
+            buffer.close()
+        manifest = {
+            "source": source,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "lotteries": self.lottery_names,
+            "tables": {table: buffer.rows for table, buffer in self.buffers.items()},
+        }
+        with open(os.path.join(self.root, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+
+def build_snapshot(root: str, lottery_names: list[str], dump_paths: list[str] | None = None, conn=None,
+                   cursor_class=None) -> dict:
+    """生成快照（dump_paths 与 conn 二选一），返回 manifest"""
+    require_pyarrow()
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+    builder = SnapshotBuilder(root, lottery_names)
+    if dump_paths:
+        builder.from_dump(dump_paths)
+        source = "dump:" + ",".join(os.path.basename(p) for p in dump_paths)
+    else:
+        builder.from_database(conn, cursor_class)
+        source = "database"
+    return builder.close(source)
+
+
+# ---------------------------------------------------------------- 读取
+
+class Snapshot:
+    """快照读取（内存映射 + 列裁剪 + 期号分区过滤）"""
+
+    def __init__(self, root: str):
+        require_pyarrow()
+        if not os.path.exists(os.path.join(root, "manifest.json")):
+            raise FileNotFoundError(f"不是有效的快照目录（缺少 manifest.json）：{root}")
+        self.root = root
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._playtypes: pd.DataFrame | None = None
+
+    def _dataset(self, path: str):
+        return ds.dataset(path, format="parquet", partitioning=_issue_partitioning(), filesystem=self.filesystem)
+
+    def list_issues(self, lottery_name: str) -> list[str]:
+        """推荐表的全部期号（只列分区目录，不读取文件）"""
+        path = os.path.join(self.root, "predictions", get_prediction_table(lottery_name))
+        if not os.path.isdir(path):
+            return []
+        prefix = f"{STAT_PARTITION}="
+        return sorted(name[len(prefix):] for name in os.listdir(path) if name.startswith(prefix))
+
+    def playtype_dict(self) -> pd.DataFrame:
+        if self._playtypes is None:
+            path = os.path.join(self.root, "playtype_dict.parquet")
+            if os.path.exists(path):
+                self._playtypes = pq.read_table(path, memory_map=True).to_pandas()
+            else:
+                self._playtypes = pd.DataFrame(columns=PLAYTYPE_COLUMNS)
+        return self._playtypes
+
+    def read_predictions(self, lottery_name: str, lottery_id: int, issues: list[str] | None = None) -> pd.DataFrame:
+        """
+        读取推荐记录：issue_name / user_id / playtype_id / playtype_name / numbers
+        玩法名称与数据库 LEFT JOIN playtype_dict 的口径一致（缺失时为空字符串，由 normalize_predictions 回退）
+        """
+        path = os.path.join(self.root, "predictions", get_prediction_table(lottery_name))
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=PREDICTION_COLUMNS + ["playtype_name"])
+        dataset = self._dataset(path)
+        flt = ds.field(STAT_PARTITION).isin([str(i) for i in issues]) if issues is not None else None
+        df = dataset.to_table(columns=PREDICTION_COLUMNS, filter=flt).to_pandas()
+
+        names = self.playtype_dict()
+        names = names[names["lottery_id"] == lottery_id][["playtype_id", "playtype_name"]]
+        df = df.merge(names, on="playtype_id", how="left", sort=False)
+        df["playtype_name"] = df["playtype_name"].fillna("")
+        return df
+
+    def read_results(self, lottery_name: str, issues: list[str] | None = None) -> pd.DataFrame:
+        path = os.path.join(self.root, "results", f"{get_result_table(lottery_name)}.parquet")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        flt = ds.field("issue_name").isin([str(i) for i in issues]) if issues is not None else None
+        return ds.dataset(path, format="parquet", filesystem=self.filesystem).to_table(
+            columns=RESULT_COLUMNS, filter=flt
+        ).to_pandas()
+
+    def read_draws(self, lottery_name: str, issues: list[str] | None = None) -> dict[str, DrawEntry]:
+        """返回 {期号: DrawEntry}，与 DrawIndex 口径一致（同一期号多行时取第一行）"""
+        df = self.read_results(lottery_name, issues)
+        words = get_mask_words(lottery_name)
+        with_blue = lottery_name in LOTTERIES_WITH_BLUE
+        draws: dict[str, DrawEntry] = {}
+        for issue_name, open_code, blue_code in zip(df["issue_name"].astype(str), df["open_code"], df["blue_code"]):
+            if issue_name not in draws:
+                draws[issue_name] = parse_draw(open_code, blue_code if with_blue else "", words)
+        return draws
+
+    def write_stats(self, lottery_name: str, stat_list: list[dict]) -> int:
+        """计算结果按期号分区写出（同一期号目录先清空，重算时整体替换）"""
+        if not stat_list:
+            return 0
+        path = os.path.join(self.root, "stats", get_hit_stat_table(lottery_name))
+        table = pa.Table.from_pylist(stat_list, schema=_schema("stats"))
+        for issue in {row["issue_name"] for row in stat_list}:
+            shutil.rmtree(os.path.join(path, f"{STAT_PARTITION}={issue}"), ignore_errors=True)
+        _write_issue_partitions(table, path, "part-{i}.parquet")
+        return len(stat_list)
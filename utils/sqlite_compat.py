@@ -0,0 +1,195 @@
+# utils/sqlite_compat.py
+"""
+SQLite 替身连接：在没有 MySQL 的环境（基准测试、本地验证）运行现有 SQL
+
+📌 仅翻译本项目用到的 MySQL 语法：
+- %s 占位符 → ?
+- SHOW COLUMNS / SHOW INDEX / SHOW TABLES LIKE → sqlite_master / pragma 查询
+- INSERT ... ON DUPLICATE KEY UPDATE c = VALUES(c) → ON CONFLICT DO UPDATE SET c = excluded.c
+- CREATE TABLE：去掉 COMMENT / ENGINE / CHARSET，AUTO_INCREMENT 主键改为 AUTOINCREMENT，
+  KEY / UNIQUE KEY 拆为单独的 CREATE [UNIQUE] INDEX（索引名加表名前缀）
+- 表不存在时抛出 pymysql.err.ProgrammingError，与 MySQL 行为一致
+- 注册 MD5() 函数（UTF-8 编码后的小写十六进制，与 MySQL 一致）
+不支持 LOAD DATA、CREATE TABLE ... LIKE 等语句（load 写入方式不可用）。
+"""
+import hashlib
+import re
+import sqlite3
+
+import pymysql
+
+_SHOW_COLUMNS_RE = re.compile(r"^\s*SHOW\s+COLUMNS\s+FROM\s+`?(\w+)`?", re.I)
+_SHOW_INDEX_RE = re.compile(r"^\s*SHOW\s+INDEX\s+FROM\s+`?(\w+)`?", re.I)
+_SHOW_TABLES_RE = re.compile(r"^\s*SHOW\s+TABLES\s+LIKE\s+(%s|'[^']*')", re.I)
+_CREATE_TABLE_RE = re.compile(r"^\s*CREATE\s+(TEMPORARY\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(", re.I)
+_VALUES_FUNC_RE = re.compile(r"VALUES\((\w+)\)", re.I)
+
+
+def _split_top_level(body: str) -> list[str]:
+    """按最外层逗号拆分建表语句中的列 / 约束定义"""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def translate_create_table(sql: str) -> list[str]:
+    """MySQL 建表语句 → SQLite 建表语句 + 建索引语句"""
+    match = _CREATE_TABLE_RE.match(sql)
+    temporary, if_not_exists, table = match.group(1), match.group(2), match.group(3)
+    body = sql[match.end():sql.rindex(")")]
+
+    columns, indexes = [], []
+    for part in _split_top_level(body):
+        part = re.sub(r"\s+COMMENT\s+'[^']*'", "", part, flags=re.I)
+        part = re.sub(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", "", part, flags=re.I)
+        part = re.sub(r"\s+UNSIGNED", "", part, flags=re.I)
+        part = re.sub(r"\bBIGINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", part, flags=re.I)
+        unique = re.match(r"UNIQUE\s+(?:KEY|INDEX)\s+`?(\w+)`?\s*(\(.*\))", part, re.I)
+        plain = re.match(r"(?:KEY|INDEX)\s+`?(\w+)`?\s*(\(.*\))", part, re.I)
+        if unique:
+            indexes.append(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_{unique.group(1)} ON {table} {unique.group(2)}")
+        elif plain:
+            indexes.append(f"CREATE INDEX IF NOT EXISTS {table}_{plain.group(1)} ON {table} {plain.group(2)}")
+        else:
+            columns.append(part)
+
+    create = (
+        f"CREATE {'TEMPORARY ' if temporary else ''}TABLE {'IF NOT EXISTS ' if if_not_exists else ''}"
+        f"{table} ({', '.join(columns)})"
+    )
+    return [create, *indexes]
+
+
+def translate(sql: str) -> list[str]:
+    """翻译单条 MySQL 语句，返回需依次执行的 SQLite 语句"""
+    match = _SHOW_COLUMNS_RE.match(sql)
+    if match:
+        return [f"SELECT name, type, \"notnull\", pk, dflt_value, '' FROM pragma_table_info('{match.group(1)}')"]
+    match = _SHOW_INDEX_RE.match(sql)
+    if match:
+        # 索引名在 SQLite 中全库唯一，建表时加了表名前缀，这里去掉
+        table = match.group(1)
+        return [
+            f"SELECT '{table}', NOT \"unique\", "
+            f"CASE WHEN substr(name, 1, {len(table) + 1}) = '{table}_' THEN substr(name, {len(table) + 2}) ELSE name END "
+            f"FROM pragma_index_list('{table}')"
+        ]
+    match = _SHOW_TABLES_RE.match(sql)
+    if match:
+        return [f"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE {match.group(1).replace('%s', '?')}"]
+    if _CREATE_TABLE_RE.match(sql):
+        return translate_create_table(sql.strip().rstrip(";"))
+
+    sql = sql.replace("%s", "?")
+    if re.search(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", sql, re.I):
+        head, tail = re.split(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", sql, maxsplit=1, flags=re.I)
+        if re.search(r"\bSELECT\b", head, re.I) and not re.search(r"\bWHERE\b", head, re.I):
+            # INSERT ... SELECT 后直接跟 ON CONFLICT 存在解析歧义
+            head = head.rstrip() + " WHERE true "
+        sql = head + "ON CONFLICT DO UPDATE SET " + _VALUES_FUNC_RE.sub(r"excluded.\1", tail)
+    return [sql]
+
+
+def _md5(value):
+    return None if value is None else hashlib.md5(str(value).encode("utf-8")).hexdigest()
+
+
+class SQLiteCursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self.description = None
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _table_exists(self, table: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        return row is not None
+
+    def _run(self, method: str, sql: str, params):
+        match = _SHOW_COLUMNS_RE.match(sql) or _SHOW_INDEX_RE.match(sql)
+        if match and not self._table_exists(match.group(1)):
+            raise pymysql.err.ProgrammingError(1146, f"Table '{match.group(1)}' doesn't exist")
+        statements = translate(sql)
+        try:
+            for statement in statements[:-1]:
+                self._cursor.execute(statement)
+            if method == "executemany":
+                self._cursor.executemany(statements[-1], [tuple(p) for p in params])
+            else:
+                self._cursor.execute(statements[-1], tuple(params) if params else ())
+        except sqlite3.OperationalError as exc:
+            if "no such table" in str(exc):
+                raise pymysql.err.ProgrammingError(1146, str(exc)) from exc
+            raise
+        self.description = self._cursor.description
+        self.rowcount = self._cursor.rowcount
+        return self.rowcount
+
+    def execute(self, sql: str, params=None):
+        return self._run("execute", sql, params)
+
+    def executemany(self, sql: str, seq):
+        return self._run("executemany", sql, seq)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """与本项目使用到的 PyMySQL 连接接口一致（cursor 参数如 SSCursor 被忽略）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # 连接池中的连接会在线程之间传递（同一时刻只有一个线程使用）
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.create_function("MD5", 1, _md5, deterministic=True)
+
+    def cursor(self, *args):
+        return SQLiteCursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect: bool = True):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def sqlite_connection_factory(path: str):
+    """供 utils.db.set_connection_factory 使用：忽略 MySQL 连接参数，始终连接 path"""
+    def factory(**overrides):
+        return SQLiteConnection(path)
+    return factory
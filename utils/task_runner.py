@@ -0,0 +1,171 @@
+# utils/task_runner.py
+"""
+任务执行器：串行或进程池并行执行一组独立任务
+
+📌 特性：
+- workers <= 1 时在当前进程内逐个执行，输出实时打印
+- workers > 1 时使用进程池，同时在途任务数不超过 max_in_flight
+- 子进程输出先缓存，再按任务提交顺序统一打印，保证输出顺序确定
+- 单个任务异常只记为失败，不影响其余任务；子进程崩溃时重建进程池并重试受牵连的任务
+- on_result 在每个任务结果打印后调用（按提交顺序），可用于进度 / 剩余时间估算（见 ProgressReporter）
+"""
+import io
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# 进程池损坏时单个任务最多执行次数
+MAX_ATTEMPTS = 2
+
+
+@dataclass
+class TaskResult:
+    index: int
+    task: Any
+    ok: bool
+    value: Any = None
+    error: str = ""
+    log: str = ""
+    seconds: float = 0.0
+
+
+def _run_captured(worker: Callable, task) -> tuple:
+    """子进程入口：捕获输出与异常，返回 (ok, value, error, log, seconds)"""
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(buffer):
+        try:
+            value = worker(task)
+            ok, error = True, ""
+        except Exception as exc:
+            value = None
+            ok, error = False, f"{type(exc).__name__}: {exc}"
+            traceback.print_exc(file=buffer)
+    return ok, value, error, buffer.getvalue(), time.perf_counter() - start
+
+
+def _print_result(result: TaskResult, total: int, label: Callable):
+    print(f"\n=== [{result.index + 1}/{total}] {label(result.task)} ===")
+    if result.log:
+        print(result.log, end="" if result.log.endswith("\n") else "\n")
+    if not result.ok:
+        print(f"❌ 任务失败：{result.error}")
+
+
+class ProgressReporter:
+    """按已完成的工作量（如期数）与实际吞吐估算剩余时间"""
+
+    def __init__(self, total: int, unit: str = "期"):
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def update(self, units: int) -> str:
+        self.done += units
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.done, 0)
+        eta = _format_seconds(remaining / rate) if rate > 0 else "-"
+        percent = self.done / self.total * 100 if self.total else 100.0
+        return (
+            f"⏳ 进度：{self.done}/{self.total} {self.unit}（{percent:.1f}%），"
+            f"{rate:.2f} {self.unit}/秒，已用 {_format_seconds(elapsed)}，预计剩余 {eta}"
+        )
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def run_tasks(tasks: list, worker: Callable, workers: int = 1, max_in_flight: int | None = None,
+              label: Callable = str, on_result: Callable | None = None) -> list[TaskResult]:
+    """
+    执行任务列表，返回按提交顺序排列的 TaskResult。
+    - worker 需为可 pickle 的顶层函数（或其 functools.partial）
+    """
+    total = len(tasks)
+    results: list[TaskResult | None] = [None] * total
+
+    if workers <= 1:
+        for index, task in enumerate(tasks):
+            print(f"\n=== [{index + 1}/{total}] {label(task)} ===")
+            start = time.perf_counter()
+            try:
+                value = worker(task)
+                result = TaskResult(index, task, True, value)
+            except Exception as exc:
+                traceback.print_exc()
+                print(f"❌ 任务失败：{type(exc).__name__}: {exc}")
+                result = TaskResult(index, task, False, error=f"{type(exc).__name__}: {exc}")
+            result.seconds = time.perf_counter() - start
+            results[index] = result
+            if on_result:
+                on_result(result)
+        return results
+
+    max_in_flight = max(max_in_flight or workers * 2, workers)
+    pending = deque(range(total))
+    attempts = [0] * total
+    next_print = 0
+    in_flight: dict = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while next_print < total:
+            # 重试任务单独执行，避免再次崩溃时牵连其他任务
+            isolating = any(attempts[i] > 1 for i in in_flight.values())
+            while pending and len(in_flight) < max_in_flight and not isolating:
+                index = pending[0]
+                if attempts[index] > 0 and in_flight:
+                    break
+                pending.popleft()
+                attempts[index] += 1
+                in_flight[executor.submit(_run_captured, worker, tasks[index])] = index
+                isolating = attempts[index] > 1
+
+            broken = False
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    ok, value, error, log, seconds = future.result()
+                    results[index] = TaskResult(index, tasks[index], ok, value, error, log, seconds)
+                except BrokenProcessPool as exc:
+                    # 子进程被强制终止时同池任务一并失败：重建进程池后单独重试一次
+                    broken = True
+                    if attempts[index] < MAX_ATTEMPTS:
+                        pending.appendleft(index)
+                    else:
+                        results[index] = TaskResult(
+                            index, tasks[index], False, error=f"{type(exc).__name__}: {exc}"
+                        )
+                except Exception as exc:
+                    results[index] = TaskResult(
+                        index, tasks[index], False, error=f"{type(exc).__name__}: {exc}"
+                    )
+
+            if broken:
+                for future, index in in_flight.items():
+                    pending.appendleft(index)
+                    attempts[index] -= 1
+                in_flight.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                pending = deque(sorted(pending))
+
+            while next_print < total and results[next_print] is not None:
+                _print_result(results[next_print], total, label)
+                if on_result:
+                    on_result(results[next_print])
+                next_print += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return results